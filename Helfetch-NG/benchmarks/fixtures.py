@@ -0,0 +1,270 @@
+# benchmarks/fixtures.py
+
+import os
+import random
+import sqlite3
+
+# Fixture host trees for the benchmarks: the /proc, /sys, /etc, /var and home
+# files the collectors read, laid out as on three recorded machines and
+# scaled to their sizes. They are generated (deterministically) rather than
+# checked in, since the server alone has tens of thousands of files.
+#
+#   laptop          8 threads, ~300 processes, GNOME on Wayland, battery, pacman
+#   server          2 x 64-core sockets (256 threads), 5,000 processes, 24
+#                   disks under md RAID, rpm
+#   container-host  300 veth interfaces and 20 bridges, 1,500 processes, dpkg
+#
+# Each fixture also has an environment (applied while it runs) and recorded
+# command output for the commands the collectors may spawn.
+
+FIXTURE_VERSION = "1"
+VERSION_FILE = ".fixture-version"
+
+def _write(root, path, content):
+    full_path = os.path.join(root, path.lstrip('/'))
+    os.makedirs(os.path.dirname(full_path), exist_ok=True)
+    with open(full_path, 'w') as f:
+        f.write(content)
+
+def _symlink(root, path, target):
+    full_path = os.path.join(root, path.lstrip('/'))
+    os.makedirs(os.path.dirname(full_path), exist_ok=True)
+    os.symlink(target, full_path)
+
+def _write_kernel(root, hostname, release, uptime):
+    _write(root, '/proc/sys/kernel/hostname', f"{hostname}\n")
+    _write(root, '/proc/sys/kernel/osrelease', f"{release}\n")
+    _write(root, '/proc/sys/kernel/random/boot_id', f"{random.Random(hostname).getrandbits(128):032x}\n")
+    _write(root, '/proc/uptime', f"{uptime:.2f} {uptime * 3:.2f}\n")
+
+def _write_os_release(root, pretty_name):
+    _write(root, '/etc/os-release', f'NAME="{pretty_name.split()[0]}"\nPRETTY_NAME="{pretty_name}"\n')
+
+def _write_cpus(root, rng, model, sockets, cores_per_socket, threads_per_core):
+    threads = sockets * cores_per_socket * threads_per_core
+    cpuinfo = []
+    stat = []
+    totals = [0] * 10
+    for cpu in range(threads):
+        cpuinfo.append(f"processor\t: {cpu}\nvendor_id\t: GenuineIntel\nmodel name\t: {model}\n"
+                       f"physical id\t: {cpu // (cores_per_socket * threads_per_core)}\n"
+                       f"core id\t\t: {cpu % cores_per_socket}\ncpu cores\t: {cores_per_socket}\n"
+                       f"flags\t\t: fpu vme de pse tsc msr pae mce cx8 apic sep mtrr pge mca cmov\n\n")
+        times = [rng.randint(10**5, 10**7) for _ in range(10)]
+        totals = [total + value for total, value in zip(totals, times)]
+        stat.append(f"cpu{cpu} " + " ".join(map(str, times)))
+    _write(root, '/proc/cpuinfo', "".join(cpuinfo))
+    _write(root, '/proc/stat', "\n".join(["cpu  " + " ".join(map(str, totals))] + stat) +
+           f"\nintr 0\nctxt {rng.randint(10**8, 10**9)}\nbtime 1790000000\nprocesses 100000\n")
+
+def _write_meminfo(root, total_kb, available_kb):
+    _write(root, '/proc/meminfo', "".join(f"{key}: {value:>12} kB\n" for key, value in (
+        ('MemTotal', total_kb), ('MemFree', available_kb // 3), ('MemAvailable', available_kb),
+        ('Buffers', total_kb // 50), ('Cached', available_kb // 2), ('SwapCached', 0),
+        ('Active', total_kb // 4), ('Inactive', total_kb // 5), ('Shmem', total_kb // 100),
+        ('SReclaimable', total_kb // 60), ('SwapTotal', 0), ('SwapFree', 0),
+    )))
+
+def _write_processes(root, rng, count, names, uid_names=()):
+    """Writes /proc/[pid]/{stat,comm,io}; `uid_names` always appear once."""
+    pool = list(names)
+    pid = 1
+    for index in range(count):
+        name = uid_names[index] if index < len(uid_names) else rng.choice(pool)
+        pid += rng.randint(1, 4)
+        utime, stime = rng.randint(0, 10**6), rng.randint(0, 10**5)
+        rss_pages = rng.randint(0, 200000)
+        fields = ["S", "1", str(pid), str(pid), "0", "-1", "4194560", "0", "0", "0", "0",
+                  str(utime), str(stime), "0", "0", "20", "0", "1", "0", "100", "200000000", str(rss_pages)]
+        _write(root, f'/proc/{pid}/stat', f"{pid} ({name}) {' '.join(fields)} 0 0 0\n")
+        _write(root, f'/proc/{pid}/comm', f"{name[:15]}\n")
+        _write(root, f'/proc/{pid}/io', f"rchar: 0\nwchar: 0\nread_bytes: {rng.randint(0, 10**9)}\n"
+                                        f"write_bytes: {rng.randint(0, 10**9)}\n")
+
+def _write_disks(root, rng, disks, stacked=()):
+    lines = []
+    for major, name in enumerate(disks, start=8):
+        for device in [name] + [f"{name}p{part}" if name[-1].isdigit() else f"{name}{part}" for part in (1, 2)]:
+            counters = [rng.randint(10**4, 10**8) for _ in range(11)]
+            lines.append(f"{major:>4} {0:>7} {device} " + " ".join(map(str, counters)))
+        os.makedirs(os.path.join(root, f'sys/block/{name}/slaves'), exist_ok=True)
+    for name, members in stacked:
+        counters = [rng.randint(10**4, 10**8) for _ in range(11)]
+        lines.append(f"   9       0 {name} " + " ".join(map(str, counters)))
+        for member in members:
+            _symlink(root, f'/sys/block/{name}/slaves/{member}', f'../../{member}')
+    _write(root, '/proc/diskstats', "\n".join(lines) + "\n")
+
+def _write_interfaces(root, rng, physical, virtual, default_interface, address_prefix):
+    lines = ["Inter-|   Receive                                                |  Transmit",
+             " face |bytes    packets errs drop fifo frame compressed multicast|bytes    packets errs drop fifo colls carrier compressed"]
+    for name in ['lo'] + physical + virtual:
+        rx = [rng.randint(10**6, 10**11), rng.randint(10**3, 10**8)] + [0] * 6
+        tx = [rng.randint(10**6, 10**11), rng.randint(10**3, 10**8)] + [0] * 6
+        lines.append(f"{name:>6}: " + " ".join(map(str, rx + tx)))
+        if name == 'lo' or name in virtual:
+            target = f'../../devices/virtual/net/{name}'
+        else:
+            target = f'../../devices/pci0000:00/0000:00:1c.0/0000:02:00.0/net/{name}'
+        _symlink(root, f'/sys/class/net/{name}', target)
+        device_dir = os.path.normpath(os.path.join('/sys/class/net', target))
+        _write(root, f'{device_dir}/operstate', "up\n" if name != 'lo' else "unknown\n")
+        if name in physical:
+            _write(root, f'{device_dir}/speed', "1000\n")
+    _write(root, '/proc/net/dev', "\n".join(lines) + "\n")
+
+    gateway = "0101A8C0"
+    _write(root, '/proc/net/route',
+           "Iface\tDestination\tGateway \tFlags\tRefCnt\tUse\tMetric\tMask\t\tMTU\tWindow\tIRTT\n"
+           f"{default_interface}\t00000000\t{gateway}\t0003\t0\t0\t100\t00000000\t0\t0\t0\n"
+           f"{default_interface}\t0001A8C0\t00000000\t0001\t0\t0\t100\t00FFFFFF\t0\t0\t0\n")
+    _write(root, '/proc/net/ipv6_route',
+           f"{'0' * 32} 00 {'0' * 32} 00 fe800000000000000000000000000001 00000400 00000001 00000000 00000003 {default_interface}\n")
+    _write(root, '/proc/net/if_inet6',
+           f"{address_prefix}0000000000000005 02 40 00 00 {default_interface}\n"
+           f"fe80000000000000021122fffe334455 02 40 20 80 {default_interface}\n")
+
+def _write_hwmon(root, driver, sockets, cores_per_socket, index=3):
+    _write(root, '/sys/class/hwmon/hwmon0/name', "acpitz\n")
+    _write(root, '/sys/class/hwmon/hwmon0/temp1_input', "27800\n")
+    for socket in range(sockets):
+        hwmon = f'/sys/class/hwmon/hwmon{index + socket}'
+        _write(root, f'{hwmon}/name', f"{driver}\n")
+        _write(root, f'{hwmon}/temp1_label', f"Package id {socket}\n")
+        _write(root, f'{hwmon}/temp1_input', f"{55000 + socket * 2000}\n")
+        for core in range(cores_per_socket):
+            _write(root, f'{hwmon}/temp{core + 2}_label', f"Core {core}\n")
+            _write(root, f'{hwmon}/temp{core + 2}_input', f"{48000 + (core * 37) % 15000}\n")
+
+def _write_gpu(root, slot, vendor_id, device_id, vendor, device, driver):
+    device_dir = f'/sys/bus/pci/devices/{slot}'
+    _write(root, f'{device_dir}/class', "0x030000\n")
+    _write(root, f'{device_dir}/vendor', f"0x{vendor_id:04x}\n")
+    _write(root, f'{device_dir}/device', f"0x{device_id:04x}\n")
+    _symlink(root, f'{device_dir}/driver', f'../../../bus/pci/drivers/{driver}')
+    _write(root, '/usr/share/hwdata/pci.ids',
+           f"# pci.ids fixture\n{vendor_id:04x}  {vendor}\n\t{device_id:04x}  {device}\n"
+           "10de  NVIDIA Corporation\n\t2204  GA102 [GeForce RTX 3090]\nC 00  Unclassified device\n")
+
+def build_laptop(root):
+    rng = random.Random("laptop")
+    _write_kernel(root, "thinkpad", "6.9.7-arch1-1", 18342.5)
+    _write_os_release(root, "Arch Linux")
+    _write_cpus(root, rng, "11th Gen Intel(R) Core(TM) i7-1165G7 @ 2.80GHz", 1, 4, 2)
+    _write_meminfo(root, 16 * 1024 * 1024, 9 * 1024 * 1024)
+    _write_processes(root, rng, 300, ['bash', 'firefox', 'Isolated Web Co', 'pipewire', 'systemd', 'kworker/u16:2'],
+                     uid_names=['systemd', 'gnome-shell', 'Xwayland'])
+    _write_disks(root, rng, ['nvme0n1'])
+    _write_interfaces(root, rng, ['wlp0s20f3'], ['docker0'], 'wlp0s20f3', "2a02044000010000")
+    _write_hwmon(root, 'coretemp', 1, 4)
+    _write_gpu(root, '0000:00:02.0', 0x8086, 0x9a49, "Intel Corporation", "TigerLake-LP GT2 [Iris Xe Graphics]", 'i915')
+    _write(root, '/sys/class/power_supply/BAT0/capacity', "76\n")
+    _write(root, '/sys/class/power_supply/BAT0/status', "Discharging\n")
+    _write(root, '/sys/class/power_supply/BAT0/energy_now', "38000000\n")
+    _write(root, '/sys/class/power_supply/BAT0/energy_full', "50000000\n")
+    _write(root, '/sys/class/power_supply/BAT0/power_now', "9500000\n")
+    _write(root, '/sys/class/power_supply/AC/online', "0\n")
+    for index in range(1200):
+        os.makedirs(os.path.join(root, f'var/lib/pacman/local/package-{index}-1.0-1'))
+    _write(root, '/home/user/.config/gtk-3.0/settings.ini', "[Settings]\ngtk-theme-name=Adwaita-dark\n")
+
+def laptop_spec(root):
+    return {
+        'env': {
+            'HOME': os.path.join(root, 'home/user'),
+            'XDG_CONFIG_HOME': os.path.join(root, 'home/user/.config'),
+            'XDG_CURRENT_DESKTOP': 'GNOME', 'XDG_SESSION_TYPE': 'wayland',
+            'USER': 'user', 'SHELL': '/bin/zsh', 'TERM': 'xterm-kitty',
+        },
+        # No dconf database in the tree, so the keys not set in settings.ini
+        # come from one gsettings call
+        'commands': {
+            ('gsettings', 'list-recursively', 'org.gnome.desktop.interface'):
+                "org.gnome.desktop.interface gtk-theme 'Adwaita'\n"
+                "org.gnome.desktop.interface icon-theme 'Adwaita'\n"
+                "org.gnome.desktop.interface font-name 'Cantarell 11'\n",
+        },
+    }
+
+def build_server(root):
+    rng = random.Random("server")
+    _write_kernel(root, "db-07", "5.14.0-427.el9.x86_64", 8640000.0)
+    _write_os_release(root, "Rocky Linux 9.4 (Blue Onyx)")
+    _write_cpus(root, rng, "Intel(R) Xeon(R) Platinum 8358 CPU @ 2.60GHz", 2, 64, 2)
+    _write_meminfo(root, 1024 * 1024 * 1024, 600 * 1024 * 1024)
+    _write_processes(root, rng, 5000, ['postgres', 'kworker/u512:1', 'ksoftirqd/42', 'migration/7',
+                                       'sshd', 'systemd-journal', 'node_exporter', 'rcu_preempt'])
+    disks = [f'sd{chr(ord("a") + index)}' for index in range(24)]
+    _write_disks(root, rng, disks, stacked=[('md0', disks[1:])])
+    _write_interfaces(root, rng, ['eno1', 'eno2', 'ens2f0', 'ens2f1'], ['bond0'], 'bond0', "20010db8000000aa")
+    _write_hwmon(root, 'coretemp', 2, 64)
+    _write_gpu(root, '0000:03:00.0', 0x1a03, 0x2000, "ASPEED Technology, Inc.", "ASPEED Graphics Family", 'ast')
+    db_path = os.path.join(root, 'var/lib/rpm/rpmdb.sqlite')
+    os.makedirs(os.path.dirname(db_path), exist_ok=True)
+    with sqlite3.connect(db_path) as conn:
+        conn.execute("CREATE TABLE Packages (hnum INTEGER PRIMARY KEY, blob BLOB)")
+        conn.executemany("INSERT INTO Packages (blob) VALUES (?)", ((b"x" * 64,) for _ in range(2500)))
+    conn.close()
+
+def server_spec(root):
+    return {'env': {'USER': 'root', 'SHELL': '/bin/bash', 'TERM': 'xterm-256color'}, 'commands': {}}
+
+def build_container_host(root):
+    rng = random.Random("container-host")
+    _write_kernel(root, "k8s-node-12", "6.1.0-21-amd64", 1209600.0)
+    _write_os_release(root, "Debian GNU/Linux 12 (bookworm)")
+    _write_cpus(root, rng, "AMD EPYC 7543 32-Core Processor", 1, 32, 2)
+    _write_meminfo(root, 256 * 1024 * 1024, 90 * 1024 * 1024)
+    _write_processes(root, rng, 1500, ['containerd-shim', 'pause', 'nginx', 'java', 'kubelet', 'containerd'])
+    _write_disks(root, rng, ['nvme0n1', 'nvme1n1'])
+    veths = [f"veth{rng.getrandbits(28):07x}" for _ in range(300)]
+    bridges = [f"br-{rng.getrandbits(48):012x}" for _ in range(20)]
+    _write_interfaces(root, rng, ['enp65s0f0'], ['docker0', 'cni0', 'flannel.1'] + bridges + veths,
+                      'enp65s0f0', "2a01048000000000")
+    _write(root, '/sys/class/hwmon/hwmon2/name', "k10temp\n")
+    _write(root, '/sys/class/hwmon/hwmon2/temp1_label', "Tctl\n")
+    _write(root, '/sys/class/hwmon/hwmon2/temp1_input', "61250\n")
+    for ccd in range(1, 5):
+        _write(root, f'/sys/class/hwmon/hwmon2/temp{ccd + 2}_label', f"Tccd{ccd}\n")
+        _write(root, f'/sys/class/hwmon/hwmon2/temp{ccd + 2}_input', f"{52000 + ccd * 750}\n")
+    status = []
+    for index in range(900):
+        state = "install ok installed" if index % 30 else "deinstall ok config-files"
+        status.append(f"Package: package-{index}\nStatus: {state}\nPriority: optional\nSection: misc\n"
+                      f"Installed-Size: {rng.randint(10, 50000)}\nVersion: 1.{index}\n"
+                      f"Description: fixture package {index}\n some longer description text\n")
+    _write(root, '/var/lib/dpkg/status', "\n".join(status))
+
+def container_host_spec(root):
+    return {'env': {'USER': 'admin', 'SHELL': '/bin/bash', 'TERM': 'screen-256color'}, 'commands': {}}
+
+FIXTURES = {
+    # name: (tree builder, spec)
+    'laptop': (build_laptop, laptop_spec),
+    'server': (build_server, server_spec),
+    'container-host': (build_container_host, container_host_spec),
+}
+
+def prepare_fixture(name, directory):
+    """
+    Builds fixture `name` under `directory` unless an up-to-date copy is
+    already there, and returns (root, spec) where spec holds the fixture's
+    'env' and recorded 'commands'. Building is deterministic, so a kept copy
+    stays valid until FIXTURE_VERSION changes.
+    """
+    import shutil
+    build, spec = FIXTURES[name]
+    root = os.path.join(directory, name)
+    version_path = os.path.join(root, VERSION_FILE)
+    try:
+        with open(version_path) as f:
+            up_to_date = f.read() == FIXTURE_VERSION
+    except OSError:
+        up_to_date = False
+    if not up_to_date:
+        shutil.rmtree(root, ignore_errors=True)
+        os.makedirs(root)
+        build(root)
+        with open(version_path, 'w') as f:
+            f.write(FIXTURE_VERSION)
+    return root, spec(root)
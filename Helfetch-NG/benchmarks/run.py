@@ -0,0 +1,255 @@
+# benchmarks/run.py
+
+import argparse
+import contextlib
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+
+from benchmarks.fixtures import FIXTURES, prepare_fixture
+from core.registry import COLLECTORS, FIELD_REGISTRY, load_collector
+from utils.cache import set_cache_enabled
+from utils.host import use_host
+
+# Runs every collector against each fixture host tree (see fixtures.py) and
+# reports, per collector: wall time over several runs, peak memory allocated
+# by one run (tracemalloc), and how many commands a run spawns. Between runs
+# the state a collector carries within one process (the previous process
+# scan, the start-of-run samples) is reset, so every run does the work of a
+# fresh `helfetch` invocation.
+#
+#   python3 -m benchmarks.run                       # all fixtures
+#   python3 -m benchmarks.run --save baseline.json  # record a baseline
+#   python3 -m benchmarks.run --baseline baseline.json
+#
+# With --baseline, a collector whose median time grew by more than
+# --tolerance (and by at least NOISE_FLOOR_MS) is reported as a regression
+# and the exit status is 1.
+
+DEFAULT_REPEAT = 5
+DEFAULT_TOLERANCE = 0.25
+NOISE_FLOOR_MS = 1.0
+COLLECTOR_OPTIONS = {
+    # Benchmarks never touch the network
+    'network': {'offline': True},
+}
+# Session variables of the machine running the benchmarks, cleared so they
+# do not leak into the fixtures
+SESSION_VARIABLES = (
+    'DISPLAY', 'WAYLAND_DISPLAY', 'XDG_CURRENT_DESKTOP', 'XDG_SESSION_TYPE', 'XDG_CONFIG_HOME',
+    'SWAYSOCK', 'HYPRLAND_INSTANCE_SIGNATURE', 'NIRI_SOCKET', 'I3SOCK', 'BSPWM_SOCKET', 'COLORTERM',
+)
+
+class RecordedRunner:
+    """
+    A command runner (see utils.host) that answers from recorded output and
+    counts the calls. Commands without a recording behave as not installed.
+    """
+
+    def __init__(self, commands):
+        self.commands = commands
+        self.calls = 0
+
+    def __call__(self, args, timeout=None):
+        self.calls += 1
+        try:
+            return self.commands[tuple(args)]
+        except KeyError:
+            raise FileNotFoundError(f"no recorded output for {' '.join(args)}") from None
+
+@contextlib.contextmanager
+def count_spawned_processes():
+    """
+    Counts processes started through subprocess.Popen, i.e. commands run
+    without going through utils.host.run_command. Yields a one-item list.
+    """
+    import subprocess
+    original_init = subprocess.Popen.__init__
+    count = [0]
+
+    def counting_init(self, *args, **kwargs):
+        count[0] += 1
+        original_init(self, *args, **kwargs)
+
+    subprocess.Popen.__init__ = counting_init
+    try:
+        yield count
+    finally:
+        subprocess.Popen.__init__ = original_init
+
+@contextlib.contextmanager
+def fixture_environment(env, state_dir):
+    """Applies a fixture's environment, with cache and state under `state_dir`."""
+    changes = dict.fromkeys(SESSION_VARIABLES)
+    changes.update(env)
+    changes['XDG_CACHE_HOME'] = os.path.join(state_dir, 'cache')
+    changes['XDG_STATE_HOME'] = os.path.join(state_dir, 'state')
+    previous = {name: os.environ.get(name) for name in changes}
+
+    def apply(values):
+        for name, value in values.items():
+            if value is None:
+                os.environ.pop(name, None)
+            else:
+                os.environ[name] = value
+
+    apply(changes)
+    try:
+        yield
+    finally:
+        apply(previous)
+
+def reset_process_state():
+    """
+    Forgets what the collectors keep between calls in one process, and
+    takes the start-of-run samples, as a fresh invocation would.
+    """
+    from core import pci_ids, process_scan, sampler
+    process_scan._previous_snapshot = None
+    pci_ids._index = None
+    sampler._stacked_devices.clear()
+    sampler.start_cpu_sample()
+    sampler.start_io_sample()
+
+def collector_fields(name):
+    return [field for field, entry in FIELD_REGISTRY.items() if entry['collector'] == name]
+
+def benchmark_collector(name, runner, repeat):
+    """
+    Times collector `name` over `repeat` runs, then measures one more run
+    under tracemalloc. Returns a result dict.
+    """
+    collector = load_collector(name)
+    fields = collector_fields(name)
+    options = COLLECTOR_OPTIONS.get(name, {})
+
+    times = []
+    runner.calls = 0
+    with count_spawned_processes() as spawned:
+        for _ in range(repeat):
+            reset_process_state()
+            start = time.perf_counter()
+            collector(fields=fields, raw={}, **options)
+            times.append((time.perf_counter() - start) * 1000)
+    commands = runner.calls
+
+    reset_process_state()
+    tracemalloc.start()
+    try:
+        collector(fields=fields, raw={}, **options)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    return {
+        'collector': name,
+        'fields': len(fields),
+        'median_ms': statistics.median(times),
+        'min_ms': min(times),
+        'peak_kib': peak / 1024,
+        'commands': commands / repeat,
+        'stray_processes': spawned[0] / repeat,
+    }
+
+def benchmark_fixture(name, fixtures_dir, collectors, repeat, warm=False):
+    """
+    Runs the selected collectors against fixture `name`. With `warm`, the
+    fact cache is enabled and primed first, measuring repeat runs instead of
+    first runs. Returns (fixture root, [result dicts]).
+    """
+    root, spec = prepare_fixture(name, fixtures_dir)
+    runner = RecordedRunner(spec['commands'])
+    results = []
+    with tempfile.TemporaryDirectory(prefix='helfetch-bench-') as state_dir, \
+            fixture_environment(spec['env'], state_dir), use_host(root, runner):
+        set_cache_enabled(warm)
+        try:
+            for collector in collectors:
+                if warm:
+                    reset_process_state()
+                    load_collector(collector)(fields=collector_fields(collector), **COLLECTOR_OPTIONS.get(collector, {}))
+                results.append(benchmark_collector(collector, runner, repeat))
+        finally:
+            set_cache_enabled(True)
+    return root, results
+
+def find_regressions(results, baseline, tolerance):
+    """
+    Returns [(fixture, collector, baseline ms, current ms)] for collectors
+    whose median time grew beyond `tolerance` compared to `baseline`.
+    """
+    regressions = []
+    for fixture, rows in results.items():
+        previous = {row['collector']: row for row in baseline.get(fixture, [])}
+        for row in rows:
+            before = previous.get(row['collector'])
+            if before is None:
+                continue
+            growth = row['median_ms'] - before['median_ms']
+            if growth > NOISE_FLOOR_MS and row['median_ms'] > before['median_ms'] * (1 + tolerance):
+                regressions.append((fixture, row['collector'], before['median_ms'], row['median_ms']))
+    return regressions
+
+def format_results(fixture, root, rows):
+    lines = [f"{fixture} ({root})",
+             f"  {'collector':<10} {'fields':>6} {'median ms':>10} {'min ms':>9} {'peak KiB':>9} {'commands':>9}"]
+    for row in rows:
+        lines.append(f"  {row['collector']:<10} {row['fields']:>6} {row['median_ms']:>10.2f} {row['min_ms']:>9.2f} "
+                     f"{row['peak_kib']:>9.1f} {row['commands']:>9.1f}")
+        if row['stray_processes']:
+            lines.append(f"  ! {row['collector']} started {row['stray_processes']:.1f} processes per run "
+                         "outside utils.host.run_command")
+    return "\n".join(lines)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python3 -m benchmarks.run",
+                                     description="Benchmark the collectors against fixture host trees.")
+    parser.add_argument("--fixture", action="append", choices=list(FIXTURES),
+                        help="Fixture to run (repeatable; default: all).")
+    parser.add_argument("--collector", action="append", choices=list(COLLECTORS),
+                        help="Collector to run (repeatable; default: all).")
+    parser.add_argument("--repeat", type=int, default=DEFAULT_REPEAT, help="Timed runs per collector.")
+    parser.add_argument("--warm", action="store_true",
+                        help="Measure runs with a primed fact cache instead of first runs.")
+    parser.add_argument("--fixtures-dir", default=os.path.join(tempfile.gettempdir(), "helfetch-ng-fixtures"),
+                        help="Where fixture trees are built and kept between benchmark runs.")
+    parser.add_argument("--json", action="store_true", help="Print the results as JSON.")
+    parser.add_argument("--save", metavar="FILE", help="Write the results to FILE as a baseline.")
+    parser.add_argument("--baseline", metavar="FILE", help="Compare against a saved baseline.")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE,
+                        help="Allowed median growth over the baseline, as a fraction.")
+    args = parser.parse_args(argv)
+    if args.repeat < 1:
+        parser.error("--repeat must be at least 1")
+
+    fixtures = args.fixture or list(FIXTURES)
+    collectors = args.collector or list(COLLECTORS)
+    results = {}
+    for fixture in fixtures:
+        root, rows = benchmark_fixture(fixture, args.fixtures_dir, collectors, args.repeat, args.warm)
+        results[fixture] = rows
+        if not args.json:
+            print(format_results(fixture, root, rows))
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+    if args.save:
+        with open(args.save, 'w') as f:
+            json.dump(results, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        regressions = find_regressions(results, baseline, args.tolerance)
+        for fixture, collector, before, after in regressions:
+            print(f"REGRESSION {fixture}/{collector}: {before:.2f} ms -> {after:.2f} ms", file=sys.stderr)
+        if regressions:
+            return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
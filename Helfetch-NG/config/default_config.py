@@ -6,3 +6,89 @@ DEFAULT_COLORS = {
     "logo_color": "light_cyan",
     "quote_color": "light_green" # لون جديد للاقتباس
 }
+
+# Cache slow-changing facts (CPU model, GPU, OS name, package count) under
+# $XDG_CACHE_HOME/helfetch-ng so repeated runs skip re-collecting them.
+CACHE_ENABLED = True
+
+# Persist the last CPU sample under $XDG_STATE_HOME/helfetch-ng so back-to-back
+# runs can report CPU usage since the previous run without waiting.
+PERSIST_CPU_SAMPLE = True
+
+# Likewise for the /proc/diskstats and /proc/net/dev sample behind the
+# Disk I/O, Disks, Bandwidth Usage and Interfaces rates.
+PERSIST_IO_SAMPLE = True
+
+# Top Processes: how many to show and how to rank them ('cpu', 'rss' or 'io').
+TOP_PROCESSES_COUNT = 5
+TOP_PROCESSES_SORT = "cpu"
+
+# Target for interpreter start to first byte of output, checked by --startup-profile.
+STARTUP_BUDGET_MS = 150
+
+# Fields to show (None = all) and fields to hide; see FIELD_REGISTRY in
+# core/registry.py for the names. --fields/--exclude override these.
+DEFAULT_FIELDS = None
+EXCLUDED_FIELDS = []
+
+# Public IP / ISP / location lookup. Results are cached for PUBLIC_IP_TTL
+# seconds per network (default-route interface + local IP). With
+# OFFLINE_MODE no socket is opened and only the cache is used.
+PUBLIC_IP_ENDPOINT = "http://ip-api.com/json/"
+PUBLIC_IP_TTL = 3600
+PUBLIC_IP_TIMEOUT = 2
+OFFLINE_MODE = False
+
+# Print fields as soon as they are collected (same as --stream).
+STREAM_OUTPUT = False
+
+# Worker threads collecting fields in parallel. Every field is its own task
+# (see core/scheduler.py); more workers than fields bring nothing.
+COLLECTION_WORKERS = 8
+
+# External commands (gsettings, rpm on Berkeley DB systems) get
+# COMMAND_TIMEOUT seconds each, and all commands of one collection run must
+# be done COMMAND_RUN_DEADLINE seconds after it started. A command past its
+# deadline is killed with its whole process group and its field shows
+# 'timeout'. At most MAX_CONCURRENT_COMMANDS run at once.
+COMMAND_TIMEOUT = 3
+COMMAND_RUN_DEADLINE = 5
+MAX_CONCURRENT_COMMANDS = 4
+
+# Background daemon (--daemon). Volatile fields are refreshed every
+# DAEMON_VOLATILE_REFRESH seconds, the rest every DAEMON_STATIC_REFRESH.
+# Clients ignore snapshots older than DAEMON_MAX_STALENESS seconds and
+# give up on an unresponsive daemon after DAEMON_CLIENT_TIMEOUT seconds.
+DAEMON_CLIENT_ENABLED = True
+DAEMON_VOLATILE_REFRESH = 2
+DAEMON_STATIC_REFRESH = 300
+DAEMON_MAX_STALENESS = 30
+DAEMON_CLIENT_TIMEOUT = 0.2
+
+# Default output format (same as --format): "text", or "json"/"ndjson" for
+# typed machine-readable values without colors, logo or quote.
+OUTPUT_FORMAT = "text"
+
+# Metric history (same as --record / --history). When recording, each run or
+# watch tick appends CPU, RAM, disk I/O and bandwidth readings to a ring
+# buffer file under $XDG_STATE_HOME/helfetch-ng capped at HISTORY_MAX_BYTES
+# (about 56 bytes per sample), at most one sample per HISTORY_MIN_INTERVAL
+# seconds. HISTORY_WINDOW ("hour", "day" or None) shows a sparkline of
+# HISTORY_SPARKLINE_WIDTH characters with min/avg/max next to each metric.
+HISTORY_RECORD = False
+HISTORY_WINDOW = None
+HISTORY_MAX_BYTES = 4 * 1024 * 1024
+HISTORY_MIN_INTERVAL = 10
+HISTORY_SPARKLINE_WIDTH = 12
+
+# Interfaces table (same as --interfaces / --expand-interfaces): shell globs
+# selecting interfaces by name (None = all but loopback), and whether virtual
+# interfaces sharing a name prefix (veth*, br-*...) are collapsed into one row.
+INTERFACE_PATTERNS = None
+COLLAPSE_VIRTUAL_INTERFACES = True
+
+# Text layout: values longer than the terminal ($COLUMNS or the terminal's
+# width) are either wrapped onto indented continuation lines ("wrap") or cut
+# with an ellipsis ("truncate"). Output that is not going to a terminal is
+# never wrapped unless COLUMNS is set.
+LAYOUT_OVERFLOW = "wrap"
@@ -1,5 +1,54 @@
 # core/analysis.py
 
+# Usage rules shared by the per-host check below and the fleet-wide one in
+# core/fleet.py: for each field, (threshold, recommendation) tiers from the
+# highest threshold down; a host gets the first tier its value exceeds.
+USAGE_RULES = [
+    ('RAM Usage %', [
+        (85, "RAM usage is very high. Consider closing unnecessary applications or upgrading your RAM for better performance."),
+        (70, "RAM usage is high. You might experience performance slowdowns with many open applications."),
+    ]),
+    ('CPU Usage', [
+        (90, "CPU usage is extremely high. Your system might be struggling with current tasks. Check running processes."),
+        (75, "CPU usage is consistently high. This could indicate a demanding application or background process."),
+    ]),
+    ('Disk', [
+        (90, "Disk space is critically low. Freeing up space can improve system responsiveness."),
+        (80, "Disk space is running low. Consider archiving or deleting old files."),
+    ]),
+]
+
+# Kernels with a lower major version are reported as outdated. This is a very
+# basic check; a real-world scenario would need to check against a database
+# of latest stable kernels.
+OLD_KERNEL_MAJOR = 5
+OLD_KERNEL_RECOMMENDATION = ("Your kernel version ({kernel}) might be outdated. Consider updating for "
+                             "better performance, security, and hardware compatibility.")
+OPTIMAL_RECOMMENDATION = "Your system appears to be running optimally. Keep up the good work!"
+
+def parse_usage_percent(value):
+    """
+    Parses a usage value such as "45.0%" or 45.0 into a float, or None.
+    """
+    if isinstance(value, (int, float)):
+        return float(value)
+    try:
+        return float(str(value).replace('%', ''))
+    except ValueError:
+        return None
+
+def get_kernel_major(kernel_version):
+    """
+    Returns the major version of a Linux kernel string, or None if it is
+    not one the kernel rule applies to.
+    """
+    if not kernel_version or kernel_version == 'N/A' or "linux" not in kernel_version.lower():
+        return None
+    try:
+        return int(kernel_version.split('.')[0])
+    except ValueError:
+        return None
+
 def get_performance_recommendations(system_data):
     """
     Analyzes system data and provides performance recommendations.
@@ -7,60 +56,26 @@ def get_performance_recommendations(system_data):
     """
     recommendations = []
 
-    # RAM Analysis
-    ram_usage_percent_str = system_data.get('RAM Usage %', 'N/A').replace('%', '')
-    if ram_usage_percent_str != 'N/A':
-        try:
-            ram_usage_percent = float(ram_usage_percent_str)
-            if ram_usage_percent > 85:
-                recommendations.append("RAM usage is very high. Consider closing unnecessary applications or upgrading your RAM for better performance.")
-            elif ram_usage_percent > 70:
-                recommendations.append("RAM usage is high. You might experience performance slowdowns with many open applications.")
-        except ValueError:
-            pass
-
-    # CPU Analysis (assuming 'CPU Usage' is like "50.0%")
-    cpu_usage_str = system_data.get('CPU Usage', 'N/A').replace('%', '')
-    if cpu_usage_str != 'N/A':
-        try:
-            cpu_usage = float(cpu_usage_str)
-            if cpu_usage > 90:
-                recommendations.append("CPU usage is extremely high. Your system might be struggling with current tasks. Check running processes.")
-            elif cpu_usage > 75:
-                recommendations.append("CPU usage is consistently high. This could indicate a demanding application or background process.")
-        except ValueError:
-            pass
+    # RAM, CPU and Disk usage (values like "50.0%")
+    for field, tiers in USAGE_RULES:
+        usage = parse_usage_percent(system_data.get(field, 'N/A'))
+        if usage is None:
+            continue
+        for threshold, recommendation in tiers:
+            if usage > threshold:
+                recommendations.append(recommendation)
+                break
 
-    # Disk Analysis (assuming 'Disk' is like "80%")
-    disk_usage_str = system_data.get('Disk', 'N/A').replace('%', '')
-    if disk_usage_str != 'N/A':
-        try:
-            disk_usage = float(disk_usage_str)
-            if disk_usage > 90:
-                recommendations.append("Disk space is critically low. Freeing up space can improve system responsiveness.")
-            elif disk_usage > 80:
-                recommendations.append("Disk space is running low. Consider archiving or deleting old files.")
-        except ValueError:
-            pass
-            
     # Kernel Analysis (suggesting updates if older)
     kernel_version = system_data.get('Kernel', 'N/A')
-    if kernel_version != 'N/A' and "linux" in kernel_version.lower():
-        # This is a very basic check. A real-world scenario would need to
-        # check against a database of latest stable kernels.
-        # For demonstration, let's assume anything below 5.10 is "old" for modern systems.
-        try:
-            major_kernel_version = int(kernel_version.split('.')[0])
-            if major_kernel_version < 5: # Arbitrary old version threshold
-                 recommendations.append(f"Your kernel version ({kernel_version}) might be outdated. Consider updating for better performance, security, and hardware compatibility.")
-        except ValueError:
-            pass
-
+    major_kernel_version = get_kernel_major(kernel_version)
+    if major_kernel_version is not None and major_kernel_version < OLD_KERNEL_MAJOR:
+        recommendations.append(OLD_KERNEL_RECOMMENDATION.format(kernel=kernel_version))
 
     # No recommendations
     if not recommendations:
-        recommendations.append("Your system appears to be running optimally. Keep up the good work!")
-    
+        recommendations.append(OPTIMAL_RECOMMENDATION)
+
     return recommendations
 
 # For testing this module independently
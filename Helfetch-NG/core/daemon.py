@@ -0,0 +1,289 @@
+# core/daemon.py
+
+import json
+import os
+import re
+import stat
+import sys
+import threading
+import time
+
+from config.default_config import (
+    DAEMON_STATIC_REFRESH, DAEMON_VOLATILE_REFRESH, DAEMON_MAX_STALENESS, DAEMON_CLIENT_TIMEOUT
+)
+from core.registry import collect, filter_info, session_fields, volatile_fields
+from core.sampler import measure_cpu_usage, format_cpu_usage
+from utils.cache import save_facts
+from utils.helpers import APP_NAME
+
+# `helfetch --daemon` keeps the collectors warm and serves the latest snapshot
+# over a Unix socket; a normal `helfetch` run asks the socket first and only
+# collects directly when no daemon answers.
+#
+# Session fields (user, shell, terminal, desktop) describe the client's own
+# session, not the daemon's, so they are never served and the client always
+# collects them itself.
+#
+# A snapshot is only trusted if the process serving it runs as the client's
+# own user (or as root, for the system socket): anyone could otherwise
+# create the socket first and have their output shown as this machine's.
+
+SYSTEM_SOCKET_PATH = f"/run/{APP_NAME}.sock"
+SOCKET_NAME = f"{APP_NAME}.sock"
+REQUEST = b"SNAPSHOT\n"
+MAX_RESPONSE_SIZE = 1024 * 1024
+# Control characters other than newline (terminal escapes included), which
+# a served value must never carry to the client's terminal
+CONTROL_CHARACTERS = re.compile(r'[\x00-\x09\x0b-\x1f\x7f-\x9f]')
+
+def get_fallback_socket_dir():
+    """
+    Returns the per-user directory holding the socket when $XDG_RUNTIME_DIR
+    is unset (sudo, cron, ssh without pam_systemd): /tmp/helfetch-ng-UID,
+    which the daemon creates private to the user.
+    """
+    return f"/tmp/{APP_NAME}-{os.getuid()}"
+
+def get_socket_path(system=False):
+    """
+    Returns the daemon socket path: per-user in $XDG_RUNTIME_DIR (or in
+    get_fallback_socket_dir()), or the system-wide socket under /run.
+    """
+    if system:
+        return SYSTEM_SOCKET_PATH
+    runtime_dir = os.getenv('XDG_RUNTIME_DIR')
+    if runtime_dir:
+        return os.path.join(runtime_dir, SOCKET_NAME)
+    return os.path.join(get_fallback_socket_dir(), SOCKET_NAME)
+
+def trusted_uids(socket_path):
+    """Returns the uids a daemon on `socket_path` may run as."""
+    return (0,) if socket_path == SYSTEM_SOCKET_PATH else (os.getuid(),)
+
+def _peer_uid(connection):
+    """Returns the uid of the process on the other end of a Unix socket, or None."""
+    import socket
+    import struct
+    try:
+        credentials = connection.getsockopt(socket.SOL_SOCKET, socket.SO_PEERCRED, struct.calcsize('3i'))
+    except (AttributeError, OSError):
+        return None
+    return struct.unpack('3i', credentials)[1]
+
+def clean_served_value(value):
+    """Removes control characters from a string served by a daemon."""
+    return CONTROL_CHARACTERS.sub('', value) if isinstance(value, str) else value
+
+def fetch_snapshot(socket_path, timeout=DAEMON_CLIENT_TIMEOUT):
+    """
+    Asks a running daemon for its latest snapshot.
+    Returns the decoded snapshot dict, or None if no daemon answered in time,
+    the socket or the daemon belongs to an untrusted user (see
+    trusted_uids), or the snapshot is stale.
+    """
+    try:
+        socket_stat = os.lstat(socket_path)
+    except OSError:
+        return None # No daemon; avoid even importing socket
+    uids = trusted_uids(socket_path)
+    if not stat.S_ISSOCK(socket_stat.st_mode) or socket_stat.st_uid not in uids:
+        return None
+    import socket
+    try:
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as client:
+            client.settimeout(timeout)
+            client.connect(socket_path)
+            if _peer_uid(client) not in uids:
+                return None
+            client.sendall(REQUEST)
+            chunks = []
+            received = 0
+            while received < MAX_RESPONSE_SIZE:
+                chunk = client.recv(65536)
+                if not chunk:
+                    break
+                chunks.append(chunk)
+                received += len(chunk)
+        snapshot = json.loads(b"".join(chunks))
+    except (OSError, ValueError):
+        return None
+    if not isinstance(snapshot, dict) or time.time() - snapshot.get('updated', 0) > DAEMON_MAX_STALENESS:
+        return None
+    return snapshot
+
+def fetch_daemon_info(fields, collector_options=None, raw=None):
+    """
+    Builds the info dict for `fields` from a running daemon (per-user socket
+    first, then the system one), collecting only the session fields locally.
+    If `raw` is given, it receives the typed values as with registry.collect().
+    Returns None if no daemon can serve these fields with these options.
+    """
+    # Compare options the way they come back from the daemon, i.e. via JSON
+    options = json.loads(json.dumps(collector_options or {}))
+    local_fields = session_fields(fields)
+    served_fields = [name for name in fields if name not in local_fields]
+    for socket_path in (get_socket_path(), get_socket_path(system=True)):
+        snapshot = fetch_snapshot(socket_path)
+        if snapshot is None or snapshot.get('options') != options:
+            continue
+        if not set(served_fields) <= set(snapshot.get('fields', ())):
+            continue
+        info = {clean_served_value(key): clean_served_value(value) for key, value in snapshot.get('info', ())}
+        if raw is not None:
+            raw.update(snapshot.get('raw', {}))
+        if local_fields:
+            info.update(collect(local_fields, collector_options, raw=raw))
+        return filter_info(info, fields)
+    return None
+
+class SnapshotStore:
+    """
+    Holds the latest value of every served field and refreshes each field on
+    its own cadence: volatile fields every DAEMON_VOLATILE_REFRESH seconds,
+    everything else every DAEMON_STATIC_REFRESH seconds.
+    """
+
+    def __init__(self, fields, collector_options=None):
+        served = [name for name in fields if name not in session_fields(fields)]
+        self.volatile = [name for name in volatile_fields(served) if name != 'CPU Usage']
+        self.static = [name for name in served if name not in volatile_fields(served)]
+        self.measure_cpu = 'CPU Usage' in served
+        self.fields = served
+        self.collector_options = collector_options or {}
+        self.lock = threading.Lock()
+        self.info = {}
+        self.raw = {}
+        self.updated = 0
+        self.encoded = b"{}"
+
+    def refresh(self, static=True):
+        """Re-collects the volatile fields (and the static ones if `static`)."""
+        fields = self.volatile + (self.static if static else [])
+        fresh_raw = {}
+        fresh = collect(fields, self.collector_options, raw=fresh_raw) if fields else {}
+        if self.measure_cpu:
+            cpu_usage = measure_cpu_usage(use_persisted=False, since_last_reading=True)
+            fresh['CPU Usage'] = format_cpu_usage(cpu_usage)
+            fresh_raw['CPU Usage'] = {'value': cpu_usage, 'unit': 'percent', 'collected_at': time.time()}
+        with self.lock:
+            self.info.update(fresh)
+            self.raw.update(fresh_raw)
+            self.updated = time.time()
+            # Encode once per refresh, not once per client
+            self.encoded = json.dumps({
+                'updated': self.updated,
+                'fields': self.fields,
+                'options': self.collector_options,
+                'info': list(self.info.items()),
+                'raw': self.raw,
+            }).encode()
+        if static:
+            save_facts() # Let clients that fall back to direct collection reuse our facts
+
+    def run_refresher(self, stop_event):
+        """Refresh loop run by the daemon's background thread."""
+        next_static = time.monotonic() + DAEMON_STATIC_REFRESH
+        while not stop_event.wait(DAEMON_VOLATILE_REFRESH):
+            refresh_static = time.monotonic() >= next_static
+            if refresh_static:
+                next_static += DAEMON_STATIC_REFRESH
+            try:
+                self.refresh(static=refresh_static)
+            except Exception:
+                pass # Keep serving the last good snapshot
+
+    def snapshot_bytes(self):
+        with self.lock:
+            return self.encoded
+
+def _prepare_socket_dir(socket_path):
+    """
+    Creates the fallback socket directory private to the user, and refuses
+    one that someone else created or made accessible to others.
+    """
+    directory = os.path.dirname(socket_path)
+    if directory != get_fallback_socket_dir():
+        return
+    try:
+        os.mkdir(directory, 0o700)
+    except FileExistsError:
+        pass
+    directory_stat = os.lstat(directory)
+    if not stat.S_ISDIR(directory_stat.st_mode) or directory_stat.st_uid != os.getuid() or \
+            stat.S_IMODE(directory_stat.st_mode) & 0o077:
+        raise RuntimeError(f"{directory} is not a directory private to this user; remove it and try again")
+
+def _remove_stale_socket(socket_path):
+    """Removes a socket file left behind by a daemon that is no longer running."""
+    import socket
+    if not os.path.lexists(socket_path):
+        return
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as probe:
+        try:
+            probe.connect(socket_path)
+        except OSError:
+            try:
+                os.unlink(socket_path)
+            except PermissionError:
+                raise RuntimeError(f"{socket_path} is owned by another user; cannot start the daemon there") from None
+            return
+    raise RuntimeError(f"a daemon is already listening on {socket_path}")
+
+def run_daemon(fields, collector_options=None, socket_path=None, system=False):
+    """
+    Collects `fields`, then serves snapshots on `socket_path` until interrupted.
+    The per-user socket is private to the user; the system socket is readable
+    by everyone, which is safe because session fields are never served.
+    Raises RuntimeError if the socket path cannot be used.
+    """
+    import socketserver
+
+    socket_path = socket_path or get_socket_path(system)
+    _prepare_socket_dir(socket_path)
+    _remove_stale_socket(socket_path)
+    store = SnapshotStore(fields, collector_options)
+    store.refresh(static=True)
+
+    class SnapshotHandler(socketserver.BaseRequestHandler):
+        def handle(self):
+            self.request.settimeout(DAEMON_CLIENT_TIMEOUT)
+            try:
+                self.request.recv(len(REQUEST))
+                self.request.sendall(store.snapshot_bytes())
+            except OSError:
+                pass
+
+    old_umask = os.umask(0o111 if system else 0o177)
+    try:
+        server = socketserver.ThreadingUnixStreamServer(socket_path, SnapshotHandler)
+    finally:
+        os.umask(old_umask)
+    server.daemon_threads = True
+
+    # Stop cleanly on SIGTERM too (service managers, `kill`), not just Ctrl+C
+    import signal
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+
+    stop_event = threading.Event()
+    refresher = threading.Thread(target=store.run_refresher, args=(stop_event,), daemon=True)
+    refresher.start()
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        stop_event.set()
+        server.server_close()
+        try:
+            os.unlink(socket_path)
+        except OSError:
+            pass
+
+# For testing this module independently
+if __name__ == "__main__":
+    snapshot = fetch_snapshot(get_socket_path())
+    if snapshot is None:
+        print("No daemon is running.")
+    else:
+        for key, value in snapshot['info']:
+            print(f"{clean_served_value(key)}: {clean_served_value(value)}")
@@ -1,122 +1,148 @@
 # core/desktop_info.py
 
 import os
-import subprocess
-import re
-def get_desktop_info():
+
+from utils.cache import shared_input
+from utils.helpers import make_field_filter
+from utils.trace import traced
+
+# Window managers and compositors by process name (as in /proc/[pid]/comm,
+# which the kernel truncates to 15 characters): display name, and the
+# session types they run in. Earlier entries win if several are running.
+WINDOW_MANAGER_PROCESSES = {
+    'sway': ('Sway', ('wayland',)),
+    'Hyprland': ('Hyprland', ('wayland',)),
+    'river': ('river', ('wayland',)),
+    'niri': ('niri', ('wayland',)),
+    'wayfire': ('Wayfire', ('wayland',)),
+    'labwc': ('labwc', ('wayland',)),
+    'cosmic-comp': ('COSMIC', ('wayland',)),
+    'weston': ('Weston', ('wayland',)),
+    'cage': ('Cage', ('wayland',)),
+    'kwin_wayland': ('KWin', ('wayland',)),
+    'kwin_x11': ('KWin', ('x11',)),
+    'gnome-shell': ('GNOME Shell', ('wayland', 'x11')),
+    'cinnamon': ('Muffin', ('x11', 'wayland')),
+    'marco': ('Marco', ('x11',)),
+    'xfwm4': ('Xfwm4', ('x11', 'wayland')),
+    'budgie-wm': ('Budgie WM', ('x11',)),
+    'gala': ('Gala', ('x11', 'wayland')),
+    'i3': ('i3', ('x11',)),
+    'bspwm': ('bspwm', ('x11',)),
+    'openbox': ('Openbox', ('x11',)),
+    'awesome': ('awesome', ('x11',)),
+    'dwm': ('dwm', ('x11',)),
+    'xmonad-x86_64-l': ('xmonad', ('x11',)),
+    'qtile': ('Qtile', ('x11', 'wayland')),
+    'herbstluftwm': ('herbstluftwm', ('x11',)),
+    'spectrwm': ('spectrwm', ('x11',)),
+    'fluxbox': ('Fluxbox', ('x11',)),
+    'icewm': ('IceWM', ('x11',)),
+    'jwm': ('JWM', ('x11',)),
+    'fvwm3': ('FVWM', ('x11',)),
+    'enlightenment': ('Enlightenment', ('x11', 'wayland')),
+    'compiz': ('Compiz', ('x11',)),
+    'metacity': ('Metacity', ('x11',)),
+    'mutter': ('Mutter', ('x11', 'wayland')),
+}
+# Window managers that announce their IPC socket in the environment, checked
+# in order (sway also sets I3SOCK for i3 compatibility)
+WINDOW_MANAGER_SOCKET_VARS = (
+    ('SWAYSOCK', 'Sway'),
+    ('HYPRLAND_INSTANCE_SIGNATURE', 'Hyprland'),
+    ('NIRI_SOCKET', 'niri'),
+    ('I3SOCK', 'i3'),
+    ('BSPWM_SOCKET', 'bspwm'),
+)
+# Window managers whose process may not be visible, by desktop
+DESKTOP_WINDOW_MANAGERS = {'GNOME': 'GNOME Shell', 'KDE': 'KWin'}
+SESSION_TYPE_NAMES = {'wayland': 'Wayland', 'x11': 'X11', 'tty': 'TTY'}
+
+def get_session_type():
     """
-    Collects information about the Desktop Environment (DE), Window Manager (WM),
-    GTK/Qt themes, icons, and fonts.
+    Returns 'wayland', 'x11' or 'tty' for the caller's session, from
+    XDG_SESSION_TYPE or else from the display the session can connect to:
+    a Wayland socket under $XDG_RUNTIME_DIR, or an X display.
     """
-    info = {}
-
-    # 1. Desktop Environment (DE)
-    # XDG_CURRENT_DESKTOP is the most reliable way on modern Linux DEs.
-    info['Desktop Environment'] = os.getenv('XDG_CURRENT_DESKTOP') or 'N/A'
+    session_type = os.getenv('XDG_SESSION_TYPE')
+    if session_type in SESSION_TYPE_NAMES:
+        return session_type
 
-    # 2. Window Manager (WM)
-    # WM usually corresponds to the DE, but can be separate (e.g., i3, bspwm).
-    # This is often found in the WM_NAME property via xprop, or specific env vars.
-    # We'll try to get it from XDG_CURRENT_DESKTOP first, then fallback to xprop if needed.
-    wm_name = 'N/A'
-    try:
-        # Check if a specific WM environment variable exists (e.g., for i3)
-        if os.getenv('I3SOCK'):
-            wm_name = 'i3'
-        elif os.getenv('BSPWM_SOCKET'):
-            wm_name = 'bspwm'
-        # More robust way using xprop (requires xorg-xprop package)
-        elif os.getenv('DISPLAY'): # Only run if a display is available
-            wm_output = subprocess.check_output(
-                ['xprop', '-root', '-notype', '_NET_WM_NAME'],
-                text=True, stderr=subprocess.DEVNULL
-            ).strip()
-            # Example: _NET_WM_NAME(UTF8) = "GNOME Shell"
-            match = re.search(r'\"([^\"]+)\"', wm_output)
-            if match:
-                wm_name = match.group(1)
-        
-        # If the DE itself is a WM (like GNOME Shell, KWin for KDE)
-        if info['Desktop Environment'] and 'GNOME' in info['Desktop Environment']:
-            wm_name = 'GNOME Shell'
-        elif info['Desktop Environment'] and 'KDE' in info['Desktop Environment']:
-            wm_name = 'KWin'
-        
-    except (subprocess.CalledProcessError, FileNotFoundError):
-        pass # xprop not found or display not available
+    wayland_display = os.getenv('WAYLAND_DISPLAY')
+    runtime_dir = os.getenv('XDG_RUNTIME_DIR')
+    if wayland_display:
+        socket_path = wayland_display if os.path.isabs(wayland_display) or not runtime_dir \
+            else os.path.join(runtime_dir, wayland_display)
+        if os.path.exists(socket_path):
+            return 'wayland'
+    if os.getenv('DISPLAY'):
+        return 'x11'
+    return 'tty'
 
-    info['Window Manager'] = wm_name
+@traced('window manager')
+def detect_window_manager(desktop_env, session_type):
+    """
+    Returns the name of the running window manager or compositor, or None.
+    Checks the IPC sockets window managers announce in the environment,
+    then the caller's processes against WINDOW_MANAGER_PROCESSES in one
+    /proc scan, then falls back to the desktop's own window manager.
+    No helper binary is run.
+    """
+    for variable, name in WINDOW_MANAGER_SOCKET_VARS:
+        if os.getenv(variable):
+            return name
 
-    # 3. GTK Theme (for GTK-based DEs like GNOME, XFCE, Cinnamon, MATE)
-    gtk_theme = 'N/A'
-    try:
-        # Check ~/.config/gtk-3.0/settings.ini
-        gtk3_config_path = os.path.expanduser('~/.config/gtk-3.0/settings.ini')
-        if os.path.exists(gtk3_config_path):
-            with open(gtk3_config_path, 'r') as f:
-                for line in f:
-                    if 'gtk-theme-name=' in line:
-                        gtk_theme = line.split('=')[1].strip()
-                        break
-        if gtk_theme == 'N/A': # Fallback for GTK2 or if not in settings.ini
-            # Attempt to use 'gsettings' for GNOME/Cinnamon/MATE
-            if os.getenv('XDG_CURRENT_DESKTOP') in ['GNOME', 'Cinnamon', 'MATE']:
-                gtk_theme = subprocess.check_output(
-                    ['gsettings', 'get', 'org.gnome.desktop.interface', 'gtk-theme'],
-                    text=True, stderr=subprocess.DEVNULL
-                ).strip().strip("'")
-    except (subprocess.CalledProcessError, FileNotFoundError):
-        pass
-    info['GTK Theme'] = gtk_theme if gtk_theme else 'N/A'
+    if session_type != 'tty':
+        from core.process_scan import find_processes
+        running = find_processes(WINDOW_MANAGER_PROCESSES, uid=os.getuid())
+        candidates = [name for name in WINDOW_MANAGER_PROCESSES if name in running]
+        # Prefer one that runs in this session type (e.g. not a nested X11 WM)
+        for process_name in candidates:
+            name, session_types = WINDOW_MANAGER_PROCESSES[process_name]
+            if session_type in session_types:
+                return name
+        if candidates:
+            return WINDOW_MANAGER_PROCESSES[candidates[0]][0]
 
+    for desktop, name in DESKTOP_WINDOW_MANAGERS.items():
+        if desktop in (desktop_env or ''):
+            return name
+    return None
 
-    # 4. Icon Theme
-    icon_theme = 'N/A'
-    try:
-        # Check ~/.config/gtk-3.0/settings.ini for GTK icon theme
-        gtk3_config_path = os.path.expanduser('~/.config/gtk-3.0/settings.ini')
-        if os.path.exists(gtk3_config_path):
-            with open(gtk3_config_path, 'r') as f:
-                for line in f:
-                    if 'gtk-icon-theme-name=' in line:
-                        icon_theme = line.split('=')[1].strip()
-                        break
-        if icon_theme == 'N/A': # Fallback using gsettings for GNOME-like DEs
-            if os.getenv('XDG_CURRENT_DESKTOP') in ['GNOME', 'Cinnamon', 'MATE']:
-                icon_theme = subprocess.check_output(
-                    ['gsettings', 'get', 'org.gnome.desktop.interface', 'icon-theme'],
-                    text=True, stderr=subprocess.DEVNULL
-                ).strip().strip("'")
-    except (subprocess.CalledProcessError, FileNotFoundError):
-        pass
-    info['Icons'] = icon_theme if icon_theme else 'N/A'
+def get_desktop_info(fields=None, raw=None):
+    """
+    Collects information about the Desktop Environment (DE), Window Manager (WM),
+    session type, GTK/Qt themes, icons, and fonts.
+    If `fields` is given, only those fields are collected.
+    All desktop fields are plain strings, so `raw` is accepted but left untouched.
+    """
+    wanted = make_field_filter(fields)
+    info = {}
+    desktop_env = os.getenv('XDG_CURRENT_DESKTOP')
 
+    # 1. Desktop Environment (DE)
+    if wanted('Desktop Environment'):
+        # XDG_CURRENT_DESKTOP is the most reliable way on modern Linux DEs.
+        info['Desktop Environment'] = desktop_env or 'N/A'
 
-    # 5. Font (GTK/System Font)
-    font_name = 'N/A'
-    try:
-        # Check ~/.config/gtk-3.0/settings.ini for GTK font
-        gtk3_config_path = os.path.expanduser('~/.config/gtk-3.0/settings.ini')
-        if os.path.exists(gtk3_config_path):
-            with open(gtk3_config_path, 'r') as f:
-                for line in f:
-                    if 'gtk-font-name=' in line:
-                        font_name = line.split('=')[1].strip()
-                        break
-        if font_name == 'N/A': # Fallback using gsettings for GNOME-like DEs
-            if os.getenv('XDG_CURRENT_DESKTOP') in ['GNOME', 'Cinnamon', 'MATE']:
-                font_name = subprocess.check_output(
-                    ['gsettings', 'get', 'org.gnome.desktop.interface', 'font-name'],
-                    text=True, stderr=subprocess.DEVNULL
-                ).strip().strip("'")
-    except (subprocess.CalledProcessError, FileNotFoundError):
-        pass
-    info['Font'] = font_name if font_name else 'N/A'
+    # 2. Window Manager (WM) and session type, without running any helper
+    # binary (see detect_window_manager)
+    if wanted('Window Manager') or wanted('Session Type'):
+        session_type = shared_input('session_type', get_session_type)
+        if wanted('Session Type'):
+            info['Session Type'] = SESSION_TYPE_NAMES[session_type]
+        if wanted('Window Manager'):
+            info['Window Manager'] = detect_window_manager(desktop_env, session_type) or 'N/A'
 
-    # Note: Getting accurate info for Qt themes, cursor, or specific details for
-    # non-GTK/GNOME environments (like pure Plasma/KDE without GTK apps) might
-    # require parsing different config files or using qt5ct/qt6ct settings.
-    # This current implementation focuses on common GTK-based setups.
+    # 3-6. Appearance settings, all read by one cached pass over the
+    # desktop's config files (see core.desktop_settings)
+    appearance_fields = {'GTK Theme': 'gtk_theme', 'Icons': 'icon_theme', 'Font': 'font', 'Qt Theme': 'qt_theme'}
+    if any(wanted(field) for field in appearance_fields):
+        from core.desktop_settings import get_desktop_settings
+        settings = shared_input('desktop_settings', lambda: get_desktop_settings(desktop_env))
+        for field, setting in appearance_fields.items():
+            if wanted(field):
+                info[field] = settings.get(setting) or 'N/A'
 
     return info
 
@@ -0,0 +1,236 @@
+# core/desktop_settings.py
+
+import os
+import struct
+import subprocess
+
+from utils.cache import cached_fact
+from utils.commands import TIMEOUT_VALUE
+from utils.helpers import get_mtime_key
+from utils.host import run_command
+from utils.trace import traced
+
+# One provider for the appearance settings (GTK theme, icon theme, font, Qt
+# style), so every desktop field is answered from a single pass over the
+# config files instead of one scan per field:
+#
+#   GNOME-family  the dconf user database, read directly (GVDB format)
+#   KDE Plasma    kdeglobals
+#   any desktop   GTK 3/4 settings.ini, ~/.gtkrc-2.0, qt6ct/qt5ct
+#
+# The result is cached with a key made of every source file's mtime, so runs
+# where nothing changed parse nothing. Only when a GNOME-family desktop has
+# keys no file sets (i.e. still at the schema default) is gsettings spawned,
+# once, for all of them.
+
+GNOME_FAMILY_INTERFACE_SCHEMAS = {
+    # XDG_CURRENT_DESKTOP component: (dconf directory, gsettings schema)
+    'GNOME': ('/org/gnome/desktop/interface/', 'org.gnome.desktop.interface'),
+    'Unity': ('/org/gnome/desktop/interface/', 'org.gnome.desktop.interface'),
+    'Budgie': ('/org/gnome/desktop/interface/', 'org.gnome.desktop.interface'),
+    'Pantheon': ('/org/gnome/desktop/interface/', 'org.gnome.desktop.interface'),
+    'X-Cinnamon': ('/org/cinnamon/desktop/interface/', 'org.cinnamon.desktop.interface'),
+    'Cinnamon': ('/org/cinnamon/desktop/interface/', 'org.cinnamon.desktop.interface'),
+    'MATE': ('/org/mate/interface/', 'org.mate.interface'),
+}
+# Setting: key in the GNOME-family interface schemas
+GSETTINGS_KEYS = {'gtk_theme': 'gtk-theme', 'icon_theme': 'icon-theme', 'font': 'font-name'}
+# Setting: key in GTK settings.ini / gtkrc-2.0
+GTK_KEYS = {'gtk_theme': 'gtk-theme-name', 'icon_theme': 'gtk-icon-theme-name', 'font': 'gtk-font-name'}
+SETTINGS = ('gtk_theme', 'icon_theme', 'font', 'qt_theme')
+
+def get_config_home():
+    return os.getenv('XDG_CONFIG_HOME') or os.path.expanduser('~/.config')
+
+def get_settings_paths():
+    """Returns {source: path} for every file the settings can come from."""
+    config_home = get_config_home()
+    return {
+        'gtk3': os.path.join(config_home, 'gtk-3.0', 'settings.ini'),
+        'gtk4': os.path.join(config_home, 'gtk-4.0', 'settings.ini'),
+        'gtk2': os.path.expanduser('~/.gtkrc-2.0'),
+        'kde': os.path.join(config_home, 'kdeglobals'),
+        'qt6ct': os.path.join(config_home, 'qt6ct', 'qt6ct.conf'),
+        'qt5ct': os.path.join(config_home, 'qt5ct', 'qt5ct.conf'),
+        'dconf': os.path.join(config_home, 'dconf', 'user'),
+    }
+
+def read_ini(path):
+    """
+    Parses an INI-style file into {section: {key: value}}; missing or
+    unreadable files give {}. Later duplicates win, as in GTK and Qt.
+    """
+    sections = {}
+    section = sections.setdefault('', {})
+    try:
+        with open(path, 'r', encoding='utf-8', errors='replace') as f:
+            for line in f:
+                line = line.strip()
+                if not line or line[0] in '#;':
+                    continue
+                if line.startswith('[') and line.endswith(']'):
+                    section = sections.setdefault(line[1:-1], {})
+                elif '=' in line:
+                    key, value = line.split('=', 1)
+                    section[key.strip()] = value.strip()
+    except OSError:
+        pass
+    return sections
+
+def read_gtkrc(path):
+    """Parses the top-level `key = "value"` lines of a gtkrc-2.0 file."""
+    return {key: value.strip('"') for key, value in read_ini(path).get('', {}).items()}
+
+def parse_qt_font(value):
+    """
+    Turns a Qt font string ("Noto Sans,10,-1,5,50,0,0,0,0,0") into "Noto Sans 10".
+    Binary @Variant values (written by some qt5ct versions) give None.
+    """
+    if not value or value.startswith('@Variant'):
+        return None
+    parts = value.strip('"').split(',')
+    return f"{parts[0]} {parts[1]}" if len(parts) > 1 and parts[1] else parts[0]
+
+def read_dconf_strings(path, directory):
+    """
+    Reads the string values stored under `directory` (e.g.
+    '/org/gnome/desktop/interface/') from a dconf database file, which uses
+    GLib's GVDB format: a header pointing at a hash table whose items name
+    one path segment each (chained by parent index) and point at GVariant
+    values. The items are walked in order, so no hashing is needed.
+    Returns {key: value}; {} if the file is missing or not understood.
+    """
+    try:
+        with open(path, 'rb') as f:
+            data = f.read()
+    except OSError:
+        return {}
+    if data[:8] == b'GVariant':
+        order = '<'
+    elif data[:8] == b'raVGtnai':
+        order = '>'
+    else:
+        return {}
+
+    try:
+        root_start, root_end = struct.unpack_from(order + 'II', data, 16)
+        bloom_words, buckets = struct.unpack_from(order + 'II', data, root_start)
+        items_start = root_start + 8 + (bloom_words & ((1 << 27) - 1)) * 4 + buckets * 4
+        item = struct.Struct(order + 'IIIHccII')
+        items = [item.unpack_from(data, offset)
+                 for offset in range(items_start, root_end - item.size + 1, item.size)]
+    except struct.error:
+        return {}
+
+    names = {}
+    def full_name(index):
+        if index not in names:
+            _, parent, key_start, key_size = items[index][:4]
+            prefix = full_name(parent) if parent < len(items) and parent != index else ''
+            names[index] = prefix + data[key_start:key_start + key_size].decode('utf-8', 'replace')
+        return names[index]
+
+    values = {}
+    for index, (_, _, _, _, value_type, _, start, end) in enumerate(items):
+        if value_type != b'v':
+            continue
+        try:
+            name = full_name(index)
+        except RecursionError:
+            continue
+        if not name.startswith(directory) or '/' in name[len(directory):]:
+            continue
+        # A serialized variant is the value, a NUL byte, then its type string
+        child, _, variant_type = data[start:end].rpartition(b'\0')
+        if variant_type == b's':
+            values[name[len(directory):]] = child.rstrip(b'\0').decode('utf-8', 'replace')
+    return values
+
+def query_gsettings(schema):
+    """
+    Reads every key of a gsettings schema with a single spawn. Returns
+    {key: value} with string quotes removed, or {} if gsettings fails.
+    Raises subprocess.TimeoutExpired if gsettings hangs (e.g. on a dead
+    D-Bus session) and was killed.
+    """
+    try:
+        output = run_command(['gsettings', 'list-recursively', schema], timeout=2)
+    except subprocess.TimeoutExpired:
+        raise
+    except (OSError, subprocess.SubprocessError):
+        return {}
+    values = {}
+    for line in output.splitlines():
+        parts = line.split(None, 2)
+        if len(parts) == 3 and parts[0] == schema:
+            values[parts[1]] = parts[2].strip("'")
+    return values
+
+def _gnome_family_schema(desktop_env):
+    for component in (desktop_env or '').split(':'):
+        if component in GNOME_FAMILY_INTERFACE_SCHEMAS:
+            return GNOME_FAMILY_INTERFACE_SCHEMAS[component]
+    return None
+
+@traced('desktop settings')
+def read_desktop_settings(desktop_env, paths=None):
+    """
+    Collects the appearance settings for `desktop_env` from all sources in one
+    pass. Returns {setting: value or None} for every entry of SETTINGS.
+    """
+    paths = paths or get_settings_paths()
+    settings = dict.fromkeys(SETTINGS)
+    is_kde = 'KDE' in (desktop_env or '')
+    gnome_schema = _gnome_family_schema(desktop_env)
+
+    def fill(values):
+        for setting, value in values.items():
+            if value and not settings[setting]:
+                settings[setting] = value
+
+    # The desktop's own settings store comes first...
+    if gnome_schema:
+        stored = read_dconf_strings(paths['dconf'], gnome_schema[0])
+        fill({setting: stored.get(key) for setting, key in GSETTINGS_KEYS.items()})
+    if is_kde:
+        kdeglobals = read_ini(paths['kde'])
+        fill({
+            'icon_theme': kdeglobals.get('Icons', {}).get('Theme'),
+            'font': parse_qt_font(kdeglobals.get('General', {}).get('font')),
+            'qt_theme': kdeglobals.get('KDE', {}).get('widgetStyle') or kdeglobals.get('General', {}).get('widgetStyle'),
+        })
+
+    # ...then the toolkit config files, newest toolkit first
+    for source in ('gtk3', 'gtk4'):
+        gtk = read_ini(paths[source]).get('Settings', {})
+        fill({setting: gtk.get(key) for setting, key in GTK_KEYS.items()})
+    gtkrc = read_gtkrc(paths['gtk2'])
+    fill({setting: gtkrc.get(key) for setting, key in GTK_KEYS.items()})
+    for source in ('qt6ct', 'qt5ct'):
+        qtct = read_ini(paths[source])
+        fill({
+            'qt_theme': qtct.get('Appearance', {}).get('style'),
+            'icon_theme': qtct.get('Appearance', {}).get('icon_theme'),
+            'font': parse_qt_font(qtct.get('Fonts', {}).get('general')),
+        })
+
+    # Keys still at their schema default are in no file; ask gsettings once
+    if gnome_schema and not all(settings[setting] for setting in GSETTINGS_KEYS):
+        try:
+            defaults = query_gsettings(gnome_schema[1])
+        except subprocess.TimeoutExpired:
+            defaults = dict.fromkeys(GSETTINGS_KEYS.values(), TIMEOUT_VALUE)
+        fill({setting: defaults.get(key) for setting, key in GSETTINGS_KEYS.items()})
+
+    return settings
+
+def get_desktop_settings(desktop_env):
+    """
+    Returns read_desktop_settings() for `desktop_env`, cached until one of
+    the source files changes (settings a timed-out gsettings left unknown
+    are not cached).
+    """
+    paths = get_settings_paths()
+    key = "|".join([desktop_env or ''] + [str(get_mtime_key(path)) for path in paths.values()])
+    return cached_fact('desktop_settings', key, lambda: read_desktop_settings(desktop_env, paths),
+                       cacheable=lambda settings: TIMEOUT_VALUE not in settings.values())
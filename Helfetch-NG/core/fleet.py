@@ -0,0 +1,348 @@
+# core/fleet.py
+
+import json
+import math
+import os
+from array import array
+from collections import Counter
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+from core.analysis import (
+    USAGE_RULES, OLD_KERNEL_MAJOR, OLD_KERNEL_RECOMMENDATION, OPTIMAL_RECOMMENDATION,
+    get_kernel_major, parse_usage_percent
+)
+
+# `helfetch aggregate <dir>` reads snapshots collected from many machines
+# (`helfetch --format json` documents, or `--format ndjson` lines) into one
+# column per field used, then computes fleet-wide distributions and runs the
+# core/analysis.py rules over whole columns at once.
+#
+# Only the columns below are kept, as flat typed arrays (8 bytes per host for
+# a number, 4 for a kernel, which is stored as an index into the distinct
+# kernel strings), so memory grows with the number of hosts, not with the
+# size of the snapshots. NumPy is used for the column operations when it is
+# installed; otherwise the same operations run over the plain arrays.
+
+SNAPSHOT_SUFFIXES = (".json", ".ndjson", ".jsonl")
+LINE_SUFFIXES = (".ndjson", ".jsonl")
+NUMERIC_COLUMNS = ('RAM Usage %', 'CPU Usage', 'Disk', 'Packages')
+RAM_PERCENTILES = (50, 90, 95, 99)
+PACKAGE_PERCENTILES = (0, 25, 50, 75, 100)
+# Disk fill above Q3 + DISK_OUTLIER_IQR * IQR is reported as an outlier.
+DISK_OUTLIER_IQR = 1.5
+NAN = float('nan')
+# Snapshot files per worker task when loading with several processes.
+LOAD_CHUNK_SIZE = 2000
+
+def _read_snapshot_lines(lines):
+    """
+    Yields (host, fields) from JSON lines: either whole snapshots, one per
+    line, or one field per line (ndjson), grouped back into snapshots by host.
+    A field repeating for a host starts that host's next snapshot.
+    """
+    pending = {}
+    for line in lines:
+        try:
+            record = json.loads(line)
+        except ValueError:
+            continue
+        if not isinstance(record, dict):
+            continue
+        if 'fields' in record:
+            yield record.get('host'), record['fields']
+            continue
+        host, field = record.get('host'), record.get('field')
+        if field is None:
+            continue
+        fields = pending.setdefault(host, {})
+        if field in fields:
+            yield host, fields
+            fields = pending[host] = {}
+        fields[field] = record
+    for host, fields in pending.items():
+        yield host, fields
+
+def find_snapshot_files(directory):
+    """
+    Returns the paths of all snapshot files under `directory`, sorted.
+    """
+    paths = []
+    for root, dirs, files in os.walk(directory):
+        dirs.sort()
+        paths.extend(os.path.join(root, name) for name in sorted(files)
+                     if name.endswith(SNAPSHOT_SUFFIXES))
+    return paths
+
+def iter_snapshots(paths):
+    """
+    Yields (host, fields) for every snapshot in the given files, reading
+    one file at a time. Unreadable or malformed files are skipped.
+    """
+    for path in paths:
+        try:
+            with open(path, 'rb') as f:
+                data = f.read()
+        except OSError:
+            continue
+        if path.endswith(LINE_SUFFIXES):
+            yield from _read_snapshot_lines(data.splitlines())
+            continue
+        try:
+            snapshot = json.loads(data)
+        except ValueError:
+            continue
+        if isinstance(snapshot, dict) and isinstance(snapshot.get('fields'), dict):
+            yield snapshot.get('host'), snapshot['fields']
+
+def _field_value(entry, key='value'):
+    """
+    Returns a field's typed value as a float, or NaN. Display strings from
+    older snapshots ("45.0%", "754 (DPKG)") are parsed on a best-effort basis.
+    """
+    value = entry.get(key) if isinstance(entry, dict) else entry
+    if value is None:
+        return NAN
+    if isinstance(value, str):
+        value = parse_usage_percent(value.split(' ', 1)[0])
+        if value is None:
+            return NAN
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return NAN
+
+class FleetColumns:
+    """
+    The fleet as columns: host names, kernel codes and one float array per
+    entry of NUMERIC_COLUMNS (NaN where a host did not report the field).
+    """
+
+    def __init__(self):
+        self.hosts = []
+        self.kernels = {}
+        self.kernel_codes = array('i')
+        self.values = {name: array('d') for name in NUMERIC_COLUMNS}
+
+    def __len__(self):
+        return len(self.hosts)
+
+    def append(self, host, fields):
+        """
+        Adds one snapshot's fields as a new row.
+        """
+        self.hosts.append(host or "unknown")
+
+        kernel = fields.get('Kernel')
+        kernel = kernel.get('value') if isinstance(kernel, dict) else kernel
+        if isinstance(kernel, str) and kernel != 'N/A':
+            self.kernel_codes.append(self.kernels.setdefault(kernel, len(self.kernels)))
+        else:
+            self.kernel_codes.append(-1)
+
+        row = {name: _field_value(fields.get(name)) for name in NUMERIC_COLUMNS}
+        ram = fields.get('RAM')
+        if math.isnan(row['RAM Usage %']) and isinstance(ram, dict):
+            used, total = _field_value(ram, 'used_bytes'), _field_value(ram, 'total_bytes')
+            if total > 0:
+                row['RAM Usage %'] = used / total * 100
+        for name, value in row.items():
+            self.values[name].append(value)
+
+    def extend(self, other):
+        """
+        Appends all rows of another FleetColumns, re-coding its kernels.
+        """
+        self.hosts.extend(other.hosts)
+        recode = {code: self.kernels.setdefault(kernel, len(self.kernels))
+                  for kernel, code in other.kernels.items()}
+        recode[-1] = -1
+        self.kernel_codes.extend(recode[code] for code in other.kernel_codes)
+        for name in NUMERIC_COLUMNS:
+            self.values[name].extend(other.values[name])
+
+    def vector(self, name):
+        """
+        Returns a numeric column as a NumPy array (sharing the column's
+        memory) if NumPy is available, else as the array itself.
+        """
+        if np is not None:
+            return np.frombuffer(self.values[name], dtype=np.float64)
+        return self.values[name]
+
+def _load_columns(paths):
+    columns = FleetColumns()
+    for host, fields in iter_snapshots(paths):
+        columns.append(host, fields)
+    return columns
+
+def load_fleet(directory, jobs=None):
+    """
+    Streams every snapshot under `directory` into a FleetColumns. Decoding
+    the JSON dominates, so with several CPUs the files are split into chunks
+    parsed by `jobs` worker processes (default: one per CPU), each sending
+    back only its columns.
+    """
+    paths = find_snapshot_files(directory)
+    jobs = min(jobs or os.cpu_count() or 1, len(paths) // LOAD_CHUNK_SIZE + 1)
+    if jobs <= 1:
+        return _load_columns(paths)
+
+    from concurrent.futures import ProcessPoolExecutor
+    columns = FleetColumns()
+    chunks = [paths[i:i + LOAD_CHUNK_SIZE] for i in range(0, len(paths), LOAD_CHUNK_SIZE)]
+    with ProcessPoolExecutor(max_workers=jobs) as executor:
+        for chunk_columns in executor.map(_load_columns, chunks):
+            columns.extend(chunk_columns)
+    return columns
+
+# Column operations, with NumPy or over plain sequences.
+
+def _greater(values, threshold):
+    if np is not None:
+        return values > threshold
+    return [value > threshold for value in values]
+
+def _and_not(mask, other):
+    if np is not None:
+        return mask & ~other
+    return [a and not b for a, b in zip(mask, other)]
+
+def _or(mask, other):
+    if np is not None:
+        return mask | other
+    return [a or b for a, b in zip(mask, other)]
+
+def _none(size):
+    if np is not None:
+        return np.zeros(size, dtype=bool)
+    return [False] * size
+
+def _count(mask):
+    if np is not None:
+        return int(np.count_nonzero(mask))
+    return sum(mask)
+
+def _percentiles(values, percents):
+    """
+    Returns {percent: value} over the non-NaN entries of `values` with
+    linear interpolation, or None if there are none.
+    """
+    if np is not None:
+        finite = values[~np.isnan(values)]
+        if not finite.size:
+            return None
+        return dict(zip(percents, (float(v) for v in np.percentile(finite, percents))))
+
+    finite = sorted(value for value in values if not math.isnan(value))
+    if not finite:
+        return None
+    result = {}
+    for percent in percents:
+        rank = (len(finite) - 1) * percent / 100
+        low = int(rank)
+        high = min(low + 1, len(finite) - 1)
+        result[percent] = finite[low] + (finite[high] - finite[low]) * (rank - low)
+    return result
+
+def get_kernel_distribution(columns):
+    """
+    Returns [(kernel, hosts)] for every kernel in the fleet, most common first.
+    """
+    if np is not None:
+        codes = np.frombuffer(columns.kernel_codes, dtype=np.int32)
+        counts = np.bincount(codes[codes >= 0], minlength=len(columns.kernels))
+    else:
+        tally = Counter(columns.kernel_codes)
+        counts = [tally[code] for code in range(len(columns.kernels))]
+    distribution = [(kernel, int(counts[code])) for kernel, code in columns.kernels.items()]
+    distribution.sort(key=lambda item: (-item[1], item[0]))
+    return distribution
+
+def get_disk_outliers(columns, limit):
+    """
+    Returns the disk fill fence (Q3 + 1.5 * IQR) and the hosts above it,
+    fullest first (at most `limit` of them), plus how many there are in total.
+    """
+    values = columns.vector('Disk')
+    quartiles = _percentiles(values, (25, 75))
+    if quartiles is None:
+        return None
+    fence = quartiles[75] + DISK_OUTLIER_IQR * (quartiles[75] - quartiles[25])
+    if np is not None:
+        indices = np.flatnonzero(values > fence)
+        indices = indices[np.argsort(-values[indices], kind='stable')]
+    else:
+        indices = sorted((index for index, value in enumerate(values) if value > fence),
+                         key=lambda index: -values[index])
+    return {
+        'fence': fence,
+        'count': len(indices),
+        'hosts': [(columns.hosts[index], float(values[index])) for index in indices[:limit]],
+    }
+
+def get_fleet_recommendations(columns, kernel_distribution=None):
+    """
+    Runs the get_performance_recommendations() rules over every host at
+    once and returns [(recommendation, hosts)] for each one that applies.
+    """
+    size = len(columns)
+    results = []
+    flagged = _none(size)
+
+    for field, tiers in USAGE_RULES:
+        values = columns.vector(field)
+        taken = _none(size)
+        for threshold, recommendation in tiers:
+            hits = _and_not(_greater(values, threshold), taken)
+            results.append((recommendation, _count(hits)))
+            taken = _or(taken, hits)
+        flagged = _or(flagged, taken)
+
+    # The kernel rule only depends on the kernel string, so it is decided once
+    # per distinct kernel and then applied to the hosts through their codes.
+    old_codes = []
+    for kernel, code in columns.kernels.items():
+        major = get_kernel_major(kernel)
+        if major is not None and major < OLD_KERNEL_MAJOR:
+            old_codes.append(code)
+    if old_codes:
+        if np is not None:
+            old = np.isin(np.frombuffer(columns.kernel_codes, dtype=np.int32), old_codes)
+        else:
+            old_set = set(old_codes)
+            old = [code in old_set for code in columns.kernel_codes]
+        flagged = _or(flagged, old)
+        for kernel, hosts in kernel_distribution or get_kernel_distribution(columns):
+            if columns.kernels[kernel] in old_codes:
+                results.append((OLD_KERNEL_RECOMMENDATION.format(kernel=kernel), hosts))
+
+    results.append((OPTIMAL_RECOMMENDATION, size - _count(flagged)))
+    return [(recommendation, hosts) for recommendation, hosts in results if hosts]
+
+def get_fleet_report(columns, limit=10):
+    """
+    Builds the fleet report: kernel versions, RAM usage percentiles, disk fill
+    outliers, package count spread and recommendation counts.
+    """
+    kernels = get_kernel_distribution(columns)
+    if np is not None:
+        # NaN (unreported) values never pass a threshold; don't warn about them
+        with np.errstate(invalid='ignore'):
+            recommendations = get_fleet_recommendations(columns, kernels)
+            disk_outliers = get_disk_outliers(columns, limit)
+    else:
+        recommendations = get_fleet_recommendations(columns, kernels)
+        disk_outliers = get_disk_outliers(columns, limit)
+    return {
+        'hosts': len(columns),
+        'kernels': kernels[:limit],
+        'kernel_count': len(kernels),
+        'ram_usage_percentiles': _percentiles(columns.vector('RAM Usage %'), RAM_PERCENTILES),
+        'disk_outliers': disk_outliers,
+        'packages': _percentiles(columns.vector('Packages'), PACKAGE_PERCENTILES),
+        'recommendations': recommendations,
+    }
@@ -1,122 +1,306 @@
 # core/hardware_info.py
 
-import subprocess
+import os
 import re
-import psutil # استيراد مكتبة psutil
 
-def get_hardware_info():
+# psutil is imported inside the functions that need it,
+# so a run that only wants cached facts never loads it.
+
+from core.sampler import (
+    measure_cpu_usage, format_cpu_usage, measure_io_rates, total_disk_rates, total_disk_bytes, format_byte_rate,
+    is_stacked_device, SECTOR_SIZE
+)
+from core.sensors import get_cpu_temperatures, format_cpu_temperatures
+from utils.cache import cached_fact, shared_input
+from utils.helpers import get_boot_id, make_field_filter
+from utils.host import host_path
+from utils.trace import trace_span, traced
+
+@traced('cpuinfo')
+def get_cpu_model():
     """
-    Collects essential hardware information (CPU, RAM, Disk, GPU, Battery, CPU Usage, CPU Temp, Disk I/O).
-    Utilizes psutil for efficient data collection and subprocess for less common info.
+    Returns the CPU model name from /proc/cpuinfo (usually stable and fast).
     """
-    info = {}
-
-    # 1. CPU Information (Name)
     try:
-        # Get CPU model name from /proc/cpuinfo (usually stable and fast)
-        with open('/proc/cpuinfo', 'r') as f:
+        with open(host_path('/proc/cpuinfo'), 'r') as f:
             cpu_info_content = f.read()
-            model_name_match = re.search(r'model name\s*:\s*(.*)', cpu_info_content)
-            if model_name_match:
-                info['CPU'] = model_name_match.group(1).strip()
-            else:
-                info['CPU'] = 'N/A'
+        model_name_match = re.search(r'model name\s*:\s*(.*)', cpu_info_content)
+        if model_name_match:
+            return model_name_match.group(1).strip()
     except FileNotFoundError:
-        info['CPU'] = 'N/A'
+        pass
+    return 'N/A'
 
-    # 2. CPU Usage (using psutil)
+PCI_DEVICES_DIR = '/sys/bus/pci/devices'
+PCI_CLASS_DISPLAY = 0x03 # VGA, XGA, 3D and other display controllers
+
+def _read_sysfs_value(path):
     try:
-        # interval=0.1 means it will block for 0.1 seconds to calculate usage
-        # This is the trade-off: more accurate usage but adds a slight delay
-        cpu_percent = psutil.cpu_percent(interval=0.1) 
-        info['CPU Usage'] = f"{cpu_percent:.1f}%"
-    except Exception:
-        info['CPU Usage'] = 'N/A'
-    
-    # 3. CPU Temperature (requires psutil-sensors or specific Linux paths)
-    # psutil.sensors_temperatures() requires psutil-sensors which is not default psutil
-    # For simplicity, if your system doesn't expose it easily, it's safer to keep N/A or a more specific method.
-    cpu_temp = 'N/A'
+        with open(path, 'r') as f:
+            return f.read().strip()
+    except OSError:
+        return None
+
+@traced('GPU scan')
+def get_gpus():
+    """
+    Returns the display-class PCI devices found in sysfs, as a list of dicts
+    with their slot, IDs, names (from pci.ids), bound driver and, where the
+    driver exposes it (amdgpu), VRAM size in bytes.
+    """
+    from core.pci_ids import lookup_pci_names
+    gpus = []
+    devices_dir = host_path(PCI_DEVICES_DIR)
     try:
-        # Example for Linux (might need adaptation for other systems)
-        # Often found in /sys/class/thermal/thermal_zone*/temp
-        temp_files = [f for f in os.listdir('/sys/class/thermal/') if f.startswith('thermal_zone')]
-        for tf in temp_files:
-            if 'temp' in os.listdir(os.path.join('/sys/class/thermal/', tf)):
-                with open(os.path.join('/sys/class/thermal/', tf, 'temp'), 'r') as f:
-                    temp_raw = int(f.read().strip())
-                    # Temperatures are often in millidegrees Celsius
-                    cpu_temp = f"{temp_raw / 1000.0:.1f}°C"
-                    break # Take the first one found
-    except Exception:
-        pass # Keep N/A
-    info['CPU Temp'] = cpu_temp
+        slots = sorted(os.listdir(devices_dir))
+    except OSError:
+        return gpus
+    for slot in slots:
+        device_dir = os.path.join(devices_dir, slot)
+        try:
+            pci_class = int(_read_sysfs_value(os.path.join(device_dir, 'class')) or '', 16)
+            vendor_id = int(_read_sysfs_value(os.path.join(device_dir, 'vendor')) or '', 16)
+            device_id = int(_read_sysfs_value(os.path.join(device_dir, 'device')) or '', 16)
+        except ValueError:
+            continue
+        if pci_class >> 16 != PCI_CLASS_DISPLAY:
+            continue
 
+        vendor_name, device_name = lookup_pci_names(vendor_id, device_id)
+        try:
+            driver = os.path.basename(os.readlink(os.path.join(device_dir, 'driver')))
+        except OSError:
+            driver = None
+        vram = _read_sysfs_value(os.path.join(device_dir, 'mem_info_vram_total'))
+        gpus.append({
+            'slot': slot,
+            'vendor_id': f"{vendor_id:04x}",
+            'device_id': f"{device_id:04x}",
+            'vendor': vendor_name,
+            'device': device_name,
+            'driver': driver,
+            'vram_bytes': int(vram) if vram and vram.isdigit() else None,
+        })
+    return gpus
 
-    # 4. RAM Information (Total, Used, Usage %) using psutil
+def format_gpu(gpu):
+    """
+    Formats one get_gpus() entry like lspci would name it, followed by the
+    driver and VRAM when known, e.g. "Intel Corporation UHD Graphics 620 (Driver: i915)".
+    """
+    vendor = gpu['vendor'] or f"Vendor {gpu['vendor_id']}"
+    device = gpu['device'] or f"Device {gpu['device_id']}"
+    details = []
+    if gpu['driver']:
+        details.append(f"Driver: {gpu['driver']}")
+    if gpu['vram_bytes']:
+        details.append(f"VRAM: {gpu['vram_bytes'] // (1024 * 1024)}MiB")
+    return f"{vendor} {device}" + (f" ({', '.join(details)})" if details else "")
+
+POWER_SUPPLY_DIR = '/sys/class/power_supply'
+
+@traced('battery')
+def get_battery():
+    """
+    Returns the first battery in sysfs as {'percent', 'plugged',
+    'seconds_left'} (seconds_left is None when charging or unknown), or
+    None if there is no battery. Follows the same rules as
+    psutil.sensors_battery(), but reads from the host root (see utils.host).
+    """
+    supply_dir = host_path(POWER_SUPPLY_DIR)
     try:
-        ram = psutil.virtual_memory()
-        total_ram_gb = f"{(ram.total / (1024**3)):.1f}Gi"
-        used_ram_gb = f"{(ram.used / (1024**3)):.1f}Gi"
-        info['RAM'] = f"{used_ram_gb}/{total_ram_gb}" # e.g., 4.0Gi/15Gi
-        info['RAM Usage %'] = f"{ram.percent:.1f}%"
-    except Exception:
-        info['RAM'] = 'N/A'
-        info['RAM Usage %'] = 'N/A'
+        supplies = sorted(os.listdir(supply_dir))
+    except OSError:
+        return None
+    batteries = [name for name in supplies if name.startswith('BAT') or 'battery' in name.lower()]
+    if not batteries:
+        return None
+    battery_dir = os.path.join(supply_dir, batteries[0])
+
+    def number(name):
+        value = _read_sysfs_value(os.path.join(battery_dir, name))
+        return int(value) if value and value.lstrip('-').isdigit() else None
+
+    energy_now, power_now = number('energy_now'), number('power_now')
+    if energy_now is None:
+        energy_now, power_now = number('charge_now'), number('current_now')
+    energy_full = number('energy_full') or number('charge_full')
+    percent = number('capacity')
+    if percent is None:
+        if energy_now is None or not energy_full:
+            return None
+        percent = energy_now / energy_full * 100
+
+    # Plugged in if any mains supply is online; else go by the battery status
+    online = [_read_sysfs_value(os.path.join(supply_dir, name, 'online'))
+              for name in supplies if name.startswith(('AC', 'ADP', 'ACAD'))]
+    if online:
+        plugged = '1' in online
+    else:
+        status = (_read_sysfs_value(os.path.join(battery_dir, 'status')) or '').lower()
+        plugged = None if status == 'unknown' else status != 'discharging'
+
+    seconds_left = None
+    if not plugged and energy_now is not None and power_now:
+        seconds_left = int(energy_now / abs(power_now) * 3600)
+    return {'percent': min(100.0, float(percent)), 'plugged': plugged, 'seconds_left': seconds_left}
+
+def get_disk_stats(sample, rates=None):
+    """
+    Builds per-disk statistics from an I/O sample (see core.sampler, which
+    reads /proc/diskstats once for all disks): lifetime bytes read and
+    written, plus MB/s and IOPS where `rates` cover the disk. Stacked devices
+    (device-mapper, md RAID) are left out, as their I/O already shows on the
+    disks underneath. Returns one dict per disk, by name.
+    """
+    disk_rates = rates['disks'] if rates else {}
+    rows = []
+    for name in sorted(sample['disks']):
+        if is_stacked_device(name):
+            continue
+        _, sectors_read, _, sectors_written = sample['disks'][name]
+        row = {'name': name, 'read_bytes': sectors_read * SECTOR_SIZE, 'write_bytes': sectors_written * SECTOR_SIZE}
+        row.update({key: value for key, value in disk_rates.get(name, {}).items() if key != 'stacked'})
+        rows.append(row)
+    return rows
+
+def format_disk_table(rows):
+    """Formats get_disk_stats() results as aligned lines, one per disk."""
+    if not rows:
+        return 'N/A'
+    name_width = max(len(row['name']) for row in rows)
+    lines = []
+    for row in rows:
+        if 'read_bytes_per_s' in row:
+            lines.append(
+                f"{row['name']:<{name_width}}"
+                f"  R {format_byte_rate(row['read_bytes_per_s']):>9} {row['read_iops']:>6.0f} IOPS"
+                f"  W {format_byte_rate(row['write_bytes_per_s']):>9} {row['write_iops']:>6.0f} IOPS"
+            )
+        else:
+            lines.append(f"{row['name']:<{name_width}}  R {'-':>9} {'-':>6} IOPS  W {'-':>9} {'-':>6} IOPS")
+    return "\n".join(lines)
+
+def get_hardware_info(fields=None, raw=None):
+    """
+    Collects essential hardware information (CPU, RAM, Disk, GPU, Battery, CPU Usage, CPU Temp, Disk I/O, Disks).
+    Utilizes psutil for memory and disk usage and sysfs/procfs for the rest.
+    If `fields` is given, only those fields are collected.
+    If `raw` is given, typed values (numbers and units) are stored in it by field name.
+    """
+    wanted = make_field_filter(fields)
+    info = {}
+
+    # 1. CPU Information (Name) - cached until the next reboot
+    if wanted('CPU'):
+        info['CPU'] = cached_fact('cpu_model', get_boot_id(), get_cpu_model)
+
+    # 2. CPU Usage (from /proc/stat deltas; never sleeps)
+    if wanted('CPU Usage'):
+        # The window starts when Helfetch starts; helfetch.py refreshes this value
+        # again at render time so it covers the whole collection.
+        cpu_usage = measure_cpu_usage()
+        info['CPU Usage'] = format_cpu_usage(cpu_usage)
+        if raw is not None:
+            raw['CPU Usage'] = {'value': cpu_usage, 'unit': 'percent'}
+
+    # 3. CPU Temperature (the CPU's hwmon driver; sensor paths cached per boot)
+    if wanted('CPU Temp'):
+        temperatures = get_cpu_temperatures()
+        info['CPU Temp'] = format_cpu_temperatures(temperatures)
+        if raw is not None and temperatures and temperatures['package'] is not None:
+            raw['CPU Temp'] = {
+                'value': temperatures['package'],
+                'unit': 'celsius',
+                'cores': dict(temperatures['cores']),
+            }
+
+    # 4. RAM Information (Total, Used, Usage %) using psutil
+    if wanted('RAM', 'RAM Usage %'):
+        with trace_span('import psutil'):
+            import psutil # استيراد مكتبة psutil
+        try:
+            psutil.PROCFS_PATH = host_path('/proc')
+            with trace_span('meminfo'):
+                ram = psutil.virtual_memory()
+            total_ram_gb = f"{(ram.total / (1024**3)):.1f}Gi"
+            used_ram_gb = f"{(ram.used / (1024**3)):.1f}Gi"
+            info['RAM'] = f"{used_ram_gb}/{total_ram_gb}" # e.g., 4.0Gi/15Gi
+            info['RAM Usage %'] = f"{ram.percent:.1f}%"
+            if raw is not None:
+                raw['RAM'] = {'used_bytes': ram.used, 'total_bytes': ram.total}
+                raw['RAM Usage %'] = {'value': ram.percent, 'unit': 'percent'}
+        except Exception:
+            info['RAM'] = 'N/A'
+            info['RAM Usage %'] = 'N/A'
 
     # 5. Disk Usage (Root partition only for simplicity) using psutil
-    try:
-        # Use psutil.disk_usage for '/' (root partition)
-        disk_usage = psutil.disk_usage('/')
-        info['Disk'] = f"{disk_usage.percent:.0f}%" # e.g., 27%
-    except Exception:
-        info['Disk'] = 'N/A'
+    if wanted('Disk'):
+        with trace_span('import psutil'):
+            import psutil
+        try:
+            # Use psutil.disk_usage for '/' (root partition)
+            with trace_span('statvfs'):
+                disk_usage = psutil.disk_usage(host_path('/'))
+            info['Disk'] = f"{disk_usage.percent:.0f}%" # e.g., 27%
+            if raw is not None:
+                raw['Disk'] = {'value': disk_usage.percent, 'unit': 'percent',
+                               'used_bytes': disk_usage.used, 'total_bytes': disk_usage.total}
+        except Exception:
+            info['Disk'] = 'N/A'
 
-    # 6. Disk I/O (Read/Write) using psutil
-    try:
-        # Get overall disk I/O counters
-        disk_io = psutil.disk_io_counters(perdisk=False) # False for total, True for per-disk
-        if disk_io:
-            read_mb = f"{(disk_io.read_bytes / (1024 * 1024)):.1f}MB"
-            write_mb = f"{(disk_io.write_bytes / (1024 * 1024)):.1f}MB"
-            info['Disk I/O'] = f"R:{read_mb}, W:{write_mb}"
+    # 6. Disk I/O rates (from /proc/diskstats deltas; never sleeps)
+    if wanted('Disk I/O', 'Disks'):
+        rates, sample = shared_input('io_rates', measure_io_rates)
+    if wanted('Disk I/O'):
+        if rates and rates['disks']:
+            totals = total_disk_rates(rates)
+            info['Disk I/O'] = (f"R: {format_byte_rate(totals['read_bytes_per_s'])} ({totals['read_iops']:.0f} IOPS), "
+                                f"W: {format_byte_rate(totals['write_bytes_per_s'])} ({totals['write_iops']:.0f} IOPS)")
+            if raw is not None:
+                read_bytes, write_bytes = total_disk_bytes(sample)
+                raw['Disk I/O'] = dict(totals, unit='per_second', interval=rates['interval'], devices=rates['disks'],
+                                       read_bytes=read_bytes, write_bytes=write_bytes)
         else:
             info['Disk I/O'] = 'N/A'
-    except Exception:
-        info['Disk I/O'] = 'N/A'
 
-    # 7. GPU Information (still using lspci as psutil doesn't directly provide detailed GPU models)
-    try:
-        gpu_output = subprocess.check_output(['lspci', '-k'], text=True).strip()
-        gpu_lines = []
-        for line in gpu_output.split('\n'):
-            if 'VGA compatible controller' in line or '3D controller' in line:
-                gpu_lines.append(line.split(':', 2)[-1].strip()) # Extract description
-        info['GPU'] = ", ".join(gpu_lines) if gpu_lines else 'N/A'
+    # 7. Disks: MB/s and IOPS per disk, from the same /proc/diskstats read
+    if wanted('Disks'):
+        rows = get_disk_stats(sample, rates)
+        info['Disks'] = format_disk_table(rows)
+        if raw is not None:
+            raw['Disks'] = {'value': rows, 'unit': 'per_second', 'interval': rates['interval'] if rates else None}
 
-    except (subprocess.CalledProcessError, FileNotFoundError):
-        info['GPU'] = 'N/A' # lspci might not be available or command fails
+    # 8. GPU Information (from sysfs and pci.ids, in-process) - cached until the next reboot
+    if wanted('GPU'):
+        gpus = cached_fact('gpus', get_boot_id(), get_gpus)
+        info['GPU'] = ", ".join(format_gpu(gpu) for gpu in gpus) if gpus else 'N/A'
+        if raw is not None:
+            raw['GPU'] = {'value': gpus}
 
 
-    # 8. Battery Information (using psutil)
-    try:
-        battery = psutil.sensors_battery()
+    # 9. Battery Information (from sysfs)
+    if wanted('Battery'):
+        battery = get_battery()
         if battery:
-            plugged = "Charging" if battery.power_plugged else "Discharging"
-            secs_left = battery.secsleft
-            if secs_left == psutil.POWER_TIME_UNKNOWN:
-                time_left = "N/A"
-            elif secs_left == psutil.POWER_TIME_UNLIMITED:
+            plugged = "Charging" if battery['plugged'] else "Discharging"
+            if battery['plugged']:
                 time_left = "Full"
+            elif battery['seconds_left'] is None:
+                time_left = "N/A"
             else:
-                hours, rem = divmod(secs_left, 3600)
+                hours, rem = divmod(battery['seconds_left'], 3600)
                 minutes, seconds = divmod(rem, 60)
                 time_left = f"Est. {int(hours)}h {int(minutes)}m"
-            info['Battery'] = f"{battery.percent:.0f}% ({plugged}, {time_left})"
+            info['Battery'] = f"{battery['percent']:.0f}% ({plugged}, {time_left})"
+            if raw is not None:
+                raw['Battery'] = {
+                    'value': battery['percent'], 'unit': 'percent',
+                    'plugged': bool(battery['plugged']),
+                    'seconds_left': battery['seconds_left'],
+                }
         else:
             info['Battery'] = 'N/A' # No battery found
-    except Exception:
-        info['Battery'] = 'N/A' # psutil.sensors_battery() might not be available or fails
 
     return info
 
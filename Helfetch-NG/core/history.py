@@ -0,0 +1,272 @@
+# core/history.py
+
+import fcntl
+import itertools
+import mmap
+import os
+import struct
+import time
+
+from utils.helpers import get_state_dir
+
+# An opt-in history of the volatile metrics, so output can show a trend next
+# to the single-point readings. Samples go into a fixed-size ring buffer file,
+# $XDG_STATE_HOME/helfetch-ng/history.bin, memory-mapped for reading and
+# writing:
+#
+#   header  magic, capacity, head (next slot to write), count (slots used)
+#   columns one block of `capacity` float64 slots per entry of COLUMNS
+#
+# Keeping each column contiguous lets readers take zero-copy memoryview slices
+# of a time window (at most two, where the ring wraps) instead of unpacking
+# records. Counters (bytes) are stored as read; rates are derived between
+# neighbouring samples. NaN marks a metric missing from a sample.
+
+HISTORY_FILE = "history.bin"
+MAGIC = b"HFHIST01"
+HEADER = struct.Struct('<8sQQQ')
+HEADER_SIZE = 64
+COLUMNS = ('time', 'cpu_percent', 'ram_percent', 'disk_read_bytes', 'disk_write_bytes',
+           'net_sent_bytes', 'net_received_bytes')
+SAMPLE_SIZE = 8 * len(COLUMNS)
+NAN = float('nan')
+
+# Fields that can show history: the columns they are drawn from, and whether
+# those are percentages or byte counters shown as a combined per-second rate.
+HISTORY_METRICS = {
+    'CPU Usage': (('cpu_percent',), 'percent'),
+    'RAM Usage %': (('ram_percent',), 'percent'),
+    'RAM': (('ram_percent',), 'percent'),
+    'Disk I/O': (('disk_read_bytes', 'disk_write_bytes'), 'rate'),
+    'Bandwidth Usage': (('net_sent_bytes', 'net_received_bytes'), 'rate'),
+}
+HISTORY_WINDOWS = {'hour': 3600, 'day': 86400}
+
+def get_history_path():
+    return os.path.join(get_state_dir(), HISTORY_FILE)
+
+def capacity_for_size(max_bytes):
+    """Returns how many samples fit in a history file of `max_bytes`."""
+    return max(2, (max_bytes - HEADER_SIZE) // SAMPLE_SIZE)
+
+class HistoryBuffer:
+    """
+    A memory-mapped history ring buffer. Use as a context manager; views
+    returned by column() must not outlive it.
+    """
+
+    def __init__(self, fd, writable):
+        self.fd = fd
+        access = mmap.ACCESS_WRITE if writable else mmap.ACCESS_READ
+        self.map = mmap.mmap(fd, 0, access=access)
+        self.view = memoryview(self.map)
+        if len(self.map) >= HEADER_SIZE:
+            magic, self.capacity, self.head, self.count = HEADER.unpack_from(self.map)
+        if len(self.map) < HEADER_SIZE or magic != MAGIC \
+                or len(self.map) != HEADER_SIZE + self.capacity * SAMPLE_SIZE:
+            # The caller still owns `fd` until construction succeeds
+            self._release_map()
+            raise ValueError("not a helfetch history file")
+
+    @classmethod
+    def open(cls, path=None, capacity=None):
+        """
+        Opens the history file read-only, or for appending if `capacity` is
+        given, in which case it is created (or reset, if it was created with
+        another capacity) and locked until closed. Returns None if the file
+        cannot be opened.
+        """
+        path = path or get_history_path()
+        try:
+            if capacity is None:
+                fd = os.open(path, os.O_RDONLY)
+            else:
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o600)
+                fcntl.flock(fd, fcntl.LOCK_EX)
+        except OSError:
+            return None
+        try:
+            if capacity is not None:
+                size = HEADER_SIZE + capacity * SAMPLE_SIZE
+                header = os.pread(fd, HEADER.size, 0)
+                if (os.fstat(fd).st_size != size or len(header) != HEADER.size
+                        or HEADER.unpack(header)[:2] != (MAGIC, capacity)):
+                    os.ftruncate(fd, 0)
+                    os.ftruncate(fd, size)
+                    os.pwrite(fd, HEADER.pack(MAGIC, capacity, 0, 0), 0)
+            return cls(fd, writable=capacity is not None)
+        except (OSError, ValueError):
+            os.close(fd)
+            return None
+
+    def _release_map(self):
+        if self.map is not None:
+            self.view.release()
+            self.map.close()
+            self.map = None
+
+    def close(self):
+        self._release_map()
+        os.close(self.fd)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def column(self, name):
+        """Returns a zero-copy float64 view of a column's slots (ring order)."""
+        start = HEADER_SIZE + COLUMNS.index(name) * self.capacity * 8
+        return self.view[start:start + self.capacity * 8].cast('d')
+
+    def _slot(self, index):
+        """Maps a logical index (0 = oldest sample) to its slot."""
+        return (self.head - self.count + index) % self.capacity
+
+    def last_time(self):
+        if not self.count:
+            return None
+        return self.column('time')[self._slot(self.count - 1)]
+
+    def append(self, sample):
+        """Writes a sample ({column: value}) into the next slot."""
+        slot = self.head
+        for index, name in enumerate(COLUMNS):
+            offset = HEADER_SIZE + (index * self.capacity + slot) * 8
+            struct.pack_into('<d', self.map, offset, sample.get(name, NAN))
+        self.head = (slot + 1) % self.capacity
+        self.count = min(self.count + 1, self.capacity)
+        HEADER.pack_into(self.map, 0, MAGIC, self.capacity, self.head, self.count)
+
+    def window(self, since):
+        """
+        Returns the slot ranges, oldest first, holding the samples taken at
+        or after `since` (samples are appended in time order).
+        """
+        times = self.column('time')
+        low, high = 0, self.count
+        while low < high:
+            middle = (low + high) // 2
+            if times[self._slot(middle)] < since:
+                low = middle + 1
+            else:
+                high = middle
+        if low == self.count:
+            return []
+        first, last = self._slot(low), self._slot(self.count - 1)
+        if first <= last:
+            return [(first, last + 1)]
+        return [(first, self.capacity), (0, last + 1)]
+
+    def values(self, name, ranges):
+        """Iterates a column over slot ranges from window(), without copying."""
+        column = self.column(name)
+        return itertools.chain.from_iterable(column[start:end] for start, end in ranges)
+
+def sample_from_raw(raw, now=None):
+    """
+    Builds a history sample from the typed values collected with `raw`
+    (see registry.collect), or returns None if it has no recorded metric.
+    """
+    def value(field, key='value'):
+        entry = raw.get(field) or {}
+        number = entry.get(key)
+        return float(number) if isinstance(number, (int, float)) else NAN
+
+    sample = {
+        'cpu_percent': value('CPU Usage'),
+        'ram_percent': value('RAM Usage %'),
+        'disk_read_bytes': value('Disk I/O', 'read_bytes'),
+        'disk_write_bytes': value('Disk I/O', 'write_bytes'),
+        'net_sent_bytes': value('Bandwidth Usage', 'sent_bytes'),
+        'net_received_bytes': value('Bandwidth Usage', 'received_bytes'),
+    }
+    used, total = value('RAM', 'used_bytes'), value('RAM', 'total_bytes')
+    if sample['ram_percent'] != sample['ram_percent'] and total > 0:
+        sample['ram_percent'] = used / total * 100
+    if all(number != number for number in sample.values()):
+        return None
+    sample['time'] = now if now is not None else time.time()
+    return sample
+
+def record_sample(raw, max_bytes, min_interval=0):
+    """
+    Appends the metrics in `raw` to the history file, unless the last
+    sample is less than `min_interval` seconds old. Returns True if a
+    sample was written.
+    """
+    sample = sample_from_raw(raw)
+    if sample is None:
+        return False
+    history = HistoryBuffer.open(capacity=capacity_for_size(max_bytes))
+    if history is None:
+        return False
+    with history:
+        last_time = history.last_time()
+        if last_time is not None and 0 <= sample['time'] - last_time < min_interval:
+            return False
+        history.append(sample)
+    return True
+
+def _metric_points(history, columns, kind, ranges):
+    """Yields (time, value) for one metric, skipping missing values."""
+    times = history.values('time', ranges)
+    series = [history.values(name, ranges) for name in columns]
+    if kind == 'percent':
+        for when, value in zip(times, series[0]):
+            if value == value:
+                yield when, value
+        return
+
+    # Counters: the per-second rate of their sum between neighbouring samples;
+    # a counter going backwards (reboot) breaks the series.
+    previous_time = previous_total = None
+    for when, *counters in zip(times, *series):
+        total = sum(counters)
+        if (previous_total is not None and total == total and previous_total == previous_total
+                and total >= previous_total and when > previous_time):
+            yield when, (total - previous_total) / (when - previous_time)
+        previous_time, previous_total = when, total
+
+def get_history_summary(fields, window, buckets, now=None):
+    """
+    Returns {field: {'points', 'min', 'avg', 'max', 'kind'}} for the fields
+    with history over the last `window` seconds, where 'points' holds the
+    mean of each of `buckets` equal time slices (None for empty ones).
+    Returns {} if no history has been recorded.
+    """
+    now = now if now is not None else time.time()
+    since = now - window
+    summary = {}
+    history = HistoryBuffer.open()
+    if history is None:
+        return summary
+    with history:
+        ranges = history.window(since)
+        if not ranges:
+            return summary
+        for field in fields:
+            if field not in HISTORY_METRICS or (field == 'RAM' and 'RAM Usage %' in fields):
+                continue
+            columns, kind = HISTORY_METRICS[field]
+            sums, counts = [0.0] * buckets, [0] * buckets
+            low = high = None
+            for when, value in _metric_points(history, columns, kind, ranges):
+                bucket = min(buckets - 1, max(0, int((when - since) / window * buckets)))
+                sums[bucket] += value
+                counts[bucket] += 1
+                low = value if low is None else min(low, value)
+                high = value if high is None else max(high, value)
+            total_count = sum(counts)
+            if not total_count:
+                continue
+            summary[field] = {
+                'points': [s / c if c else None for s, c in zip(sums, counts)],
+                'min': low,
+                'avg': sum(sums) / total_count,
+                'max': high,
+                'kind': kind,
+            }
+    return summary
@@ -1,101 +1,366 @@
 # core/network_info.py
 
-import subprocess
-import requests
-import json
+import fnmatch
+import os
 import re
-import socket # استيراد socket للحالة الاحتياطية لـ Local IP
+import time
 
-def get_network_info():
+from config.default_config import (
+    OFFLINE_MODE, PUBLIC_IP_ENDPOINT, PUBLIC_IP_TTL, PUBLIC_IP_TIMEOUT, INTERFACE_PATTERNS, COLLAPSE_VIRTUAL_INTERFACES
+)
+from core.sampler import measure_io_rates, total_net_rates, total_net_bytes, format_byte_rate, NET_COUNTER_COLUMNS
+from utils.cache import shared_input
+from utils.helpers import get_cache_dir, make_field_filter, read_json_file, write_json_file
+from utils.host import get_host_root, host_path
+from utils.trace import trace_span, traced
+
+# socket, fcntl, json and requests (with urllib3, certifi and charset
+# detection behind it) are imported where they are used, so importing this
+# module costs nothing until the network fields are actually collected.
+
+PUBLIC_IP_CACHE_FILE_NAME = "public_ip.json"
+PUBLIC_IP_FIELDS = {
+    # output field: key in the ip-api.com response
+    'Public IP': 'query',
+    'ISP': 'isp',
+    'City': 'city',
+    'Country': 'country',
+}
+
+# Route flags (linux/route.h)
+RTF_UP = 0x0001
+RTF_REJECT = 0x0200
+# IPv6 address flags (linux/if_addr.h) that make an address unsuitable to show
+IFA_F_DEPRECATED = 0x20
+IFA_F_TENTATIVE = 0x40
+IPV6_SCOPE_GLOBAL = 0x00
+SIOCGIFADDR = 0x8915
+
+def get_default_route_interface():
     """
-    Collects network-related information including local IP, public IP, ISP, and location.
+    Returns the interface of the IPv4 default route from /proc/net/route
+    (the one with the lowest metric if there are several), or None.
     """
-    info = {}
+    best = None
+    try:
+        with open(host_path('/proc/net/route'), 'r') as f:
+            next(f) # Header
+            for line in f:
+                # Iface Destination Gateway Flags RefCnt Use Metric Mask ...
+                parts = line.split()
+                # Destination 00000000 with the RTF_UP flag set is a default route
+                if len(parts) > 7 and parts[1] == '00000000' and parts[7] == '00000000' \
+                        and int(parts[3], 16) & RTF_UP:
+                    metric = int(parts[6])
+                    if best is None or metric < best[0]:
+                        best = (metric, parts[0])
+    except (OSError, StopIteration, ValueError):
+        pass
+    return best[1] if best else None
 
-    # 1. Local IP Address
-    local_ip = 'N/A'
+def get_default_route_interface6():
+    """
+    Returns the interface of the IPv6 default route from /proc/net/ipv6_route
+    (the one with the lowest metric if there are several), or None.
+    """
+    best = None
     try:
-        # Get default gateway IP for Linux
-        result = subprocess.run(['ip', 'route', 'get', '1.1.1.1'], capture_output=True, text=True, check=True)
-        for line in result.stdout.splitlines():
-            if 'src' in line:
-                match = re.search(r'src (\d{1,3}\.\d{1,3}\.\d{1,3}\.\d{1,3})', line)
-                if match:
-                    local_ip = match.group(1)
-                    break
-    except (subprocess.CalledProcessError, FileNotFoundError):
-        # Fallback for systems where 'ip route' might not work or for Windows
-        try:
-            s = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
-            s.connect(("8.8.8.8", 80)) # Connect to a public server to get local IP
-            local_ip = s.getsockname()[0]
-            s.close()
-        except Exception:
-            local_ip = 'N/A'
-            
-    info['Local IP'] = local_ip
-
-    # 2. Public IP Address, ISP, and Location (City, Country)
-    public_ip = 'N/A'
-    isp = 'N/A'
-    city = 'N/A'
-    country = 'N/A'
-    
+        with open(host_path('/proc/net/ipv6_route'), 'r') as f:
+            for line in f:
+                # dest dest_len src src_len next_hop metric refcnt use flags device
+                parts = line.split()
+                if len(parts) < 10 or parts[1] != '00' or parts[9] == 'lo' or int(parts[0], 16):
+                    continue
+                flags = int(parts[8], 16)
+                if flags & RTF_UP and not flags & RTF_REJECT:
+                    metric = int(parts[5], 16)
+                    if best is None or metric < best[0]:
+                        best = (metric, parts[9])
+    except (OSError, ValueError):
+        pass
+    return best[1] if best else None
+
+def get_ipv6_addresses():
+    """
+    Returns {interface: [global IPv6 addresses]} from /proc/net/if_inet6,
+    skipping tentative and deprecated addresses.
+    """
+    import socket
+    addresses = {}
     try:
-        # Using ip-api.com for public IP, ISP, city, and country
-        # This service has a rate limit for free tier (45 requests per minute from an IP)
-        # **التغيير هنا: إضافة مهلة زمنية (timeout) للطلب**
-        response = requests.get("http://ip-api.com/json/", timeout=2) # مهلة 2 ثانية
+        with open(host_path('/proc/net/if_inet6'), 'r') as f:
+            for line in f:
+                # address ifindex prefix_len scope flags device
+                parts = line.split()
+                if len(parts) < 6 or int(parts[3], 16) != IPV6_SCOPE_GLOBAL:
+                    continue
+                if int(parts[4], 16) & (IFA_F_DEPRECATED | IFA_F_TENTATIVE):
+                    continue
+                address = socket.inet_ntop(socket.AF_INET6, bytes.fromhex(parts[0]))
+                addresses.setdefault(parts[5], []).append(address)
+    except (OSError, ValueError):
+        pass
+    return addresses
+
+def get_ipv4_address(interface):
+    """
+    Returns the primary IPv4 address of an interface (SIOCGIFADDR ioctl), or
+    None. The socket is only a handle for the ioctl; nothing is sent.
+    The ioctl asks the running kernel, so under another host root (see
+    utils.host) the address is unknown.
+    """
+    if get_host_root() != '/':
+        return None
+    import fcntl
+    import socket
+    import struct
+    try:
+        with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as s:
+            request = struct.pack('256s', interface.encode()[:15])
+            return socket.inet_ntoa(fcntl.ioctl(s.fileno(), SIOCGIFADDR, request)[20:24])
+    except OSError:
+        return None
+
+def _first_routed_interface():
+    """
+    Returns the first non-loopback interface with any IPv4 route, for
+    namespaces and hosts without a default route.
+    """
+    try:
+        with open(host_path('/proc/net/route'), 'r') as f:
+            next(f) # Header
+            for line in f:
+                parts = line.split()
+                if len(parts) > 3 and parts[0] != 'lo' and int(parts[3], 16) & RTF_UP:
+                    return parts[0]
+    except (OSError, StopIteration, ValueError):
+        pass
+    return None
+
+@traced('local addresses')
+def get_local_addresses():
+    """
+    Returns the addresses used for outgoing traffic, as {'interface', 'ipv4',
+    'ipv6': [...]}, read in-process from /proc and an ioctl. Without a default
+    route (e.g. in a network namespace), an interface with any route or
+    global IPv6 address is used instead; values are None/[] if there is none.
+    """
+    ipv6_addresses = get_ipv6_addresses()
+    interface4 = get_default_route_interface() or _first_routed_interface()
+    interface6 = get_default_route_interface6()
+    interface = interface4 or interface6 or next(iter(ipv6_addresses), None)
+    return {
+        'interface': interface,
+        'ipv4': get_ipv4_address(interface4) if interface4 else None,
+        'ipv6': ipv6_addresses.get(interface6 or interface, []),
+    }
+
+def format_local_addresses(addresses):
+    """Formats get_local_addresses() for display, e.g. "192.168.1.5, 2001:db8::5"."""
+    shown = ([addresses['ipv4']] if addresses['ipv4'] else []) + addresses['ipv6'][:1]
+    return ", ".join(shown) if shown else 'N/A'
+
+def get_local_ip():
+    """
+    Returns the local address(es) used for outgoing traffic, for display.
+    """
+    return format_local_addresses(get_local_addresses())
+
+def get_public_ip_info(local_ip, endpoint=PUBLIC_IP_ENDPOINT, ttl=PUBLIC_IP_TTL, offline=False):
+    """
+    Returns Public IP, ISP, City and Country.
+    A successful lookup is cached on disk for `ttl` seconds, keyed by the
+    default-route interface and local IP so it is invalidated when the
+    network changes. In offline mode only the cache is consulted.
+    """
+    result = dict.fromkeys(PUBLIC_IP_FIELDS, 'N/A')
+    cache_key = f"{get_default_route_interface()}|{local_ip}"
+    cache_path = os.path.join(get_cache_dir(), PUBLIC_IP_CACHE_FILE_NAME)
+
+    cached = read_json_file(cache_path)
+    if isinstance(cached, dict) and cached.get('key') == cache_key and \
+            time.time() - cached.get('time', 0) < ttl and isinstance(cached.get('data'), dict):
+        result.update(cached['data'])
+        return result
+
+    if offline:
+        return result
+
+    import json
+    with trace_span('import requests'):
+        import requests
+    try:
+        # This service has a rate limit for free tier (45 requests per minute from an IP),
+        # which the cache keeps us well below.
+        with trace_span('HTTP lookup', url=endpoint):
+            response = requests.get(endpoint, timeout=PUBLIC_IP_TIMEOUT)
         data = json.loads(response.text)
-        
-        if data and data.get("status") == "success":
-            public_ip = data.get("query", "N/A")
-            isp = data.get("isp", "N/A")
-            city = data.get("city", "N/A")
-            country = data.get("country", "N/A")
-            
-    except requests.exceptions.RequestException as e:
+    except requests.exceptions.RequestException:
         # Handle network errors, e.g., no internet connection or timeout
-        # print(f"Network info error: {e}", file=sys.stderr) # لإظهار الخطأ إذا أردت تتبع المشكلة
-        pass
+        return result
     except json.JSONDecodeError:
         # Handle errors in parsing JSON response
-        pass
+        return result
 
-    info['Public IP'] = public_ip
-    info['ISP'] = isp
-    info['City'] = city
-    info['Country'] = country
-    
-    # 3. Bandwidth Usage (Sent/Received)
-    sent_mb = 'N/A'
-    recv_mb = 'N/A'
+    if data and data.get("status") == "success":
+        for field, key in PUBLIC_IP_FIELDS.items():
+            result[field] = data.get(key, "N/A")
+        write_json_file(cache_path, {'key': cache_key, 'time': time.time(), 'data': result})
+    return result
+
+def _read_sysfs_value(path):
+    try:
+        with open(path, 'r') as f:
+            return f.read().strip()
+    except OSError:
+        return None
+
+def _is_virtual_interface(name):
+    """True for software interfaces (veth, bridges, tunnels...), which sysfs files under devices/virtual."""
     try:
-        # Linux specific: Parse /proc/net/dev
-        with open('/proc/net/dev', 'r') as f:
-            net_dev_content = f.readlines()
-        
-        # Skip header lines
-        for line in net_dev_content[2:]:
-            parts = line.split(':')
-            if len(parts) == 2:
-                interface_name = parts[0].strip()
-                # Exclude loopback interface
-                if interface_name != 'lo':
-                    data = parts[1].split()
-                    # Data columns: 0:bytes_received, 1:packets_received, ..., 8:bytes_transmitted
-                    bytes_received = int(data[0])
-                    bytes_transmitted = int(data[8])
-
-                    # Convert to MB and round to one decimal place
-                    recv_mb = f"{(bytes_received / (1024 * 1024)):.1f}MB"
-                    sent_mb = f"{(bytes_transmitted / (1024 * 1024)):.1f}MB"
-                    # We usually just pick the first non-loopback interface for simplicity
-                    break
-    except (FileNotFoundError, IndexError, ValueError):
-        pass # Keep N/A if file not found or parsing fails
-    
-    info['Bandwidth Usage'] = f"Sent: {sent_mb}, Recv: {recv_mb}"
+        return '/devices/virtual/' in os.readlink(host_path(f'/sys/class/net/{name}'))
+    except OSError:
+        return False
+
+def _interface_kind(name):
+    """Groups interfaces by name prefix, e.g. 'veth1a2b' -> 'veth', 'br-0f3c' -> 'br'."""
+    match = re.match(r'[A-Za-z]+', name)
+    return match.group(0) if match else name
+
+@traced('interface stats')
+def get_interface_stats(sample, rates=None, patterns=None, collapse_virtual=True):
+    """
+    Builds per-interface statistics from an I/O sample (see core.sampler,
+    which reads /proc/net/dev once for all interfaces) plus operstate and link
+    speed from sysfs. `patterns` are shell globs selecting interfaces by name.
+    With `collapse_virtual`, virtual interfaces sharing a name prefix (veth*,
+    br-*...) are grouped and their sysfs files are not read, which keeps
+    container hosts with hundreds of veths fast.
+    Returns (rows, groups): one dict per interface, and {kind: [names]} for
+    the collapsed groups.
+    """
+    names = [name for name in sample['interfaces']
+             if not patterns or any(fnmatch.fnmatchcase(name, pattern) for pattern in patterns)]
+    virtual = {name: _is_virtual_interface(name) for name in names}
+
+    groups = {}
+    if collapse_virtual:
+        for name in names:
+            if virtual[name]:
+                groups.setdefault(_interface_kind(name), []).append(name)
+        groups = {kind: members for kind, members in groups.items() if len(members) > 1}
+    collapsed = {name for members in groups.values() for name in members}
+
+    interface_rates = rates['interfaces'] if rates else {}
+    rows = []
+    for name in names:
+        row = {'name': name, 'virtual': virtual[name], 'operstate': None, 'speed_mbps': None}
+        row.update(zip(NET_COUNTER_COLUMNS, sample['interfaces'][name]))
+        row.update(interface_rates.get(name, {}))
+        if name not in collapsed:
+            row['operstate'] = _read_sysfs_value(host_path(f'/sys/class/net/{name}/operstate'))
+        if not virtual[name]:
+            # Reading speed fails (EINVAL) or gives -1 when the link is down or has no speed;
+            # virtual interfaces report a made-up one, so it is only read for hardware
+            speed = _read_sysfs_value(host_path(f'/sys/class/net/{name}/speed'))
+            if speed and speed.lstrip('-').isdigit() and int(speed) > 0:
+                row['speed_mbps'] = int(speed)
+        rows.append(row)
+    return rows, groups
+
+def _format_bytes(count):
+    for unit in ("B", "KB", "MB", "GB"):
+        if count < 1024:
+            return f"{count:.1f}{unit}" if unit != "B" else f"{count}B"
+        count /= 1024
+    return f"{count:.1f}TB"
+
+def format_interface_table(rows, groups):
+    """
+    Formats get_interface_stats() results as aligned lines, one per interface
+    and one per collapsed group (with its counters summed).
+    """
+    collapsed = {name for members in groups.values() for name in members}
+    entries = [row for row in rows if row['name'] not in collapsed]
+    for kind, members in groups.items():
+        member_set = set(members)
+        total = {'name': f"{kind}* ({len(members)})", 'operstate': 'virtual', 'speed_mbps': None}
+        for key in NET_COUNTER_COLUMNS + ('rx_bytes_per_s', 'tx_bytes_per_s'):
+            total[key] = sum(row.get(key, 0) for row in rows if row['name'] in member_set)
+        entries.append(total)
+    if not entries:
+        return 'N/A'
+
+    name_width = max(len(entry['name']) for entry in entries)
+    lines = []
+    for entry in entries:
+        speed = f"{entry['speed_mbps']}Mb/s" if entry['speed_mbps'] else "-"
+        rx_rate = format_byte_rate(entry['rx_bytes_per_s']) if 'rx_bytes_per_s' in entry else "-"
+        tx_rate = format_byte_rate(entry['tx_bytes_per_s']) if 'tx_bytes_per_s' in entry else "-"
+        lines.append(
+            f"{entry['name']:<{name_width}}  {entry['operstate'] or '-':<7} {speed:>9}"
+            f"  RX {_format_bytes(entry['rx_bytes']):>8} {entry['rx_packets']:>9} pkts {rx_rate:>9}"
+            f"  TX {_format_bytes(entry['tx_bytes']):>8} {entry['tx_packets']:>9} pkts {tx_rate:>9}"
+            f"  err {entry['rx_errors'] + entry['tx_errors']}  drop {entry['rx_drops'] + entry['tx_drops']}"
+        )
+    return "\n".join(lines)
+
+def get_network_info(fields=None, offline=OFFLINE_MODE, endpoint=PUBLIC_IP_ENDPOINT, ttl=PUBLIC_IP_TTL, raw=None,
+                     interface_patterns=INTERFACE_PATTERNS, collapse_virtual=COLLAPSE_VIRTUAL_INTERFACES):
+    """
+    Collects network-related information including local IP, public IP, ISP, and location.
+    If `fields` is given, only those fields are collected.
+    If `raw` is given, typed values (numbers and units) are stored in it by field name.
+    With `offline=True` nothing is sent over the network; the public IP comes from the cache only.
+    `interface_patterns` and `collapse_virtual` select the rows of the Interfaces table.
+    """
+    wanted = make_field_filter(fields)
+    info = {}
+
+    # 1. Local IP Address (IPv4 and IPv6, from /proc and an ioctl; no process or traffic)
+    local_ip = 'N/A'
+    if wanted('Local IP', 'Public IP', 'ISP', 'City', 'Country'):
+        addresses = shared_input('local_addresses', get_local_addresses)
+        local_ip = format_local_addresses(addresses)
+    if wanted('Local IP'):
+        info['Local IP'] = local_ip
+        if raw is not None:
+            raw['Local IP'] = {'value': addresses['ipv4'], **addresses}
+
+    # 2. Public IP Address, ISP, and Location (City, Country) - cached per network
+    if wanted('Public IP', 'ISP', 'City', 'Country'):
+        info.update(get_public_ip_info(local_ip, endpoint, ttl, offline))
+
+    # 3. Bandwidth Usage (Sent/Received per second, from /proc/net/dev deltas; never sleeps)
+    if wanted('Bandwidth Usage', 'Interfaces'):
+        rates, sample = shared_input('io_rates', measure_io_rates)
+    if wanted('Bandwidth Usage'):
+        if rates and rates['interfaces']:
+            totals = total_net_rates(rates)
+            info['Bandwidth Usage'] = (f"Sent: {format_byte_rate(totals['tx_bytes_per_s'])}, "
+                                       f"Recv: {format_byte_rate(totals['rx_bytes_per_s'])}")
+            if raw is not None:
+                received_bytes, sent_bytes = total_net_bytes(sample)
+                raw['Bandwidth Usage'] = {
+                    'sent_bytes_per_s': totals['tx_bytes_per_s'],
+                    'received_bytes_per_s': totals['rx_bytes_per_s'],
+                    'sent_packets_per_s': totals['tx_packets_per_s'],
+                    'received_packets_per_s': totals['rx_packets_per_s'],
+                    'unit': 'per_second',
+                    'interval': rates['interval'],
+                    'interfaces': rates['interfaces'],
+                    'sent_bytes': sent_bytes,
+                    'received_bytes': received_bytes,
+                }
+        else:
+            info['Bandwidth Usage'] = 'N/A'
+
+    # 4. Interfaces: every interface, from the same /proc/net/dev read, plus sysfs
+    if wanted('Interfaces'):
+        rows, groups = get_interface_stats(sample, rates, interface_patterns, collapse_virtual)
+        info['Interfaces'] = format_interface_table(rows, groups)
+        if raw is not None:
+            raw['Interfaces'] = {'value': rows, 'collapsed': groups}
 
     return info
 
@@ -0,0 +1,112 @@
+# core/packages.py
+
+import os
+import subprocess
+
+from utils.commands import TIMEOUT_VALUE
+from utils.host import get_host_root, host_path, run_command
+from utils.trace import traced
+
+# Counting packages straight from the package databases instead of spawning
+# pacman/dpkg/rpm: one directory scan or one streamed file read per run.
+
+DPKG_INSTALLED_MARKER = b"Status: install ok installed\n"
+READ_CHUNK_SIZE = 1024 * 1024
+# How long to wait for rpm's write lock before giving up on the sqlite count
+RPM_SQLITE_TIMEOUT = 1.0
+
+def count_pacman_packages(db_path):
+    """
+    Counts installed packages in the pacman local database.
+    Each installed package is one directory (name-version) under /var/lib/pacman/local.
+    """
+    with os.scandir(db_path) as entries:
+        return sum(1 for entry in entries if entry.is_dir(follow_symlinks=False))
+
+def count_dpkg_packages(status_path):
+    """
+    Counts installed packages by stream-scanning the dpkg status file for
+    'Status: install ok installed' lines, without loading the whole file.
+    """
+    count = 0
+    carry = b""
+    marker_len = len(DPKG_INSTALLED_MARKER)
+    with open(status_path, 'rb') as f:
+        while True:
+            chunk = f.read(READ_CHUNK_SIZE)
+            if not chunk:
+                break
+            data = carry + chunk
+            count += data.count(DPKG_INSTALLED_MARKER)
+            # Keep a tail shorter than the marker so a match split across chunks
+            # is found once, and a match already counted is never counted twice.
+            carry = data[-(marker_len - 1):]
+    return count
+
+def count_rpm_sqlite_packages(db_path):
+    """
+    Counts installed packages in an rpm sqlite database, opened read-only.
+    rpm keeps the database in WAL mode, so the count includes commits still in
+    rpmdb.sqlite-wal; a transaction in progress delays it by at most
+    RPM_SQLITE_TIMEOUT seconds.
+    """
+    import sqlite3 # Only needed on rpm-based systems
+    conn = sqlite3.connect(f"file:{db_path}?mode=ro", uri=True, timeout=RPM_SQLITE_TIMEOUT)
+    try:
+        return conn.execute("SELECT COUNT(*) FROM Packages").fetchone()[0]
+    finally:
+        conn.close()
+
+def count_rpm_bdb_packages(db_path):
+    """
+    Counts installed packages on older rpm systems whose Berkeley DB database
+    cannot be read directly; this is the only backend that spawns a process.
+    """
+    root = get_host_root()
+    output = run_command(['rpm', '-qa'] if root == '/' else ['rpm', '--root', root, '-qa'])
+    return output.count('\n')
+
+# (manager, database path, counter) in probe order. The first database that
+# exists decides the backend, so only one package manager is ever consulted.
+PACKAGE_BACKENDS = [
+    ('Pacman', '/var/lib/pacman/local', count_pacman_packages),
+    ('DPKG', '/var/lib/dpkg/status', count_dpkg_packages),
+    ('RPM', '/var/lib/rpm/rpmdb.sqlite', count_rpm_sqlite_packages),
+    ('RPM', '/usr/lib/sysimage/rpm/rpmdb.sqlite', count_rpm_sqlite_packages),
+    ('RPM', '/var/lib/rpm/Packages', count_rpm_bdb_packages),
+]
+
+def detect_package_backend():
+    """
+    Returns the (manager, database path, counter) of the first package database
+    found on this system, or None if there is none.
+    """
+    for manager, db_path, counter in PACKAGE_BACKENDS:
+        db_path = host_path(db_path)
+        if os.path.exists(db_path):
+            return manager, db_path, counter
+    return None
+
+@traced('package count')
+def get_package_count(backend=None):
+    """
+    Counts installed packages using the detected backend.
+    Returns a dict with 'manager' and 'count' (both 'N/A' if nothing could be
+    counted; the count is 'timeout' if the rpm query was killed at its deadline).
+    """
+    backend = backend or detect_package_backend()
+    if backend:
+        manager, db_path, counter = backend
+        try:
+            count = counter(db_path)
+            if count > 0:
+                return {'manager': manager, 'count': str(count)}
+        except subprocess.TimeoutExpired:
+            return {'manager': manager, 'count': TIMEOUT_VALUE}
+        except Exception:
+            pass # Unreadable or corrupt database; report N/A rather than fail
+    return {'manager': 'N/A', 'count': 'N/A'}
+
+# For testing this module independently
+if __name__ == "__main__":
+    print(get_package_count())
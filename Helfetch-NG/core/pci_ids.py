@@ -0,0 +1,170 @@
+# core/pci_ids.py
+
+import mmap
+import os
+import struct
+
+from utils.helpers import get_cache_dir
+from utils.host import host_path
+from utils.trace import traced
+
+# Vendor and device names from the system's pci.ids, without parsing it on
+# every run. The first lookup builds a compact binary index in the cache
+# directory, keyed by the source file's mtime and size:
+#
+#   header  magic, source mtime_ns, source size, record count
+#   records sorted (key, name offset, name length) triples, where key is
+#           vendor << 16 | device, and vendor << 16 | 0xffff for the vendor
+#           itself (0xffff is never a valid device ID)
+#   names   the UTF-8 names, back to back
+#
+# Lookups memory-map the index and binary-search the records, so only the
+# pages actually touched are read.
+
+PCI_IDS_PATHS = (
+    '/usr/share/hwdata/pci.ids',
+    '/usr/share/misc/pci.ids',
+    '/usr/share/pci.ids',
+    '/usr/share/pciids/pci.ids',
+)
+INDEX_FILE_NAME = "pci_ids.idx"
+MAGIC = b"HFPCI001"
+HEADER = struct.Struct('<8sQQQ')
+RECORD = struct.Struct('<III')
+VENDOR_ONLY = 0xffff
+
+_index = None
+_index_source = None
+
+def find_pci_ids():
+    """Returns the path of the system's pci.ids, or None."""
+    for path in map(host_path, PCI_IDS_PATHS):
+        if os.path.isfile(path):
+            return path
+    return None
+
+def parse_pci_ids(path):
+    """
+    Parses vendor and device lines of pci.ids into {key: name}.
+    Subsystem lines and the device class section at the end are skipped.
+    """
+    names = {}
+    vendor = None
+    with open(path, 'r', encoding='utf-8', errors='replace') as f:
+        for line in f:
+            if not line.strip() or line.startswith('#'):
+                continue
+            if line.startswith('C '):
+                break # Device classes follow the vendors; they are not needed
+            if line.startswith('\t\t'):
+                continue # Subsystem
+            try:
+                if line.startswith('\t'):
+                    if vendor is not None:
+                        device_id, name = line.strip().split(None, 1)
+                        names[vendor << 16 | int(device_id, 16)] = name
+                else:
+                    vendor_id, name = line.strip().split(None, 1)
+                    vendor = int(vendor_id, 16)
+                    names[vendor << 16 | VENDOR_ONLY] = name
+            except ValueError:
+                continue
+    return names
+
+@traced('build pci.ids index')
+def build_index(source_path, index_path):
+    """
+    Writes the binary index for `source_path` to `index_path` atomically.
+    """
+    stat = os.stat(source_path)
+    names = parse_pci_ids(source_path)
+    records = bytearray()
+    blob = bytearray()
+    for key in sorted(names):
+        encoded = names[key].encode('utf-8')
+        records += RECORD.pack(key, len(blob), len(encoded))
+        blob += encoded
+
+    os.makedirs(os.path.dirname(index_path), exist_ok=True)
+    tmp_path = f"{index_path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(HEADER.pack(MAGIC, stat.st_mtime_ns, stat.st_size, len(names)))
+        f.write(records)
+        f.write(blob)
+    os.replace(tmp_path, index_path)
+
+class PciIdIndex:
+    """A memory-mapped pci.ids index (see build_index)."""
+
+    def __init__(self, path):
+        with open(path, 'rb') as f:
+            self.map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, self.mtime_ns, self.size, self.count = HEADER.unpack_from(self.map)
+        self.names_offset = HEADER.size + self.count * RECORD.size
+        if magic != MAGIC or len(self.map) < self.names_offset:
+            self.map.close()
+            raise ValueError("not a pci.ids index")
+
+    def matches(self, source_path):
+        """True if the index was built from the current version of `source_path`."""
+        stat = os.stat(source_path)
+        return (stat.st_mtime_ns, stat.st_size) == (self.mtime_ns, self.size)
+
+    def _lookup(self, key):
+        low, high = 0, self.count
+        while low < high:
+            middle = (low + high) // 2
+            record_key, offset, length = RECORD.unpack_from(self.map, HEADER.size + middle * RECORD.size)
+            if record_key < key:
+                low = middle + 1
+            elif record_key > key:
+                high = middle
+            else:
+                start = self.names_offset + offset
+                return self.map[start:start + length].decode('utf-8', errors='replace')
+        return None
+
+    def vendor_name(self, vendor_id):
+        return self._lookup(vendor_id << 16 | VENDOR_ONLY)
+
+    def device_name(self, vendor_id, device_id):
+        return self._lookup(vendor_id << 16 | device_id)
+
+def get_pci_id_index():
+    """
+    Returns the PciIdIndex for the system's pci.ids, building or rebuilding
+    the cached index when needed, or None if there is no pci.ids.
+    """
+    global _index, _index_source
+    source_path = find_pci_ids()
+    if source_path is None:
+        return None
+    if _index is not None and _index_source == source_path:
+        return _index
+
+    index_path = os.path.join(get_cache_dir(), INDEX_FILE_NAME)
+    try:
+        index = PciIdIndex(index_path)
+        if index.matches(source_path):
+            _index, _index_source = index, source_path
+            return _index
+        index.map.close()
+    except (OSError, ValueError, struct.error):
+        pass
+
+    try:
+        build_index(source_path, index_path)
+        _index, _index_source = PciIdIndex(index_path), source_path
+    except (OSError, ValueError, struct.error):
+        return None
+    return _index
+
+def lookup_pci_names(vendor_id, device_id):
+    """
+    Returns (vendor name, device name) for PCI IDs, with None for any
+    name not found (or if pci.ids is not installed).
+    """
+    index = get_pci_id_index()
+    if index is None:
+        return None, None
+    return index.vendor_name(vendor_id), index.device_name(vendor_id, device_id)
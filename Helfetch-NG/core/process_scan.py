@@ -0,0 +1,212 @@
+# core/process_scan.py
+
+import heapq
+import os
+import time
+
+from utils.host import get_host_root, host_path
+from utils.trace import traced
+
+# A process scan reads /proc/[pid]/stat for every PID in one pass, waits one
+# shared window, reads them all again and ranks the deltas in bulk. The cost
+# is one window plus two directory passes, regardless of how many processes
+# are running.
+
+SCAN_WINDOW = 0.1 # seconds, shared by all processes
+SORT_KEYS = ('cpu', 'rss', 'io')
+
+# Helfetch itself is busiest exactly during the scan window, so it is left out
+# of the ranking, and so is its parent if that is a shell or timing tool that
+# only launched it (e.g. `time helfetch` or a benchmark loop).
+MEASURING_PARENTS = frozenset(('sh', 'bash', 'dash', 'zsh', 'fish', 'ksh', 'mksh', 'tcsh', 'csh',
+                               'time', 'hyperfine', 'perf', 'strace'))
+
+CLOCK_TICKS = os.sysconf('SC_CLK_TCK') if hasattr(os, 'sysconf') else 100
+PAGE_SIZE = os.sysconf('SC_PAGE_SIZE') if hasattr(os, 'sysconf') else 4096
+
+# The previous snapshot is kept so that repeated scans in the same process
+# (e.g. a refresh loop) measure against it instead of waiting again.
+_previous_snapshot = None
+
+def _read_io_bytes(proc, pid):
+    """Returns read_bytes + write_bytes from /proc/[pid]/io, or 0 if not permitted."""
+    try:
+        with open(f'{proc}/{pid}/io', 'rb') as f:
+            total = 0
+            for line in f:
+                if line.startswith(b'read_bytes:') or line.startswith(b'write_bytes:'):
+                    total += int(line.split()[1])
+            return total
+    except (OSError, ValueError, IndexError):
+        return 0
+
+def read_process_snapshot(with_io=False):
+    """
+    Reads /proc/[pid]/stat for every process in one pass.
+    Returns (timestamp, {pid: (name, cpu_ticks, rss_bytes, io_bytes)}).
+    """
+    processes = {}
+    timestamp = time.monotonic()
+    proc = host_path('/proc')
+    try:
+        entries = os.listdir(proc)
+    except OSError:
+        return timestamp, processes
+
+    for entry in entries:
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f'{proc}/{entry}/stat', 'rb') as f:
+                data = f.read()
+        except OSError:
+            continue # Process exited between listdir() and open()
+        # The command name is wrapped in parentheses and may itself contain spaces
+        # or parentheses, so split around the last ')'.
+        open_paren = data.find(b'(')
+        close_paren = data.rfind(b')')
+        if open_paren < 0 or close_paren < 0:
+            continue
+        name = data[open_paren + 1:close_paren].decode('utf-8', 'replace')
+        fields = data[close_paren + 2:].split()
+        try:
+            cpu_ticks = int(fields[11]) + int(fields[12]) # utime + stime
+            rss_bytes = int(fields[21]) * PAGE_SIZE
+        except (IndexError, ValueError):
+            continue
+        io_bytes = _read_io_bytes(proc, entry) if with_io else 0
+        processes[int(entry)] = (name, cpu_ticks, rss_bytes, io_bytes)
+
+    return timestamp, processes
+
+def find_processes(names, uid=None):
+    """
+    Returns {name: pid} for the processes whose command name is in `names`,
+    in one pass over /proc reading only /proc/[pid]/comm. If `uid` is given,
+    only processes owned by that user are considered. Command names are
+    truncated by the kernel to 15 characters, so `names` should be too.
+    """
+    found = {}
+    proc = host_path('/proc')
+    try:
+        entries = os.scandir(proc)
+    except OSError:
+        return found
+    with entries:
+        for entry in entries:
+            if not entry.name.isdigit():
+                continue
+            try:
+                if uid is not None and entry.stat().st_uid != uid:
+                    continue
+                with open(f'{proc}/{entry.name}/comm', 'rb') as f:
+                    name = f.read().rstrip(b'\n').decode('utf-8', 'replace')
+            except OSError:
+                continue # Process exited during the scan
+            if name in names and name not in found:
+                found[name] = int(entry.name)
+    return found
+
+def _read_total_memory():
+    """Returns MemTotal in bytes from /proc/meminfo, or 0 if unavailable."""
+    try:
+        with open(host_path('/proc/meminfo'), 'rb') as f:
+            for line in f:
+                if line.startswith(b'MemTotal:'):
+                    return int(line.split()[1]) * 1024
+    except (OSError, ValueError, IndexError):
+        pass
+    return 0
+
+def get_own_pids():
+    """
+    Returns the PIDs to leave out of the ranking: this process, and its
+    parent if it is in MEASURING_PARENTS. Under another host root (see
+    utils.host) our own PIDs mean nothing there, so none are left out.
+    """
+    if get_host_root() != '/':
+        return set()
+    pids = {os.getpid()}
+    parent = os.getppid()
+    try:
+        with open(f'/proc/{parent}/comm', 'rb') as f:
+            if f.read().rstrip(b'\n').decode('utf-8', 'replace') in MEASURING_PARENTS:
+                pids.add(parent)
+    except OSError:
+        pass
+    return pids
+
+@traced('process scan')
+def scan_top_processes(count=5, sort_by='cpu', window=SCAN_WINDOW):
+    """
+    Returns the top `count` processes ranked by 'cpu', 'rss' or 'io'.
+    Each entry is a dict with pid, name, cpu_percent, memory_percent, rss_bytes
+    and io_rate (bytes per second). Helfetch itself is not ranked (see
+    get_own_pids).
+    Ranking by RSS needs no delta, so it takes a single pass and never waits.
+    """
+    global _previous_snapshot
+    if sort_by not in SORT_KEYS:
+        raise ValueError(f"sort_by must be one of {SORT_KEYS}, not {sort_by!r}")
+
+    with_io = sort_by == 'io'
+    needs_delta = sort_by != 'rss'
+    previous = _previous_snapshot
+    if needs_delta and (previous is None or previous[2] != with_io):
+        timestamp, processes = read_process_snapshot(with_io)
+        previous = (timestamp, processes, with_io)
+        time.sleep(window)
+
+    timestamp, processes = read_process_snapshot(with_io)
+    _previous_snapshot = (timestamp, processes, with_io)
+
+    elapsed = timestamp - previous[0] if needs_delta else 0
+    previous_processes = previous[1] if needs_delta else {}
+    total_memory = _read_total_memory()
+
+    def make_entry(pid, current):
+        name, cpu_ticks, rss_bytes, io_bytes = current
+        before = previous_processes.get(pid)
+        cpu_percent = 0.0
+        io_rate = 0.0
+        if before and elapsed > 0:
+            cpu_percent = 100.0 * (cpu_ticks - before[1]) / CLOCK_TICKS / elapsed
+            io_rate = max(0, io_bytes - before[3]) / elapsed
+        memory_percent = 100.0 * rss_bytes / total_memory if total_memory else 0.0
+        return {
+            'pid': pid,
+            'name': name,
+            'cpu_percent': max(0.0, cpu_percent),
+            'memory_percent': memory_percent,
+            'rss_bytes': rss_bytes,
+            'io_rate': io_rate,
+        }
+
+    own_pids = get_own_pids()
+    candidates = [(pid, current) for pid, current in processes.items() if pid not in own_pids]
+
+    if sort_by == 'rss':
+        # Select on the raw snapshot first so only `count` entries are built
+        top = heapq.nlargest(count, candidates, key=lambda item: item[1][2])
+        return [make_entry(pid, current) for pid, current in top]
+
+    entries = (make_entry(pid, current) for pid, current in candidates)
+    key = 'cpu_percent' if sort_by == 'cpu' else 'io_rate'
+    return heapq.nlargest(count, entries, key=lambda entry: entry[key])
+
+def format_process(entry, sort_by='cpu'):
+    """
+    Formats one process entry for display, leading with the ranking metric.
+    """
+    if sort_by == 'rss':
+        return f"{entry['name']} ({entry['rss_bytes'] / (1024 * 1024):.1f}MB RSS, {entry['memory_percent']:.1f}% RAM)"
+    if sort_by == 'io':
+        return f"{entry['name']} ({entry['io_rate'] / (1024 * 1024):.1f}MB/s I/O, {entry['memory_percent']:.1f}% RAM)"
+    return f"{entry['name']} ({entry['cpu_percent']:.1f}% CPU, {entry['memory_percent']:.1f}% RAM)"
+
+# For testing this module independently
+if __name__ == "__main__":
+    for sort_key in SORT_KEYS:
+        print(f"--- Top processes by {sort_key} ---")
+        for process in scan_top_processes(sort_by=sort_key):
+            print(format_process(process, sort_key))
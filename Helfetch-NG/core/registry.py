@@ -0,0 +1,134 @@
+# core/registry.py
+
+import importlib
+
+# Every field Helfetch can show, in display order, with the collector that
+# produces it and a rough relative cost (1 = a cheap file read or env lookup,
+# 10 = a network round trip). Only collectors owning a requested field run,
+# and they are asked for the requested fields only. Fields that share one
+# piece of work (one HTTP lookup, one psutil call) carry the same 'group'.
+# 'volatile' fields change from second to second; watch mode re-collects
+# only these, everything else is collected once. 'session' fields describe
+# the caller's own login session, so the daemon never serves them. A field
+# 'depends' on the fields whose inputs it reuses (see core.scheduler).
+
+COLLECTORS = {
+    # collector name: (module, function)
+    'system': ('core.system_info', 'get_system_info'),
+    'hardware': ('core.hardware_info', 'get_hardware_info'),
+    'desktop': ('core.desktop_info', 'get_desktop_info'),
+    'network': ('core.network_info', 'get_network_info'),
+}
+
+FIELD_REGISTRY = {
+    # field name: {'collector': ..., 'cost': ...}
+    'User': {'collector': 'system', 'cost': 1, 'session': True},
+    'Host': {'collector': 'system', 'cost': 1},
+    'OS': {'collector': 'system', 'cost': 1},
+    'Kernel': {'collector': 'system', 'cost': 1},
+    'Uptime': {'collector': 'system', 'cost': 1, 'volatile': True},
+    'Shell': {'collector': 'system', 'cost': 1, 'session': True},
+    'Terminal': {'collector': 'system', 'cost': 1, 'session': True},
+    'Packages': {'collector': 'system', 'cost': 3},
+    'Top Processes': {'collector': 'system', 'cost': 8, 'volatile': True},
+    'CPU': {'collector': 'hardware', 'cost': 1},
+    'CPU Usage': {'collector': 'hardware', 'cost': 1, 'volatile': True},
+    'CPU Temp': {'collector': 'hardware', 'cost': 1, 'volatile': True},
+    'RAM': {'collector': 'hardware', 'cost': 2, 'group': 'ram', 'volatile': True},
+    'RAM Usage %': {'collector': 'hardware', 'cost': 2, 'group': 'ram', 'volatile': True},
+    'Disk': {'collector': 'hardware', 'cost': 2},
+    'Disk I/O': {'collector': 'hardware', 'cost': 2, 'volatile': True},
+    'Disks': {'collector': 'hardware', 'cost': 2, 'volatile': True, 'depends': ('Disk I/O',)},
+    'GPU': {'collector': 'hardware', 'cost': 6},
+    'Battery': {'collector': 'hardware', 'cost': 2, 'volatile': True},
+    'Desktop Environment': {'collector': 'desktop', 'cost': 1, 'session': True},
+    'Window Manager': {'collector': 'desktop', 'cost': 2, 'session': True,
+                       'depends': ('Desktop Environment', 'Session Type')},
+    'Session Type': {'collector': 'desktop', 'cost': 1, 'session': True},
+    'GTK Theme': {'collector': 'desktop', 'cost': 3, 'session': True},
+    'Icons': {'collector': 'desktop', 'cost': 3, 'session': True, 'depends': ('GTK Theme',)},
+    'Font': {'collector': 'desktop', 'cost': 3, 'session': True, 'depends': ('GTK Theme',)},
+    'Qt Theme': {'collector': 'desktop', 'cost': 3, 'session': True, 'depends': ('GTK Theme',)},
+    'Local IP': {'collector': 'network', 'cost': 3},
+    'Public IP': {'collector': 'network', 'cost': 10, 'group': 'public_ip', 'depends': ('Local IP',)},
+    'ISP': {'collector': 'network', 'cost': 10, 'group': 'public_ip', 'depends': ('Local IP',)},
+    'City': {'collector': 'network', 'cost': 10, 'group': 'public_ip', 'depends': ('Local IP',)},
+    'Country': {'collector': 'network', 'cost': 10, 'group': 'public_ip', 'depends': ('Local IP',)},
+    'Bandwidth Usage': {'collector': 'network', 'cost': 1, 'volatile': True},
+    'Interfaces': {'collector': 'network', 'cost': 2, 'volatile': True, 'depends': ('Bandwidth Usage',)},
+}
+
+def base_field(key):
+    """
+    Maps an output key back to its registry field, e.g. 'Packages (Pacman)' -> 'Packages'.
+    """
+    if key in FIELD_REGISTRY:
+        return key
+    return key.split(' (', 1)[0]
+
+def parse_field_list(text):
+    """
+    Parses a comma-separated field list (case-insensitive) into registry names.
+    Raises ValueError naming any unknown field.
+    """
+    by_lower = {name.lower(): name for name in FIELD_REGISTRY}
+    names = []
+    for item in text.split(','):
+        item = item.strip()
+        if not item:
+            continue
+        name = by_lower.get(item.lower())
+        if name is None:
+            raise ValueError(f"unknown field '{item}' (known fields: {', '.join(FIELD_REGISTRY)})")
+        names.append(name)
+    return names
+
+def resolve_fields(include=None, exclude=None):
+    """
+    Returns the selected fields in display order: `include` (or every field)
+    minus `exclude`.
+    """
+    include = set(include) if include else set(FIELD_REGISTRY)
+    exclude = set(exclude or ())
+    return [name for name in FIELD_REGISTRY if name in include and name not in exclude]
+
+def volatile_fields(fields):
+    """Returns the fields among `fields` that watch mode refreshes on every tick."""
+    return [name for name in fields if FIELD_REGISTRY[name].get('volatile')]
+
+def session_fields(fields):
+    """Returns the fields among `fields` that describe the caller's login session."""
+    return [name for name in fields if FIELD_REGISTRY[name].get('session')]
+
+def load_collector(name):
+    """
+    Imports the collector's module on first use and returns its function.
+    """
+    module_name, function_name = COLLECTORS[name]
+    return getattr(importlib.import_module(module_name), function_name)
+
+def filter_info(info, fields):
+    """
+    Keeps only the selected fields of a merged info dict, in registry order.
+    """
+    selected = set(fields)
+    ordered = {name: index for index, name in enumerate(FIELD_REGISTRY)}
+    kept = [(key, value) for key, value in info.items() if base_field(key) in selected]
+    kept.sort(key=lambda item: ordered.get(base_field(item[0]), len(ordered)))
+    return dict(kept)
+
+def collect(fields, collector_options=None, executor=None, raw=None):
+    """
+    Collects `fields` (see core.scheduler) and returns the merged info dict,
+    limited to `fields` and in registry order. With an executor the tasks
+    run in parallel, otherwise one after another.
+    If `raw` is given, it receives each field's typed values plus a
+    'collected_at' timestamp.
+    """
+    from core.scheduler import start_tasks
+    field_futures = start_tasks(fields, collector_options, executor, raw)
+
+    collected = {}
+    for future in dict.fromkeys(field_futures.values()):
+        collected.update(future.result())
+    return filter_info(collected, fields)
@@ -0,0 +1,352 @@
+# core/sampler.py
+
+import os
+import threading
+import time
+
+from utils.helpers import get_boot_id, get_state_dir, read_json_file, write_json_file
+from utils.host import host_path
+from utils.trace import traced
+
+# CPU usage is measured from /proc/stat deltas instead of sleeping:
+# one sample is taken when Helfetch starts, the other when the value is
+# rendered, so the measurement window is the time collection already took.
+
+CPU_SAMPLE_FILE_NAME = "cpu_sample.json"
+
+# Below this many jiffies (summed over all CPUs) the in-process window is too
+# coarse to be meaningful, and the persisted sample from the last run is used.
+MIN_CPU_WINDOW_TICKS = 50
+
+# A persisted sample older than this says nothing about "now".
+MAX_PERSISTED_SAMPLE_AGE = 300 # seconds
+
+_start_sample = None
+_last_sample = None
+
+def read_cpu_times():
+    """
+    Reads the aggregate 'cpu' line of /proc/stat.
+    Returns (busy, total) jiffies, or None if /proc/stat is unavailable.
+    """
+    try:
+        with open(host_path('/proc/stat'), 'r') as f:
+            fields = f.readline().split()
+    except OSError:
+        return None
+    if not fields or fields[0] != 'cpu':
+        return None
+    # user nice system idle iowait irq softirq steal [guest guest_nice]
+    # guest time is already included in user/nice, so it is not added again.
+    values = [int(v) for v in fields[1:9]]
+    total = sum(values)
+    idle = values[3] + (values[4] if len(values) > 4 else 0)
+    return total - idle, total
+
+def start_cpu_sample():
+    """
+    Takes the start-of-process CPU sample. Call this before the collectors run.
+    """
+    global _start_sample
+    _start_sample = read_cpu_times()
+
+def _load_persisted_sample():
+    """Returns the (busy, total) sample saved by the last run on this boot, if recent."""
+    saved = read_json_file(os.path.join(get_state_dir(), CPU_SAMPLE_FILE_NAME))
+    try:
+        if saved.get('boot_id') != get_boot_id():
+            return None
+        if time.time() - saved.get('time', 0) > MAX_PERSISTED_SAMPLE_AGE:
+            return None
+        return saved['busy'], saved['total']
+    except (KeyError, TypeError, AttributeError):
+        return None
+
+def _usage_between(previous, current):
+    """Returns the busy percentage between two samples, or None if no time elapsed."""
+    if not previous or not current:
+        return None
+    total_delta = current[1] - previous[1]
+    if total_delta <= 0:
+        return None
+    busy_delta = current[0] - previous[0]
+    return max(0.0, min(100.0, 100.0 * busy_delta / total_delta))
+
+def measure_cpu_usage(use_persisted=True, since_last_reading=False):
+    """
+    Returns CPU usage as a float percentage over the window since start_cpu_sample(),
+    falling back to the window since the last run's persisted sample when the
+    in-process window is too short. Never sleeps.
+    With `since_last_reading=True` the window starts at the previous call
+    instead, which is what a refresh loop wants.
+    """
+    global _last_sample
+    current = read_cpu_times()
+    if current is None:
+        return None
+    previous = _last_sample if since_last_reading and _last_sample else _start_sample
+    _last_sample = current
+
+    if use_persisted and (previous is None or current[1] - previous[1] < MIN_CPU_WINDOW_TICKS):
+        previous = _load_persisted_sample() or previous
+
+    return _usage_between(previous, current)
+
+def format_cpu_usage(usage):
+    """Formats a measure_cpu_usage() result for display, e.g. "12.5%"."""
+    return f"{usage:.1f}%" if usage is not None else 'N/A'
+
+def get_cpu_usage(use_persisted=True, since_last_reading=False):
+    """
+    Returns CPU usage formatted for display (e.g. "12.5%"); see measure_cpu_usage().
+    """
+    return format_cpu_usage(measure_cpu_usage(use_persisted, since_last_reading))
+
+def save_cpu_sample():
+    """
+    Persists the most recent CPU sample so the next run can measure usage
+    since this one with zero added latency.
+    """
+    if _last_sample is None:
+        return
+    # Persisting the sample is optional; a failed write is ignored
+    write_json_file(os.path.join(get_state_dir(), CPU_SAMPLE_FILE_NAME), {
+        'boot_id': get_boot_id(),
+        'time': time.time(),
+        'busy': _last_sample[0],
+        'total': _last_sample[1],
+    })
+
+# Disk and network rates use the same approach with /proc/diskstats and
+# /proc/net/dev: both are read together at start_io_sample() and again when
+# the rates are measured, falling back to the last run's persisted sample when
+# the in-process window is too short. Concurrent measurements (the disk and
+# network collectors run in parallel) share one end reading, and each new
+# reading starts the window of the next, which is what refresh loops want.
+
+IO_SAMPLE_FILE_NAME = "io_sample.json"
+MIN_IO_WINDOW = 0.5 # seconds
+# Measurements this close together share one end reading.
+IO_READING_REUSE = 0.05 # seconds
+SECTOR_SIZE = 512 # /proc/diskstats always counts 512-byte sectors
+IGNORED_BLOCK_PREFIXES = ('loop', 'ram')
+
+_io_lock = threading.Lock()
+_io_start_sample = None
+_io_previous_sample = None
+_io_last_sample = None
+_stacked_devices = {}
+
+def is_stacked_device(name):
+    """
+    True for block devices built on other devices (device-mapper, md RAID),
+    whose I/O is already counted on the disks underneath. Cached per device.
+    """
+    path = host_path(f'/sys/block/{name}/slaves')
+    if path not in _stacked_devices:
+        try:
+            _stacked_devices[path] = bool(os.listdir(path))
+        except OSError:
+            _stacked_devices[path] = False
+    return _stacked_devices[path]
+
+def read_disk_counters():
+    """
+    Reads /proc/diskstats for whole disks (not partitions, loop or RAM disks).
+    Returns {device: [reads, sectors_read, writes, sectors_written]}.
+    """
+    try:
+        disks = set(os.listdir(host_path('/sys/block')))
+    except OSError:
+        disks = None
+    counters = {}
+    try:
+        with open(host_path('/proc/diskstats'), 'r') as f:
+            for line in f:
+                fields = line.split()
+                if len(fields) < 10:
+                    continue
+                name = fields[2]
+                if name.startswith(IGNORED_BLOCK_PREFIXES) or (disks is not None and name not in disks):
+                    continue
+                counters[name] = [int(fields[3]), int(fields[5]), int(fields[7]), int(fields[9])]
+    except (OSError, ValueError):
+        pass
+    return counters
+
+# Columns kept per interface by read_net_counters(), in order.
+NET_COUNTER_COLUMNS = ('rx_bytes', 'rx_packets', 'rx_errors', 'rx_drops',
+                       'tx_bytes', 'tx_packets', 'tx_errors', 'tx_drops')
+
+def read_net_counters():
+    """
+    Reads /proc/net/dev for every interface except loopback, in one read.
+    Returns {interface: [counters in NET_COUNTER_COLUMNS order]}.
+    """
+    counters = {}
+    try:
+        with open(host_path('/proc/net/dev'), 'r') as f:
+            lines = f.readlines()[2:] # Skip the two header lines
+    except OSError:
+        return counters
+    for line in lines:
+        name, _, data = line.partition(':')
+        name = name.strip()
+        fields = data.split()
+        if name == 'lo' or len(fields) < 12:
+            continue
+        try:
+            # rx: bytes packets errs drop fifo frame compressed multicast, then tx: bytes packets errs drop ...
+            counters[name] = [int(fields[0]), int(fields[1]), int(fields[2]), int(fields[3]),
+                              int(fields[8]), int(fields[9]), int(fields[10]), int(fields[11])]
+        except ValueError:
+            continue
+    return counters
+
+@traced('I/O counters')
+def read_io_counters():
+    """Reads disk and network counters together, with a monotonic timestamp."""
+    return {'time': time.monotonic(), 'disks': read_disk_counters(), 'interfaces': read_net_counters()}
+
+def start_io_sample():
+    """
+    Takes the start-of-process disk and network sample. Call this before the collectors run.
+    """
+    global _io_start_sample
+    _io_start_sample = read_io_counters()
+
+def _load_persisted_io_sample():
+    """Returns the I/O sample saved by the last run on this boot, if recent."""
+    saved = read_json_file(os.path.join(get_state_dir(), IO_SAMPLE_FILE_NAME))
+    try:
+        if saved.get('boot_id') != get_boot_id() or saved.get('net_columns') != list(NET_COUNTER_COLUMNS):
+            return None
+        # time.monotonic() counts from boot, so it is comparable within one boot
+        if time.monotonic() - saved['sample']['time'] > MAX_PERSISTED_SAMPLE_AGE:
+            return None
+        return saved['sample']
+    except (KeyError, TypeError, AttributeError):
+        return None
+
+def _rates_between(previous, current):
+    """
+    Returns per-second rates per disk and interface between two I/O samples,
+    or None if no time elapsed. Counters that went backwards are skipped.
+    """
+    if not previous or not current:
+        return None
+    interval = current['time'] - previous['time']
+    if interval <= 0:
+        return None
+
+    def deltas(name, now, before):
+        if name not in before:
+            return None
+        changes = [value - old for value, old in zip(now, before[name])]
+        return changes if min(changes) >= 0 else None
+
+    disks = {}
+    for name, counters in current['disks'].items():
+        changes = deltas(name, counters, previous['disks'])
+        if changes is not None:
+            reads, sectors_read, writes, sectors_written = (change / interval for change in changes)
+            disks[name] = {
+                'read_bytes_per_s': sectors_read * SECTOR_SIZE,
+                'write_bytes_per_s': sectors_written * SECTOR_SIZE,
+                'read_iops': reads,
+                'write_iops': writes,
+                'stacked': is_stacked_device(name),
+            }
+
+    interfaces = {}
+    for name, counters in current['interfaces'].items():
+        changes = deltas(name, counters, previous['interfaces'])
+        if changes is not None:
+            rx_bytes, rx_packets, _, _, tx_bytes, tx_packets, _, _ = (change / interval for change in changes)
+            interfaces[name] = {
+                'rx_bytes_per_s': rx_bytes,
+                'tx_bytes_per_s': tx_bytes,
+                'rx_packets_per_s': rx_packets,
+                'tx_packets_per_s': tx_packets,
+            }
+
+    return {'interval': interval, 'disks': disks, 'interfaces': interfaces}
+
+def measure_io_rates(use_persisted=True):
+    """
+    Returns disk and network rates ({'interval', 'disks', 'interfaces'}) over
+    the window since the previous reading (or start_io_sample()), falling back
+    to the window since the last run's persisted sample when that is too
+    short. Returns the current counters alongside, as (rates, sample).
+    Never sleeps.
+    """
+    global _io_previous_sample, _io_last_sample
+    with _io_lock:
+        now = time.monotonic()
+        if _io_last_sample is None or now - _io_last_sample['time'] > IO_READING_REUSE:
+            _io_previous_sample, _io_last_sample = _io_last_sample, read_io_counters()
+        previous = _io_previous_sample or _io_start_sample
+        current = _io_last_sample
+
+    if use_persisted and (previous is None or current['time'] - previous['time'] < MIN_IO_WINDOW):
+        previous = _load_persisted_io_sample() or previous
+
+    return _rates_between(previous, current), current
+
+def total_disk_rates(rates):
+    """
+    Sums the per-disk rates of a measure_io_rates() result, skipping stacked
+    devices so I/O is not counted twice.
+    """
+    totals = dict.fromkeys(('read_bytes_per_s', 'write_bytes_per_s', 'read_iops', 'write_iops'), 0.0)
+    for disk in rates['disks'].values():
+        if not disk['stacked']:
+            for key in totals:
+                totals[key] += disk[key]
+    return totals
+
+def total_net_rates(rates):
+    """Sums the per-interface rates of a measure_io_rates() result."""
+    totals = dict.fromkeys(('rx_bytes_per_s', 'tx_bytes_per_s', 'rx_packets_per_s', 'tx_packets_per_s'), 0.0)
+    for interface in rates['interfaces'].values():
+        for key in totals:
+            totals[key] += interface[key]
+    return totals
+
+def total_disk_bytes(sample):
+    """Returns lifetime (read, written) bytes over the non-stacked disks of a sample."""
+    counters = [values for name, values in sample['disks'].items() if not is_stacked_device(name)]
+    return (sum(values[1] for values in counters) * SECTOR_SIZE,
+            sum(values[3] for values in counters) * SECTOR_SIZE)
+
+def total_net_bytes(sample):
+    """Returns lifetime (received, sent) bytes over the interfaces of a sample."""
+    counters = sample['interfaces'].values()
+    return sum(values[0] for values in counters), sum(values[4] for values in counters)
+
+def format_byte_rate(bytes_per_second):
+    """Formats a byte rate for display, e.g. "1.2MB/s"."""
+    return f"{bytes_per_second / (1024 * 1024):.1f}MB/s"
+
+def save_io_sample():
+    """
+    Persists the most recent disk and network sample so the next run can
+    measure rates since this one.
+    """
+    if _io_last_sample is None:
+        return
+    # Persisting the sample is optional; a failed write is ignored
+    write_json_file(os.path.join(get_state_dir(), IO_SAMPLE_FILE_NAME), {
+        'boot_id': get_boot_id(),
+        'net_columns': NET_COUNTER_COLUMNS,
+        'sample': _io_last_sample,
+    })
+
+# For testing this module independently
+if __name__ == "__main__":
+    start_cpu_sample()
+    time.sleep(0.5)
+    start_io_sample()
+    time.sleep(0.5)
+    print(f"CPU Usage: {get_cpu_usage(use_persisted=False)}")
+    print(f"I/O rates: {measure_io_rates(use_persisted=False)[0]}")
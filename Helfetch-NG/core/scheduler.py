@@ -0,0 +1,150 @@
+# core/scheduler.py
+
+import threading
+import time
+
+from config.default_config import COMMAND_RUN_DEADLINE
+from core.registry import FIELD_REGISTRY, load_collector
+from utils.cache import shared_inputs
+from utils.commands import command_deadline
+from utils.trace import bind_span, current_span
+
+# Collection runs as a graph of small tasks rather than one call per
+# collector. Every field is its own task, except fields sharing one piece of
+# work (a registry 'group'), which form one task. A task whose fields
+# 'depend' on other selected fields starts only once those tasks finished.
+# It then reuses the inputs they computed (utils.cache.shared_input) instead
+# of computing them again, or of holding a worker while it waits for them.
+# Ready tasks are handed to the executor most expensive first, so with
+# enough workers a run takes about as long as its slowest field. Commands
+# the tasks run share one deadline, COMMAND_RUN_DEADLINE seconds after the
+# run started (see utils.commands).
+
+def plan_graph(fields):
+    """
+    Splits `fields` into tasks. Returns ({task id: task}, {field: task id}),
+    where a task is {'collector', 'fields', 'cost', 'depends'}: its collector,
+    its set of fields, the cost of its most expensive field, and the set of
+    task ids it waits for.
+    """
+    tasks = {}
+    task_of = {}
+    for name in fields:
+        entry = FIELD_REGISTRY[name]
+        task_id = entry.get('group', name)
+        task = tasks.setdefault(task_id, {'collector': entry['collector'], 'fields': set(), 'cost': 0,
+                                          'depends': set()})
+        task['fields'].add(name)
+        task['cost'] = max(task['cost'], entry['cost'])
+        task_of[name] = task_id
+    # Dependencies on fields that were not selected are dropped: the task
+    # then computes the shared input itself
+    for name in fields:
+        for dependency in FIELD_REGISTRY[name].get('depends', ()):
+            if dependency in task_of and task_of[dependency] != task_of[name]:
+                tasks[task_of[name]]['depends'].add(task_of[dependency])
+    return tasks, task_of
+
+def order_tasks(tasks):
+    """
+    Returns the task ids in an order where every task follows the tasks it
+    depends on, most expensive first otherwise. Raises ValueError on a cycle.
+    """
+    by_cost = sorted(tasks, key=lambda task_id: tasks[task_id]['cost'], reverse=True)
+    order = []
+    state = {}
+
+    def visit(task_id):
+        if state.get(task_id) == 'done':
+            return
+        if state.get(task_id) == 'visiting':
+            raise ValueError(f"field dependency cycle through '{task_id}'")
+        state[task_id] = 'visiting'
+        for dependency in by_cost:
+            if dependency in tasks[task_id]['depends']:
+                visit(dependency)
+        state[task_id] = 'done'
+        order.append(task_id)
+
+    for task_id in by_cost:
+        visit(task_id)
+    return order
+
+def start_tasks(fields, collector_options=None, executor=None, raw=None):
+    """
+    Starts collecting `fields` and returns {field: Future}, each resolving to
+    the info dict of the task that collects the field. With an executor, each
+    task is submitted as soon as its dependencies finished; without one, all
+    tasks run one after another before this returns.
+    If `raw` is given, it receives each field's typed values plus a
+    'collected_at' timestamp as the field's task finishes.
+    """
+    import concurrent.futures
+    collector_options = collector_options or {}
+    tasks, task_of = plan_graph(fields)
+    order = order_tasks(tasks)
+
+    inputs = {} # the shared inputs of this run
+    deadline = time.monotonic() + COMMAND_RUN_DEADLINE
+    results = {task_id: concurrent.futures.Future() for task_id in tasks}
+    waiting = {task_id: len(task['depends']) for task_id, task in tasks.items()}
+    dependents = {task_id: [] for task_id in tasks}
+    for task_id in order:
+        for dependency in tasks[task_id]['depends']:
+            dependents[dependency].append(task_id)
+    lock = threading.Lock()
+    parent_span = current_span()
+
+    def run(task_id):
+        task = tasks[task_id]
+        collector = load_collector(task['collector'])
+        options = collector_options.get(task['collector'], {})
+        with shared_inputs(inputs), command_deadline(deadline):
+            if raw is None:
+                return collector(fields=task['fields'], **options)
+            raw_part = {}
+            info = collector(fields=task['fields'], raw=raw_part, **options)
+        collected_at = time.time()
+        for field in task['fields']:
+            raw_part.setdefault(field, {})['collected_at'] = collected_at
+        with lock:
+            raw.update(raw_part)
+        return info
+
+    if executor is None:
+        for task_id in order:
+            try:
+                results[task_id].set_result(run(task_id))
+            except Exception as e:
+                results[task_id].set_exception(e)
+        return {field: results[task_id] for field, task_id in task_of.items()}
+
+    def submit(task_id):
+        task = tasks[task_id]
+        label = ", ".join(field for field in fields if field in task['fields'])
+        future = executor.submit(bind_span(f"{task['collector']}: {label}", run, 'task', parent=parent_span),
+                                 task_id)
+        future.add_done_callback(lambda future: finish(task_id, future))
+
+    def finish(task_id, future):
+        # A failed task still releases its dependents; they compute the
+        # inputs it did not provide themselves
+        ready = []
+        with lock:
+            for dependent in dependents[task_id]:
+                waiting[dependent] -= 1
+                if not waiting[dependent]:
+                    ready.append(dependent)
+        for dependent in ready:
+            submit(dependent)
+        error = future.exception()
+        if error is None:
+            results[task_id].set_result(future.result())
+        else:
+            results[task_id].set_exception(error)
+
+    # Decided before submitting anything: a task finishing meanwhile submits
+    # its own dependents
+    for task_id in [task_id for task_id in order if not tasks[task_id]['depends']]:
+        submit(task_id)
+    return {field: results[task_id] for field, task_id in task_of.items()}
@@ -0,0 +1,153 @@
+# core/sensors.py
+
+import os
+import re
+
+from utils.cache import cached_fact, store_fact
+from utils.helpers import get_boot_id
+from utils.host import host_path
+from utils.trace import traced
+
+# CPU temperatures from the CPU's own hwmon driver rather than whichever
+# thermal zone comes first (often an ACPI or chipset sensor). Discovery scans
+# /sys/class/hwmon/*/name once per boot (hwmon numbering can change between
+# boots) and caches the resolved temp*_input paths, so later runs only read
+# those files.
+
+HWMON_DIR = '/sys/class/hwmon'
+THERMAL_DIR = '/sys/class/thermal'
+# CPU temperature drivers, most specific first
+CPU_SENSOR_DRIVERS = ('coretemp', 'zenpower', 'k10temp')
+# Labels of the whole-package reading, in order of preference
+# (coretemp: "Package id N"; k10temp/zenpower: Tdie is the real die
+# temperature, Tctl may carry a fan-control offset)
+PACKAGE_LABELS = (re.compile(r'Package id \d+'), re.compile(r'Tdie'), re.compile(r'Tctl'))
+# Labels of per-core (coretemp) or per-CCD (k10temp/zenpower) readings
+CORE_LABEL = re.compile(r'Core \d+|Tccd\d+')
+# Thermal zones that measure the CPU, for machines without a CPU hwmon driver
+CPU_THERMAL_ZONE_TYPES = ('x86_pkg_temp', 'cpu-thermal', 'cpu_thermal')
+
+def _read_text(path):
+    try:
+        with open(path, 'r') as f:
+            return f.read().strip()
+    except OSError:
+        return None
+
+def _natural_key(label):
+    return [int(part) if part.isdigit() else part for part in re.split(r'(\d+)', label)]
+
+def _hwmon_inputs(hwmon_path):
+    """Returns [(label, temp*_input path)] for one hwmon device."""
+    inputs = []
+    try:
+        names = os.listdir(hwmon_path)
+    except OSError:
+        return inputs
+    for name in names:
+        if name.startswith('temp') and name.endswith('_input'):
+            prefix = name[:-len('_input')]
+            label = _read_text(os.path.join(hwmon_path, f'{prefix}_label')) or prefix
+            inputs.append((label, os.path.join(hwmon_path, name)))
+    return inputs
+
+def discover_cpu_sensors(hwmon_dir=None, thermal_dir=None):
+    """
+    Finds the CPU temperature inputs. Returns {'driver', 'package', 'cores'}
+    where 'package' is a list of input paths (one per socket) and 'cores' a
+    list of [label, path] pairs, or None if no CPU sensor is found.
+    """
+    hwmon_dir = hwmon_dir or host_path(HWMON_DIR)
+    thermal_dir = thermal_dir or host_path(THERMAL_DIR)
+    chips = {}
+    try:
+        hwmons = sorted(os.listdir(hwmon_dir), key=_natural_key)
+    except OSError:
+        hwmons = []
+    for hwmon in hwmons:
+        path = os.path.join(hwmon_dir, hwmon)
+        driver = _read_text(os.path.join(path, 'name'))
+        if driver in CPU_SENSOR_DRIVERS:
+            chips.setdefault(driver, []).append(path)
+
+    for driver in CPU_SENSOR_DRIVERS:
+        if driver not in chips:
+            continue
+        inputs = [item for path in chips[driver] for item in _hwmon_inputs(path)]
+        package = []
+        for pattern in PACKAGE_LABELS:
+            package = sorted((path for label, path in inputs if pattern.fullmatch(label)), key=_natural_key)
+            if package:
+                break
+        cores = sorted(([label, path] for label, path in inputs if CORE_LABEL.fullmatch(label)),
+                       key=lambda item: _natural_key(item[0]))
+        if package or cores:
+            return {'driver': driver, 'package': package, 'cores': cores}
+
+    try:
+        zones = sorted(os.listdir(thermal_dir), key=_natural_key)
+    except OSError:
+        zones = []
+    for zone in zones:
+        path = os.path.join(thermal_dir, zone)
+        if zone.startswith('thermal_zone') and _read_text(os.path.join(path, 'type')) in CPU_THERMAL_ZONE_TYPES:
+            return {'driver': 'thermal', 'package': [os.path.join(path, 'temp')], 'cores': []}
+    return None
+
+def _read_celsius(path):
+    value = _read_text(path)
+    try:
+        return int(value) / 1000.0 # millidegrees Celsius
+    except (TypeError, ValueError):
+        return None
+
+def read_cpu_temperatures(sensors):
+    """
+    Reads the inputs found by discover_cpu_sensors(). Returns
+    {'package': °C or None, 'cores': [(label, °C)]}, where 'package' is the
+    hottest socket (or the hottest core if there is no package sensor).
+    """
+    package = [value for value in map(_read_celsius, sensors['package']) if value is not None]
+    cores = [(label, value) for label, value in
+             ((label, _read_celsius(path)) for label, path in sensors['cores']) if value is not None]
+    hottest = max(package, default=None)
+    if hottest is None and cores:
+        hottest = max(value for _, value in cores)
+    return {'package': hottest, 'cores': cores}
+
+@traced('CPU temperature')
+def get_cpu_temperatures():
+    """
+    Returns read_cpu_temperatures() for the cached sensor paths, or None if
+    the CPU has no temperature sensor. If the cached paths stop working
+    (e.g. the driver was reloaded), the sensors are discovered again and the
+    new paths replace the cached ones.
+    """
+    boot_id = get_boot_id()
+    cached = cached_fact('cpu_sensors', boot_id, discover_cpu_sensors)
+    if not cached:
+        return None
+    temperatures = read_cpu_temperatures(cached)
+    if temperatures['package'] is not None:
+        return temperatures
+    sensors = discover_cpu_sensors()
+    if sensors != cached:
+        store_fact('cpu_sensors', boot_id, sensors)
+    return read_cpu_temperatures(sensors) if sensors else None
+
+def format_cpu_temperatures(temperatures):
+    """Formats the package temperature, plus the per-core range if known."""
+    if not temperatures or temperatures['package'] is None:
+        return 'N/A'
+    text = f"{temperatures['package']:.1f}°C"
+    values = [value for _, value in temperatures['cores']]
+    if len(values) > 1:
+        text += f" (cores {min(values):.0f}-{max(values):.0f}°C)"
+    return text
+
+# For testing this module independently
+if __name__ == "__main__":
+    sensors = discover_cpu_sensors()
+    print(f"Sensors: {sensors}")
+    temperatures = read_cpu_temperatures(sensors) if sensors else None
+    print(f"CPU Temp: {format_cpu_temperatures(temperatures)}")
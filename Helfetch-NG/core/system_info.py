@@ -1,55 +1,42 @@
 # core/system_info.py
 
-import platform
-import subprocess
 import os
 import re
 import random # استيراد مكتبة random لاختيار الرسائل عشوائيا
-import psutil # For running processes
 
 # استيراد قائمة الرسائل من ملف quotes.py
 from config.quotes import QUOTES
-
-def get_running_processes():
+from config.default_config import TOP_PROCESSES_COUNT, TOP_PROCESSES_SORT
+from core.process_scan import scan_top_processes, format_process
+from core.packages import count_rpm_sqlite_packages, detect_package_backend, get_package_count
+from utils.cache import cached_fact
+from utils.commands import TIMEOUT_VALUE
+from utils.helpers import get_mtime_key, make_field_filter
+from utils.host import get_host_root, host_path
+from utils.trace import traced
+
+def get_running_processes(count=TOP_PROCESSES_COUNT, sort_by=TOP_PROCESSES_SORT, raw=None):
     """
-    Gets the top 5 running processes by CPU usage.
+    Gets the top running processes, ranked by CPU usage, RSS or I/O.
+    If `raw` is given, the unformatted process entries are stored in it.
     """
     try:
-        processes = []
-        for proc in psutil.process_iter(['pid', 'name', 'cpu_percent', 'memory_percent']):
-            try:
-                # Add a small delay for cpu_percent to be meaningful
-                proc.cpu_percent(interval=0.01) # Small interval to get CPU usage
-                processes.append(proc.info)
-            except (psutil.NoSuchProcess, psutil.AccessDenied, psutil.ZombieProcess):
-                pass
-        
-        # Sort by CPU usage and get top 5
-        processes.sort(key=lambda x: x['cpu_percent'], reverse=True)
-        top_processes = [f"{p['name']} ({p['cpu_percent']:.1f}% CPU, {p['memory_percent']:.1f}% RAM)" for p in processes[:5]]
-        return "\n    ".join(top_processes) if top_processes else "N/A"
+        entries = scan_top_processes(count, sort_by)
     except Exception:
         return "N/A"
+    if raw is not None:
+        raw['Top Processes'] = {'value': entries, 'sort_by': sort_by}
+    top_processes = [format_process(p, sort_by) for p in entries]
+    return "\n    ".join(top_processes) if top_processes else "N/A"
 
-def get_system_info():
+@traced('os-release')
+def get_os_name():
     """
-    Collects basic system-related information.
+    Returns the pretty OS name from /etc/os-release.
     """
-    info = {}
-
-    # 1. User
-    try:
-        info['User'] = os.getlogin()
-    except OSError:
-        info['User'] = os.getenv('USER') or os.getenv('USERNAME') or 'N/A'
-
-    # 2. Host
-    info['Host'] = platform.node()
-
-    # 3. OS
     os_name = 'N/A'
     try:
-        with open('/etc/os-release', 'r') as f:
+        with open(host_path('/etc/os-release'), 'r') as f:
             for line in f:
                 if line.startswith('PRETTY_NAME='):
                     os_name = line.strip().split('=')[1].strip('\"')
@@ -59,92 +46,127 @@ def get_system_info():
             # يمكنك إضافة إصدار مخصص لـ Helwan Linux هنا
             # os_name += " (Ver. 1.0 'Phoenix')"
     except FileNotFoundError:
+        import platform # Only needed on systems without /etc/os-release
         os_name = platform.system()
         if os_name == "Windows":
             os_name = "Windows"
-    info['OS'] = os_name
+    return os_name
+
+def get_uname_value(attribute, proc_path):
+    """
+    Returns an os.uname() value, or under another host root (see utils.host)
+    the same value from that root's /proc.
+    """
+    if get_host_root() == '/':
+        return getattr(os.uname(), attribute)
+    try:
+        with open(host_path(proc_path), 'r') as f:
+            return f.read().strip() or 'N/A'
+    except OSError:
+        return 'N/A'
+
+def get_package_db_key(backend):
+    """
+    Returns an invalidation key for the package count: the mtime of the
+    backend's package database, or None if there is no backend. For rpm's
+    sqlite database the mtime of its write-ahead log is part of the key, as
+    new commits only reach rpmdb.sqlite at the next checkpoint.
+    """
+    if not backend:
+        return None
+    key = get_mtime_key(backend[1])
+    if key is not None and backend[2] is count_rpm_sqlite_packages:
+        wal_key = get_mtime_key(backend[1] + '-wal')
+        if wal_key is not None:
+            key = f"{key}+{wal_key}"
+    return key
+
+def get_system_info(fields=None, top_processes_by=TOP_PROCESSES_SORT, raw=None):
+    """
+    Collects basic system-related information.
+    If `fields` is given, only those fields are collected.
+    If `raw` is given, typed values (numbers and units) are stored in it by field name.
+    `top_processes_by` selects how 'Top Processes' is ranked: 'cpu', 'rss' or 'io'.
+    """
+    wanted = make_field_filter(fields)
+    info = {}
+
+    # 1. User
+    if wanted('User'):
+        try:
+            info['User'] = os.getlogin()
+        except OSError:
+            info['User'] = os.getenv('USER') or os.getenv('USERNAME') or 'N/A'
+
+    # 2. Host
+    if wanted('Host'):
+        info['Host'] = get_uname_value('nodename', '/proc/sys/kernel/hostname')
+
+    # 3. OS - cached until /etc/os-release changes
+    if wanted('OS'):
+        info['OS'] = cached_fact('os_name', get_mtime_key(host_path('/etc/os-release')), get_os_name)
 
     # 4. Kernel
-    info['Kernel'] = platform.release()
+    if wanted('Kernel'):
+        info['Kernel'] = get_uname_value('release', '/proc/sys/kernel/osrelease')
 
     # 5. Uptime
-    uptime_val = 'N/A'
-    try:
-        with open('/proc/uptime', 'r') as f:
-            uptime_seconds = float(f.readline().split()[0])
-            minutes, seconds = divmod(int(uptime_seconds), 60)
-            hours, minutes = divmod(minutes, 60)
-            days, hours = divmod(hours, 24)
-
-            if days > 0:
-                uptime_val = f"{days}d {hours}h {minutes}m"
-            elif hours > 0:
-                uptime_val = f"{hours}h {minutes}m"
-            else:
-                uptime_val = f"{minutes}m"
-    except (FileNotFoundError, ValueError): # هذا هو السطر 85
+    if wanted('Uptime'):
         uptime_val = 'N/A'
-    info['Uptime'] = uptime_val
+        try:
+            with open(host_path('/proc/uptime'), 'r') as f:
+                uptime_seconds = float(f.readline().split()[0])
+                if raw is not None:
+                    raw['Uptime'] = {'value': uptime_seconds, 'unit': 'seconds'}
+                minutes, seconds = divmod(int(uptime_seconds), 60)
+                hours, minutes = divmod(minutes, 60)
+                days, hours = divmod(hours, 24)
+
+                if days > 0:
+                    uptime_val = f"{days}d {hours}h {minutes}m"
+                elif hours > 0:
+                    uptime_val = f"{hours}h {minutes}m"
+                else:
+                    uptime_val = f"{minutes}m"
+        except (FileNotFoundError, ValueError): # هذا هو السطر 85
+            uptime_val = 'N/A'
+        info['Uptime'] = uptime_val
 
     # 6. Shell
-    shell_val = 'N/A'
-    try:
-        shell_val = os.getenv('SHELL')
-        if shell_val:
-            shell_val = os.path.basename(shell_val)
-    except Exception:
-        pass
-    info['Shell'] = shell_val
-
-    # 7. Terminal
-    terminal_val = 'N/A'
-    try:
-        terminal_val = os.getenv('TERM') or os.getenv('COLORTERM')
-    except Exception:
-        pass
-    info['Terminal'] = terminal_val
-
-    # 8. Packages (Pacman, apt, etc.)
-    packages_val = 'N/A'
-    package_manager = 'N/A'
-    
-    # Try Pacman (Arch-based)
-    try:
-        pacman_count = subprocess.run(['pacman', '-Qq'], capture_output=True, text=True, check=True).stdout.count('\n')
-        if pacman_count > 0:
-            packages_val = str(pacman_count)
-            package_manager = 'Pacman'
-    except (subprocess.CalledProcessError, FileNotFoundError):
-        pass
-
-    # Try DPKG (Debian-based)
-    if package_manager == 'N/A':
+    if wanted('Shell'):
+        shell_val = 'N/A'
         try:
-            dpkg_count = subprocess.run(['dpkg', '-l'], capture_output=True, text=True, check=True).stdout.count('\n')
-            # dpkg -l includes header, subtract 5-6 lines for accuracy
-            if dpkg_count > 0:
-                packages_val = str(max(0, dpkg_count - 5))
-                package_manager = 'DPKG'
-        except (subprocess.CalledProcessError, FileNotFoundError):
+            shell_val = os.getenv('SHELL')
+            if shell_val:
+                shell_val = os.path.basename(shell_val)
+        except Exception:
             pass
-            
-    # Try RPM (RedHat-based)
-    if package_manager == 'N/A':
+        info['Shell'] = shell_val
+
+    # 7. Terminal
+    if wanted('Terminal'):
+        terminal_val = 'N/A'
         try:
-            rpm_count = subprocess.run(['rpm', '-qa'], capture_output=True, text=True, check=True).stdout.count('\n')
-            if rpm_count > 0:
-                packages_val = str(rpm_count)
-                package_manager = 'RPM'
-        except (subprocess.CalledProcessError, FileNotFoundError):
+            terminal_val = os.getenv('TERM') or os.getenv('COLORTERM')
+        except Exception:
             pass
-
-    if package_manager != 'N/A':
-        info[f'Packages ({package_manager})'] = packages_val
-    else:
-        info['Packages'] = 'N/A' # Fallback if no known package manager is found
+        info['Terminal'] = terminal_val
+
+    # 8. Packages (Pacman, apt, etc.) - cached until the package database changes
+    if wanted('Packages'):
+        backend = detect_package_backend()
+        packages = cached_fact('packages', get_package_db_key(backend), lambda: get_package_count(backend),
+                               cacheable=lambda packages: packages.get('count') != TIMEOUT_VALUE)
+        if packages and packages.get('manager') != 'N/A':
+            info[f"Packages ({packages['manager']})"] = packages['count']
+            if raw is not None and packages['count'].isdigit():
+                raw['Packages'] = {'value': int(packages['count']), 'unit': 'packages', 'manager': packages['manager']}
+        else:
+            info['Packages'] = 'N/A' # Fallback if no known package manager is found
 
     # 9. Top Running Processes
-    info['Top Processes'] = get_running_processes()
+    if wanted('Top Processes'):
+        info['Top Processes'] = get_running_processes(sort_by=top_processes_by, raw=raw)
 
 
     return info
@@ -0,0 +1,56 @@
+# display/fleet_report.py
+
+from display.ascii_art import COLORS
+from config.default_config import DEFAULT_COLORS
+
+PERCENTILE_LABELS = {0: "min", 50: "median", 100: "max"}
+
+def _format_percentiles(percentiles, unit="", precision=1):
+    if percentiles is None:
+        return "N/A"
+    return ", ".join(f"{PERCENTILE_LABELS.get(percent, f'p{percent}')} {value:.{precision}f}{unit}"
+                     for percent, value in percentiles.items())
+
+def format_fleet_report(report):
+    """
+    Formats the report from core.fleet.get_fleet_report() as text sections.
+    """
+    key_color = COLORS.get(DEFAULT_COLORS.get("info_key_color"), COLORS["reset"])
+    value_color = COLORS.get(DEFAULT_COLORS.get("info_value_color"), COLORS["reset"])
+    reset = COLORS["reset"]
+
+    def heading(text):
+        return f"{key_color}{text}:{reset}"
+
+    def item(text):
+        return f"  {value_color}{text}{reset}"
+
+    lines = [f"{heading('Hosts')} {value_color}{report['hosts']}{reset}"]
+
+    lines.append(heading(f"Kernels ({report['kernel_count']} distinct)"))
+    for kernel, hosts in report['kernels']:
+        lines.append(item(f"{hosts:>8}  {kernel}"))
+
+    lines.append(heading("RAM Usage %"))
+    lines.append(item(_format_percentiles(report['ram_usage_percentiles'], "%")))
+
+    lines.append(heading("Disk Fill Outliers"))
+    outliers = report['disk_outliers']
+    if outliers is None:
+        lines.append(item("N/A"))
+    elif outliers['fence'] >= 100:
+        # The fleet spreads so widely that even a full disk is within the fence
+        lines.append(item("none possible (fence above 100%)"))
+    else:
+        lines.append(item(f"{outliers['count']} hosts above {outliers['fence']:.1f}%"))
+        for host, fill in outliers['hosts']:
+            lines.append(item(f"{fill:>7.1f}%  {host}"))
+
+    lines.append(heading("Packages"))
+    lines.append(item(_format_percentiles(report['packages'], precision=0)))
+
+    lines.append(heading("Recommendations"))
+    for recommendation, hosts in report['recommendations']:
+        lines.append(item(f"{hosts:>8}  {recommendation}"))
+
+    return "\n".join(lines)
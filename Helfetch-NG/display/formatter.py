@@ -1,14 +1,13 @@
 # display/formatter.py
 
-import re
 from display.ascii_art import COLORS # استيراد قاموس الألوان من ascii_art
-from config.default_config import DEFAULT_COLORS # استيراد الألوان الافتراضية
+from display.layout import ANSI_ESCAPE, visible_width, fit_text, fits_beside, logo_width, place_beside, LOGO_GAP
+from config.default_config import DEFAULT_COLORS, LAYOUT_OVERFLOW # استيراد الألوان الافتراضية
 
 # دالة مساعدة لإزالة أكواد ANSI من النص لحساب الطول المرئي
 def clean_ansi(text):
     """Removes ANSI escape codes from a string."""
-    ansi_escape = re.compile(r'\x1B(?:[@-Z\\-_]|\[[0-9;]*[0-9A-Z])')
-    return ansi_escape.sub('', text)
+    return ANSI_ESCAPE.sub('', text)
 
 def create_progress_bar(percentage, bar_length=20, filled_char="█", empty_char="-", bar_color="green", empty_color="white"):
     """
@@ -26,10 +25,116 @@ def create_progress_bar(percentage, bar_length=20, filled_char="█", empty_char
     return f"[{filled_bar}{empty_bar}{COLORS['reset']}]"
 
 
-def format_info_output(info_data, logo_lines=None, inspirational_quote="", info_key_color="light_yellow", info_value_color="white", recommendations=None):
+SPARKLINE_CHARS = "▁▂▃▄▅▆▇█"
+
+def create_sparkline(points, low=0.0, high=None):
+    """
+    Creates a one-line sparkline from a list of values, scaled between `low`
+    and `high` (default: the largest value). None values (no samples) are blank.
+    """
+    known = [point for point in points if point is not None]
+    if high is None:
+        high = max(known, default=0.0)
+    span = high - low
+    chars = []
+    for point in points:
+        if point is None:
+            chars.append(" ")
+        elif span <= 0:
+            chars.append(SPARKLINE_CHARS[0])
+        else:
+            level = (min(max(point, low), high) - low) / span
+            chars.append(SPARKLINE_CHARS[min(len(SPARKLINE_CHARS) - 1, int(level * len(SPARKLINE_CHARS)))])
+    return "".join(chars)
+
+def _format_rate(bytes_per_second):
+    for unit in ("B/s", "KB/s", "MB/s"):
+        if bytes_per_second < 1024:
+            return f"{bytes_per_second:.1f}{unit}"
+        bytes_per_second /= 1024
+    return f"{bytes_per_second:.1f}GB/s"
+
+def format_history(summary):
+    """
+    Formats one field's history (from core.history.get_history_summary) as
+    a sparkline followed by min/avg/max.
+    """
+    if summary['kind'] == 'percent':
+        sparkline = create_sparkline(summary['points'], 0.0, 100.0)
+        format_value = lambda value: f"{value:.0f}%"
+    else:
+        sparkline = create_sparkline(summary['points'])
+        format_value = _format_rate
+    return (f"{sparkline} min {format_value(summary['min'])} avg {format_value(summary['avg'])} "
+            f"max {format_value(summary['max'])}")
+
+def add_history(info_data, history_summary):
+    """
+    Appends each field's history (see format_history) to its value.
+    """
+    for key, summary in history_summary.items():
+        if key in info_data:
+            info_data[key] = f"{info_data[key]}  {format_history(summary)}"
+
+
+# Fields whose value spans several lines; they are shown as a heading plus
+# indented lines and left out of the key alignment.
+MULTILINE_FIELDS = ("Top Processes", "Disks", "Interfaces")
+
+# "Packages (<manager>)" is only known once the packages are counted,
+# so reserve room for the longest manager name when aligning keys up front.
+PACKAGES_KEY_WIDTH = len("Packages (Pacman)")
+
+def field_key_width(fields):
+    """
+    Returns the key column width for a list of field names, before their
+    values (and therefore the final "Packages (...)" key) are known.
+    """
+    widths = [PACKAGES_KEY_WIDTH if name == "Packages" else len(name)
+              for name in fields if name not in MULTILINE_FIELDS]
+    return max(widths, default=0)
+
+
+def format_info_lines(key, value, max_key_width, width=None, overflow=LAYOUT_OVERFLOW):
+    """
+    Formats one field as display lines: "Key: value" padded to `max_key_width`,
+    or a heading plus indented lines for multi-line fields such as "Top Processes".
+    With `width`, values longer than the line are wrapped (continuation lines
+    are indented to the value column) or truncated, as `overflow` says.
+    """
+    info_key_color_code = COLORS.get(DEFAULT_COLORS.get("info_key_color"), COLORS["reset"])
+    info_value_color_code = COLORS.get(DEFAULT_COLORS.get("info_value_color"), COLORS["reset"])
+
+    if key in MULTILINE_FIELDS:
+        # Handle multi-line fields such as "Top Processes" separately
+        lines = [f"{info_key_color_code}{key}:{COLORS['reset']}"]
+        if value and value != "N/A":
+            line_width = max(1, width - 2) if width else None
+            for line in value.split('\n'):
+                for part in fit_text(line.strip(), line_width, overflow):
+                    lines.append(f"  {info_value_color_code}{part}{COLORS['reset']}")
+        else:
+            lines.append(f"  {info_value_color_code}N/A{COLORS['reset']}")
+        return lines
+
+    # For other info, format normally with padding for alignment
+    key_width = visible_width(key)
+    padding = max(0, max_key_width - key_width)
+    formatted_key = f"{info_key_color_code}{key}{' ' * padding}:{COLORS['reset']}"
+    value_column = max(max_key_width, key_width) + 2
+    value_lines = fit_text(str(value), max(1, width - value_column) if width else None, overflow)
+    lines = [f"{formatted_key} {info_value_color_code}{value_lines[0]}{COLORS['reset']}"]
+    for part in value_lines[1:]:
+        lines.append(f"{' ' * value_column}{info_value_color_code}{part}{COLORS['reset']}")
+    return lines
+
+
+def format_info_output(info_data, logo_lines=None, inspirational_quote="", info_key_color="light_yellow", info_value_color="white", recommendations=None, width=None, overflow=LAYOUT_OVERFLOW):
     """
-    Formats the system information as a clear, columnar table,
-    then appends the ASCII art logo, inspirational quote, and recommendations at the bottom.
+    Formats the system information as a clear, columnar table with the ASCII art
+    logo beside it, then the recommendations and inspirational quote below.
+    If the logo does not fit beside the table within `width`, it is placed
+    below the recommendations instead.
 
     Args:
         info_data (dict): A dictionary containing all the system information.
@@ -39,6 +144,10 @@ def format_info_output(info_data, logo_lines=None, inspirational_quote="", info_
         info_key_color (str, optional): The color for the information keys. Defaults to "light_yellow".
         info_value_color (str, optional): The color for the information values. Defaults to "white".
         recommendations (list, optional): A list of strings for system recommendations. Defaults to None.
+        width (int, optional): The width to fit the output to (see display.layout.get_output_width).
+                               Defaults to None (no limit).
+        overflow (str, optional): 'wrap' or 'truncate' values longer than the width.
+                                  Defaults to LAYOUT_OVERFLOW.
     """
     
     # Ensure recommendations is a list for easy iteration
@@ -46,38 +155,27 @@ def format_info_output(info_data, logo_lines=None, inspirational_quote="", info_
         recommendations = []
 
     # Get colors from DEFAULT_COLORS
-    info_key_color_code = COLORS.get(DEFAULT_COLORS.get("info_key_color"), COLORS["reset"])
-    info_value_color_code = COLORS.get(DEFAULT_COLORS.get("info_value_color"), COLORS["reset"])
     logo_color_code = COLORS.get(DEFAULT_COLORS.get("logo_color"), COLORS["reset"]) # نحتاجها لتطبيقها هنا
     quote_color_code = COLORS.get(DEFAULT_COLORS.get("quote_color"), COLORS["reset"])
     recommendation_color_code = COLORS.get("yellow", COLORS["reset"]) # Color for recommendations
 
     output_lines = []
+    beside = fits_beside(logo_lines, width)
+    table_width = width - logo_width(logo_lines) - LOGO_GAP if beside and width else width
 
     # 1. Format Info Data as a Table-like Structure
-    max_key_width = 0
-    # First pass to find max key width, excluding "Top Processes" from main alignment
-    for key in info_data.keys():
-        if key != "Top Processes":
-            max_key_width = max(max_key_width, len(clean_ansi(key)))
-    
+    # Key width, excluding multi-line fields from main alignment
+    max_key_width = max((visible_width(key) for key in info_data if key not in MULTILINE_FIELDS), default=0)
+
+    table_lines = []
     for key, value in info_data.items():
-        if key == "Top Processes":
-            # Handle multi-line "Top Processes" separately
-            output_lines.append(f"{info_key_color_code}{key}:{COLORS['reset']}")
-            if value and value != "N/A":
-                for line in value.split('\n'):
-                    output_lines.append(f"  {info_value_color_code}{line.strip()}{COLORS['reset']}")
-            else:
-                output_lines.append(f"  {info_value_color_code}N/A{COLORS['reset']}")
-        else:
-            # For other info, format normally with padding for alignment
-            visible_key_len = len(clean_ansi(key))
-            padding = max_key_width - visible_key_len
-            formatted_key = f"{info_key_color_code}{key}{' ' * padding}:{COLORS['reset']}"
-            formatted_value = f"{info_value_color_code}{value}{COLORS['reset']}"
-            output_lines.append(f"{formatted_key} {formatted_value}")
-    
+        table_lines.extend(format_info_lines(key, value, max_key_width, table_width, overflow))
+
+    if beside:
+        output_lines.extend(place_beside(logo_lines, table_lines, logo_color_code, COLORS['reset']))
+    else:
+        output_lines.extend(table_lines)
+
     # Add a blank line after info for separation
     output_lines.append("")
 
@@ -85,12 +183,13 @@ def format_info_output(info_data, logo_lines=None, inspirational_quote="", info_
     if recommendations:
         output_lines.append(f"{recommendation_color_code}--- System Recommendations ---{COLORS['reset']}")
         for rec in recommendations:
-            output_lines.append(f"{recommendation_color_code}- {rec}{COLORS['reset']}")
+            for part in fit_text(f"- {rec}", width, overflow):
+                output_lines.append(f"{recommendation_color_code}{part}{COLORS['reset']}")
         output_lines.append(f"{recommendation_color_code}----------------------------{COLORS['reset']}")
         output_lines.append("") # Blank line after recommendations
 
-    # 3. Add the ASCII Art Logo (if any)
-    if logo_lines:
+    # 3. Add the ASCII Art Logo (if any, and not already beside the table)
+    if logo_lines and not beside:
         # Apply color and reset after each line, since the logo itself is now raw
         for line in logo_lines:
             output_lines.append(f"{logo_color_code}{line}{COLORS['reset']}") # هنا التغيير: نضيف الألوان مرة واحدة
@@ -98,7 +197,8 @@ def format_info_output(info_data, logo_lines=None, inspirational_quote="", info_
 
     # 4. Add the Inspirational Quote
     if inspirational_quote:
-        output_lines.append(f"{quote_color_code}\"{inspirational_quote}\"{COLORS['reset']}")
+        for part in fit_text(f"\"{inspirational_quote}\"", width, overflow):
+            output_lines.append(f"{quote_color_code}{part}{COLORS['reset']}")
     
 
     return "\n".join(output_lines)
@@ -122,7 +222,8 @@ if __name__ == "__main__":
         "RAM": "8.0Gi/16.0Gi",
         "RAM Usage %": "50%",
         "Disk": "35%",
-        "Disk I/O": "R:100MB, W:50MB",
+        "Disk I/O": "R: 1.2MB/s (35 IOPS), W: 0.3MB/s (10 IOPS)",
+        "Disks": "nvme0n1  R   1.1MB/s     30 IOPS  W   0.3MB/s     10 IOPS\nsda      R   0.1MB/s      5 IOPS  W   0.0MB/s      0 IOPS",
         "GPU": "NVIDIA GeForce RTX 3080 (Driver: 535.113.01, Mem: 2000/10240MiB)",
         "Battery": "80% (Discharging, Est. 3h 45m)",
         "Local IP": "192.168.1.100",
@@ -130,7 +231,7 @@ if __name__ == "__main__":
         "ISP": "Test ISP",
         "City": "Test City",
         "Country": "Test Country",
-        "Bandwidth Usage": "Sent: 1000MB, Recv: 2000MB",
+        "Bandwidth Usage": "Sent: 0.1MB/s, Recv: 2.4MB/s",
         "Top Processes": "firefox (15.2% CPU, 5.1% RAM)\nnpm (8.3% CPU, 2.0% RAM)\npython (3.1% CPU, 1.5% RAM)"
     }
 
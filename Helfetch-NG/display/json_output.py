@@ -0,0 +1,53 @@
+# display/json_output.py
+
+import json
+import os
+import time
+
+from core.registry import base_field
+
+# Machine-readable output: the merged info as typed values (numbers with
+# units, timestamps) instead of display strings, with no ANSI or layout work.
+#
+#   json   - one document per run: {"host", "collected_at", "fields": {...}}
+#   ndjson - one line per field:   {"host", "field", "value", ...}
+
+SNAPSHOT_SCHEMA_VERSION = 1
+
+def build_field_entry(text, raw_entry):
+    """
+    Returns the typed entry for one field: the collector's raw values if it
+    recorded any, otherwise the display string as 'value' (None for N/A).
+    """
+    entry = dict(raw_entry or {})
+    if not any(key != 'collected_at' for key in entry):
+        entry['value'] = None if text == 'N/A' else text
+    return entry
+
+def build_snapshot(info, raw):
+    """
+    Builds the JSON snapshot document from the merged info and raw dicts.
+    """
+    fields = {}
+    for key, text in info.items():
+        name = base_field(key)
+        fields[name] = build_field_entry(text, raw.get(name))
+    return {
+        'schema': SNAPSHOT_SCHEMA_VERSION,
+        'host': os.uname().nodename,
+        'collected_at': time.time(),
+        'fields': fields,
+    }
+
+def format_machine_output(info, raw, output_format):
+    """
+    Serializes the collected information as 'json' or 'ndjson'.
+    """
+    snapshot = build_snapshot(info, raw)
+    if output_format == 'ndjson':
+        host = snapshot['host']
+        return "".join(
+            json.dumps({'host': host, 'field': name, **entry}, separators=(',', ':')) + "\n"
+            for name, entry in snapshot['fields'].items()
+        )
+    return json.dumps(snapshot, separators=(',', ':')) + "\n"
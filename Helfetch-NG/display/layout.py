@@ -0,0 +1,176 @@
+# display/layout.py
+
+import functools
+import os
+import re
+import sys
+import unicodedata
+
+# Terminal layout helpers shared by the formatters: display widths (wide CJK
+# glyphs take two cells, combining marks such as Arabic harakat and format
+# characters take none), fitting text to a width by wrapping or truncating,
+# and placing the logo beside the info table. Everything works on plain text
+# or on lines whose only escapes are SGR color codes.
+
+ANSI_ESCAPE = re.compile(r'\x1B(?:[@-Z\\-_]|\[[0-9;]*[0-9A-Z])')
+LOGO_GAP = 3 # columns between the logo and the info table
+MIN_INFO_WIDTH = 30 # narrower than this, the logo goes above/below instead
+ELLIPSIS = "…"
+
+def _char_width(char):
+    if unicodedata.combining(char) or unicodedata.category(char) in ('Mn', 'Me', 'Cf'):
+        return 0
+    return 2 if unicodedata.east_asian_width(char) in ('W', 'F') else 1
+
+@functools.lru_cache(maxsize=4096)
+def _wide_display_width(text):
+    return sum(_char_width(char) for char in text)
+
+def display_width(text):
+    """Returns the number of terminal cells `text` (without escapes) occupies."""
+    if text.isascii():
+        return len(text)
+    return _wide_display_width(text)
+
+def visible_width(line):
+    """Returns the display width of a line that may contain color codes."""
+    if '\x1b' in line:
+        line = ANSI_ESCAPE.sub('', line)
+    return display_width(line)
+
+def truncate_text(text, width):
+    """Cuts plain `text` to `width` cells, marking the cut with an ellipsis."""
+    if display_width(text) <= width:
+        return text
+    if width <= 0:
+        return ""
+    used = 0
+    for index, char in enumerate(text):
+        used += _char_width(char)
+        if used > width - 1:
+            return text[:index].rstrip() + ELLIPSIS
+    return text
+
+def wrap_text(text, width):
+    """
+    Splits plain `text` into lines of at most `width` cells, breaking at
+    spaces where possible and inside words only when a word is too long.
+    """
+    if width <= 0 or display_width(text) <= width:
+        return [text]
+    lines = []
+    line, line_width = "", 0
+    for word in text.split(' '):
+        word_width = display_width(word)
+        if line_width and line_width + 1 + word_width <= width:
+            line, line_width = f"{line} {word}", line_width + 1 + word_width
+            continue
+        if line_width:
+            lines.append(line)
+        while word_width > width:
+            cut, cut_width = 0, 0
+            for char in word:
+                char_width = _char_width(char)
+                if cut_width + char_width > width:
+                    break
+                cut, cut_width = cut + 1, cut_width + char_width
+            lines.append(word[:cut])
+            word, word_width = word[cut:], word_width - cut_width
+        line, line_width = word, word_width
+    lines.append(line)
+    return lines
+
+def fit_text(text, width, overflow='wrap'):
+    """
+    Fits plain `text` to `width` cells: a list of wrapped lines, or a single
+    truncated line if `overflow` is 'truncate'. A width of None means no limit.
+    """
+    if width is None:
+        return [text]
+    if overflow == 'truncate':
+        return [truncate_text(text, width)]
+    return wrap_text(text, width)
+
+def get_output_width(out=None):
+    """
+    Returns the width to lay output out in: $COLUMNS if set, otherwise the
+    terminal's width, or None (no limit) when not writing to a terminal.
+    """
+    columns = os.getenv('COLUMNS')
+    if columns and columns.isdigit() and int(columns) > 0:
+        return int(columns)
+    out = out or sys.stdout
+    try:
+        if out.isatty():
+            return os.get_terminal_size(out.fileno()).columns
+    except (AttributeError, OSError, ValueError):
+        pass
+    return None
+
+@functools.lru_cache(maxsize=8)
+def _logo_column(logo_lines, color_code, reset):
+    """Returns the colored logo lines padded to one width, and that width."""
+    widths = [display_width(line) for line in logo_lines]
+    logo_width = max(widths, default=0)
+    padded = tuple(f"{color_code}{line}{reset}{' ' * (logo_width - line_width)}"
+                   for line, line_width in zip(logo_lines, widths))
+    return padded, logo_width
+
+def logo_width(logo_lines):
+    """Returns the width of the widest logo line."""
+    return max((display_width(line) for line in logo_lines), default=0)
+
+def fits_beside(logo_lines, width):
+    """True if the logo leaves room for the info table beside it within `width`."""
+    if not logo_lines:
+        return False
+    return width is None or width - logo_width(logo_lines) - LOGO_GAP >= MIN_INFO_WIDTH
+
+def place_beside(logo_lines, info_lines, color_code="", reset=""):
+    """
+    Returns the logo (colored with `color_code`) and `info_lines` side by
+    side, row by row, the logo on the left.
+    """
+    padded, width = _logo_column(tuple(logo_lines), color_code, reset)
+    gap = " " * LOGO_GAP
+    blank = " " * width
+    rows = []
+    for row in range(max(len(padded), len(info_lines))):
+        left = padded[row] if row < len(padded) else blank
+        if row < len(info_lines):
+            rows.append(f"{left}{gap}{info_lines[row]}")
+        else:
+            rows.append(left.rstrip())
+    return rows
+
+def place_logo(logo_lines, info_lines, beside, color_code="", reset=""):
+    """
+    Returns the logo and `info_lines` as one list of lines: side by side (see
+    place_beside) if `beside`, otherwise the logo above them.
+    """
+    if beside:
+        return place_beside(logo_lines, info_lines, color_code, reset)
+    lines = []
+    if logo_lines:
+        lines.extend(f"{color_code}{line}{reset}" for line in logo_lines)
+        lines.append("")
+    lines.extend(info_lines)
+    return lines
+
+def write_output(text, out=None):
+    """
+    Writes `text` with a single write() to the underlying file descriptor
+    where there is one, instead of a line-buffered write per line.
+    """
+    out = out or sys.stdout
+    try:
+        fd = out.fileno()
+    except (AttributeError, OSError, ValueError):
+        out.write(text)
+        out.flush()
+        return
+    out.flush()
+    data = text.encode(getattr(out, 'encoding', None) or 'utf-8', errors='replace')
+    while data:
+        written = os.write(fd, data)
+        data = data[written:]
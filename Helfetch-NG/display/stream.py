@@ -0,0 +1,123 @@
+# display/stream.py
+
+import concurrent.futures
+import shutil
+import sys
+
+from display.ascii_art import COLORS
+from display.formatter import clean_ansi, field_key_width, format_info_lines
+from display.layout import LOGO_GAP, display_width, fit_text, fits_beside, get_output_width, logo_width, place_logo
+from config.default_config import DEFAULT_COLORS, LAYOUT_OVERFLOW
+from core.registry import filter_info
+
+# Streaming output prints the logo and every field as soon as the task that
+# produces it finishes, instead of waiting for the slowest collector.
+# On a terminal, all fields are shown at once with a placeholder and each line
+# is filled in place; otherwise fields are printed in order as they arrive.
+# The layout is the one of the normal output: fitted to the output width,
+# with the logo beside the fields where it fits and above them otherwise.
+
+PENDING_VALUE = "..."
+
+def _field_lines(field, future, key_width, width=None):
+    """Returns the display lines of one field, or a placeholder while it is pending."""
+    if not future.done():
+        return format_info_lines(field, PENDING_VALUE, key_width, width)
+    try:
+        info = filter_info(future.result(), [field])
+    except Exception:
+        info = {}
+    lines = []
+    for key, value in info.items():
+        lines.extend(format_info_lines(key, value, key_width, width))
+    return lines or format_info_lines(field, 'N/A', key_width, width)
+
+def _rows(lines, columns):
+    """Counts the terminal rows `lines` occupy, including soft-wrapped lines."""
+    return sum(max(1, -(-display_width(clean_ansi(line)) // columns)) for line in lines)
+
+def stream_info_output(fields, field_futures, logo_lines=None, quote_future=None, out=None, interactive=None):
+    """
+    Prints the logo and the selected fields in their stable order as their
+    futures complete, then the quote.
+
+    Args:
+        fields (list): Field names in display order.
+        field_futures (dict): Field name -> future returning the collector's info dict.
+        logo_lines (list, optional): ASCII art logo lines, beside or above the fields.
+        quote_future (Future, optional): Future returning the inspirational quote.
+        out (file, optional): Output stream. Defaults to sys.stdout.
+        interactive (bool, optional): Update lines in place. Defaults to out.isatty().
+    """
+    out = out or sys.stdout
+    if interactive is None:
+        interactive = out.isatty()
+    key_width = field_key_width(fields)
+    width = get_output_width(out)
+    beside = fits_beside(logo_lines, width)
+    table_width = width - logo_width(logo_lines) - LOGO_GAP if beside and width else width
+
+    logo_color_code = COLORS.get(DEFAULT_COLORS.get("logo_color"), COLORS["reset"])
+    quote_color_code = COLORS.get(DEFAULT_COLORS.get("quote_color"), COLORS["reset"])
+
+    def frame(table_lines):
+        return place_logo(logo_lines, table_lines, beside, logo_color_code, COLORS['reset'])
+
+    columns, rows = shutil.get_terminal_size()
+    columns = width or columns
+    blocks = [_field_lines(name, field_futures[name], key_width, table_width) for name in fields]
+    drawn = frame([line for block in blocks for line in block])
+    # In-place updates need every line on screen; otherwise fall back to ordered output.
+    if interactive and _rows(drawn, columns) >= rows:
+        interactive = False
+
+    if not interactive:
+        # A row is final once its field line has arrived; with the logo above
+        # the fields, the logo rows are final from the start
+        table_start = len(frame([])) if not beside else 0
+        table_lines = []
+        lines = frame(table_lines)
+        out.write("".join(line + "\n" for line in lines[:table_start]))
+        out.flush()
+        printed = table_start
+        for name in fields:
+            field_futures[name].result()
+            table_lines.extend(_field_lines(name, field_futures[name], key_width, table_width))
+            lines = frame(table_lines)
+            final = table_start + len(table_lines)
+            out.write("".join(line + "\n" for line in lines[printed:final]))
+            out.flush()
+            printed = final
+        out.write("".join(line + "\n" for line in lines[printed:]))
+    else:
+        out.write("".join(line + "\n" for line in drawn))
+        out.flush()
+        done = [field_futures[name].done() for name in fields]
+        pending = {field_futures[name] for name in fields if not field_futures[name].done()}
+        while pending:
+            _, pending = concurrent.futures.wait(pending, return_when=concurrent.futures.FIRST_COMPLETED)
+            changed = False
+            for index, name in enumerate(fields):
+                if not done[index] and field_futures[name].done():
+                    done[index] = True
+                    blocks[index] = _field_lines(name, field_futures[name], key_width, table_width)
+                    changed = True
+            if not changed:
+                continue
+            current = frame([line for block in blocks for line in block])
+            first_changed = next((row for row, (old, new) in enumerate(zip(drawn, current)) if old != new),
+                                 min(len(drawn), len(current)))
+            # Move the cursor back to the first changed row and redraw from there;
+            # later rows are redrawn too, since a multi-line value may shift them.
+            drawn_rows = _rows(drawn[first_changed:], columns)
+            if drawn_rows:
+                out.write(f"\x1b[{drawn_rows}A\r\x1b[J")
+            out.write("".join(line + "\n" for line in current[first_changed:]))
+            out.flush()
+            drawn = current
+
+    if quote_future is not None:
+        out.write("\n")
+        for part in fit_text(f"\"{quote_future.result()}\"", width, LAYOUT_OVERFLOW):
+            out.write(f"{quote_color_code}{part}{COLORS['reset']}\n")
+    out.flush()
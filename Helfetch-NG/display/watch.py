@@ -0,0 +1,106 @@
+# display/watch.py
+
+import shutil
+import sys
+import time
+
+from display.ascii_art import COLORS
+from display.formatter import field_key_width, format_info_lines, add_history
+from display.layout import LOGO_GAP, fits_beside, get_output_width, logo_width, place_logo
+from config.default_config import (
+    DEFAULT_COLORS, HISTORY_MAX_BYTES, HISTORY_MIN_INTERVAL, HISTORY_SPARKLINE_WIDTH
+)
+from core.registry import collect, volatile_fields
+from core.sampler import measure_cpu_usage, format_cpu_usage
+
+# Watch mode collects every selected field once, then on each tick
+# re-collects only the volatile ones (CPU usage, RAM, disk I/O, ...).
+# On a terminal only the lines whose text changed are rewritten, using
+# absolute cursor positioning, in a single write per tick.
+
+def build_frame(info, key_width, logo_lines=None, width=None):
+    """
+    Returns the full list of display lines for one tick, fitted to `width`:
+    the logo beside the fields if it fits, otherwise above them.
+    """
+    beside = fits_beside(logo_lines, width)
+    table_width = width - logo_width(logo_lines) - LOGO_GAP if beside and width else width
+    table_lines = []
+    for key, value in info.items():
+        table_lines.extend(format_info_lines(key, value, key_width, table_width))
+
+    logo_color_code = COLORS.get(DEFAULT_COLORS.get("logo_color"), COLORS["reset"])
+    return place_logo(logo_lines, table_lines, beside, logo_color_code, COLORS['reset'])
+
+def diff_frame(previous, current):
+    """
+    Returns the escape sequences that turn the `previous` frame on screen into
+    `current`, touching only the lines that changed.
+    """
+    parts = []
+    for row, line in enumerate(current):
+        if previous is None or row >= len(previous) or previous[row] != line:
+            parts.append(f"\x1b[{row + 1};1H{line}\x1b[K")
+    if previous is not None and len(previous) > len(current):
+        parts.append(f"\x1b[{len(current) + 1};1H\x1b[J")
+    return "".join(parts)
+
+def run_watch(fields, interval, collector_options=None, logo_lines=None, out=None, executor=None,
+              record=False, history_window=None):
+    """
+    Refreshes the selected fields every `interval` seconds until interrupted.
+    Static fields are collected once; volatile fields are re-collected each tick.
+    With `record`, each tick's metrics are appended to the history file; with
+    `history_window` (seconds), their history over that window is shown.
+    """
+    out = out or sys.stdout
+    interactive = out.isatty()
+    key_width = field_key_width(fields)
+    raw = {} if record else None
+    if record or history_window:
+        from core.history import record_sample, get_history_summary
+
+    info = collect(fields, collector_options, executor, raw=raw)
+    # CPU usage is measured here, tick to tick, rather than by the collector
+    refresh_fields = [name for name in volatile_fields(fields) if name != 'CPU Usage']
+
+    previous_frame = None
+    next_tick = time.monotonic()
+    if interactive:
+        out.write("\x1b[?25l\x1b[H\x1b[2J") # Hide the cursor and clear the screen
+    try:
+        while True:
+            if 'CPU Usage' in info:
+                # The first tick may fall back to the last run's sample, like a normal run
+                cpu_usage = measure_cpu_usage(use_persisted=previous_frame is None, since_last_reading=True)
+                info['CPU Usage'] = format_cpu_usage(cpu_usage)
+                if raw is not None:
+                    raw['CPU Usage'] = {'value': cpu_usage, 'unit': 'percent'}
+            if record:
+                record_sample(raw, HISTORY_MAX_BYTES, HISTORY_MIN_INTERVAL)
+
+            frame_info = info
+            if history_window:
+                frame_info = dict(info)
+                add_history(frame_info, get_history_summary(fields, history_window, HISTORY_SPARKLINE_WIDTH))
+            frame = build_frame(frame_info, key_width, logo_lines, get_output_width(out))
+            if interactive:
+                # Absolute positioning only works for rows that are on screen
+                frame = frame[:shutil.get_terminal_size().lines - 1]
+                out.write(diff_frame(previous_frame, frame))
+            else:
+                out.write("\n".join(frame) + "\n\n")
+            out.flush()
+            previous_frame = frame
+
+            next_tick += interval
+            time.sleep(max(0.0, next_tick - time.monotonic()))
+            if refresh_fields:
+                info.update(collect(refresh_fields, collector_options, raw=raw))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        if interactive:
+            row = len(previous_frame) + 1 if previous_frame else 1
+            out.write(f"\x1b[{row};1H\x1b[?25h") # Restore the cursor below the frame
+            out.flush()
@@ -3,24 +3,35 @@
 import sys
 import argparse
 import os
-import concurrent.futures # استيراد المكتبة الجديدة للتعامل مع المهام المتوازية
 
 # إضافة مسار مجلد السكريبت إلى sys.path
 script_dir = os.path.dirname(os.path.abspath(__file__))
 sys.path.append(script_dir)
 
-# استيراد الدوال من وحدات جمع المعلومات
-from core.system_info import get_system_info, get_inspirational_quote
-from core.hardware_info import get_hardware_info
-from core.desktop_info import get_desktop_info
-from core.network_info import get_network_info
+# أخذ عينة المعالج الأولى قبل أي شيء آخر، لتغطي نافذة القياس كامل وقت الجمع
+from core.sampler import (
+    start_cpu_sample, measure_cpu_usage, format_cpu_usage, save_cpu_sample, start_io_sample, save_io_sample
+)
+start_cpu_sample()
+start_io_sample()
 
-# استيراد وحدات العرض والتنسيق
-from display.ascii_art import get_ascii_logo, COLORS
-from display.formatter import format_info_output
+# وحدات جمع المعلومات والعرض تُستورد داخل main() عند الحاجة فقط،
+# حتى لا يدفع كل تشغيل ثمن استيراد requests و psutil وغيرهما مسبقًا
 
 # استيراد الإعدادات الافتراضية
-from config.default_config import DEFAULT_COLORS
+from config.default_config import (
+    CACHE_ENABLED, PERSIST_CPU_SAMPLE, PERSIST_IO_SAMPLE, TOP_PROCESSES_SORT, STARTUP_BUDGET_MS,
+    DEFAULT_FIELDS, EXCLUDED_FIELDS, OFFLINE_MODE, PUBLIC_IP_ENDPOINT,
+    STREAM_OUTPUT, DAEMON_CLIENT_ENABLED, OUTPUT_FORMAT, HISTORY_RECORD, HISTORY_WINDOW,
+    HISTORY_MAX_BYTES, HISTORY_MIN_INTERVAL, HISTORY_SPARKLINE_WIDTH, INTERFACE_PATTERNS,
+    COLLAPSE_VIRTUAL_INTERFACES, COLLECTION_WORKERS
+)
+
+# ذاكرة التخزين المؤقت للمعلومات الثابتة
+from utils.cache import set_cache_enabled, save_facts
+
+# تتبع زمن كل مجمّع وكل خطوة فرعية عند طلب --trace
+from utils.trace import trace_span, DEFAULT_TRACE_FILE
 
 def main():
     """
@@ -28,54 +39,368 @@ def main():
     It collects all system information, formats it with the logo, and prints it.
     Supports command-line arguments for customization.
     """
+    # الأمر الفرعي aggregate يلخص لقطات مجمعة من أجهزة كثيرة
+    if sys.argv[1:2] == ["aggregate"]:
+        sys.exit(aggregate_main(sys.argv[2:]))
+
     parser = argparse.ArgumentParser(
-        description="A custom system information fetcher for Helwan Linux."
+        description="A custom system information fetcher for Helwan Linux.",
+        epilog="Run 'helfetch aggregate DIR' to summarize --format json/ndjson "
+               "snapshots collected from many machines."
     )
     parser.add_argument(
         "--no-logo",
         action="store_true",
         help="Do not display the Helwan Linux ASCII art logo."
     )
+    parser.add_argument(
+        "--no-cache",
+        action="store_true",
+        help="Do not read or write the cache of slow-changing facts (CPU, GPU, OS, packages)."
+    )
+    parser.add_argument(
+        "--top-by",
+        choices=["cpu", "rss", "io"],
+        default=TOP_PROCESSES_SORT,
+        help="Rank Top Processes by CPU usage, resident memory or disk I/O."
+    )
+    parser.add_argument(
+        "--fields",
+        metavar="FIELD,...",
+        help="Comma-separated list of fields to show, e.g. 'OS,Kernel,Uptime'. "
+             "Collectors that own none of them are not run."
+    )
+    parser.add_argument(
+        "--exclude",
+        metavar="FIELD,...",
+        help="Comma-separated list of fields to hide, e.g. 'GPU,Public IP'."
+    )
+    parser.add_argument(
+        "--offline",
+        action="store_true",
+        default=OFFLINE_MODE,
+        help="Never open a network socket; show the public IP only if it is cached."
+    )
+    parser.add_argument(
+        "--ip-endpoint",
+        metavar="URL",
+        default=PUBLIC_IP_ENDPOINT,
+        help="URL of the ip-api.com compatible public IP lookup service."
+    )
+    parser.add_argument(
+        "--interfaces",
+        metavar="GLOB,...",
+        help="Comma-separated shell globs selecting the rows of the Interfaces table, e.g. 'eth*,wl*'."
+    )
+    parser.add_argument(
+        "--expand-interfaces",
+        action="store_true",
+        help="List every virtual interface (veth, bridges, ...) instead of one row per name prefix."
+    )
+    parser.add_argument(
+        "--stream",
+        action="store_true",
+        default=STREAM_OUTPUT,
+        help="Print the logo and each field as soon as it is collected instead of "
+             "waiting for the slowest one (updates lines in place on a terminal)."
+    )
+    parser.add_argument(
+        "--format",
+        choices=("text", "json", "ndjson"),
+        default=OUTPUT_FORMAT,
+        help="Output format: 'text' (logo and table), 'json' (one typed document) or "
+             "'ndjson' (one typed JSON line per field), without colors, logo or quote."
+    )
+    parser.add_argument(
+        "--watch",
+        metavar="N",
+        type=float,
+        help="Refresh every N seconds as a live monitor. Static fields are collected once; "
+             "only volatile ones (CPU, RAM, I/O, bandwidth, battery, temperature, processes) "
+             "are re-collected, and only changed lines are redrawn."
+    )
+    parser.add_argument(
+        "--record",
+        action="store_true",
+        default=HISTORY_RECORD,
+        help="Append this run's (or every watch tick's) CPU, RAM, disk I/O and bandwidth "
+             "readings to the history file."
+    )
+    parser.add_argument(
+        "--history",
+        choices=("hour", "day"),
+        default=HISTORY_WINDOW,
+        help="Show a sparkline with min/avg/max over the last hour or day next to each "
+             "recorded metric."
+    )
+    parser.add_argument(
+        "--daemon",
+        action="store_true",
+        help="Run in the background serving snapshots over a per-user Unix socket, "
+             "so other helfetch runs can render in a few milliseconds."
+    )
+    parser.add_argument(
+        "--system-daemon",
+        action="store_true",
+        help="Like --daemon, but serve every user on the system-wide socket under /run."
+    )
+    parser.add_argument(
+        "--no-daemon",
+        action="store_true",
+        help="Always collect directly, even if a helfetch daemon is running."
+    )
+    parser.add_argument(
+        "--startup-profile",
+        action="store_true",
+        help="Run Helfetch under 'python -X importtime' and report import time per module "
+             "and time to first byte (exits with status 1 if over the startup budget)."
+    )
+    parser.add_argument(
+        "--trace",
+        metavar="FILE",
+        nargs="?",
+        const=DEFAULT_TRACE_FILE,
+        help="Record how long each collector and each of its steps took (thread, bytes read, "
+             f"commands run) as Chrome trace-event JSON in FILE (default: {DEFAULT_TRACE_FILE}), "
+             "and print the critical path to stderr. Always collects directly, without the daemon."
+    )
     args = parser.parse_args()
+    if args.trace and (args.watch is not None or args.daemon or args.system_daemon):
+        parser.error("--trace cannot be combined with --watch, --daemon or --system-daemon")
+    if args.watch is not None and args.watch <= 0:
+        parser.error("--watch interval must be greater than 0")
+    if args.watch is not None and args.format != "text":
+        parser.error("--watch only supports the text format")
+    machine_output = args.format != "text"
+
+    if args.startup_profile:
+        from utils.startup_profile import run_startup_profile
+        child_argv = [arg for arg in sys.argv[1:] if arg != "--startup-profile"]
+        sys.exit(run_startup_profile(os.path.abspath(__file__), child_argv, STARTUP_BUDGET_MS))
+
+    set_cache_enabled(CACHE_ENABLED and not args.no_cache)
 
-    # استخدام ThreadPoolExecutor لتشغيل دوال جمع المعلومات بالتوازي
-    with concurrent.futures.ThreadPoolExecutor() as executor:
-        # إرسال كل دالة كـ "مهمة" إلى المجمع
-        future_system_data = executor.submit(get_system_info)
-        future_hardware_data = executor.submit(get_hardware_info)
-        future_desktop_data = executor.submit(get_desktop_info)
-        future_network_data = executor.submit(get_network_info)
-        future_quote = executor.submit(get_inspirational_quote)
-
-        # الانتظار حتى تكتمل جميع المهام وجمع النتائج
-        system_data = future_system_data.result()
-        hardware_data = future_hardware_data.result()
-        desktop_data = future_desktop_data.result()
-        network_data = future_network_data.result()
-        inspirational_quote = future_quote.result()
-
-    all_info = {
-        **system_data,
-        **hardware_data,
-        **desktop_data,
-        **network_data
+    if args.trace:
+        # يُكتب ملف التتبع عند خروج البرنامج، بعد انتهاء كل الخيوط
+        import atexit
+        from utils.trace import start_trace
+        start_trace()
+        atexit.register(finish_trace, args.trace)
+
+    # تحديد الحقول المطلوبة؛ المجمّعات التي لا تملك حقلًا مطلوبًا لا تعمل أصلًا
+    from core.registry import parse_field_list, resolve_fields, collect
+    try:
+        include = parse_field_list(args.fields) if args.fields else DEFAULT_FIELDS
+        exclude = parse_field_list(args.exclude) if args.exclude else EXCLUDED_FIELDS
+    except ValueError as e:
+        parser.error(str(e))
+    fields = resolve_fields(include, exclude)
+    collector_options = {
+        'system': {'top_processes_by': args.top_by},
+        'network': {
+            'offline': args.offline,
+            'endpoint': args.ip_endpoint,
+            'interface_patterns': ([pattern.strip() for pattern in args.interfaces.split(',') if pattern.strip()]
+                                   if args.interfaces else INTERFACE_PATTERNS),
+            'collapse_virtual': COLLAPSE_VIRTUAL_INTERFACES and not args.expand_interfaces,
+        },
     }
 
+    import concurrent.futures # استيراد المكتبة الجديدة للتعامل مع المهام المتوازية
+    from core.system_info import get_inspirational_quote
+
+    # استيراد وحدات العرض والتنسيق
+    from display.ascii_art import get_ascii_logo
+
     helwan_logo = None
-    if not args.no_logo:
+    if not (args.no_logo or machine_output):
         helwan_logo = get_ascii_logo("Helwan Linux")
 
+    if args.daemon or args.system_daemon:
+        # تشغيل الخدمة الخلفية التي تحتفظ بلقطة جاهزة وتخدمها عبر مقبس يونكس
+        from core.daemon import run_daemon
+        try:
+            run_daemon(fields, collector_options, system=args.system_daemon)
+        except (RuntimeError, OSError) as e:
+            parser.exit(1, f"helfetch: cannot start the daemon: {e}\n")
+        return
+
+    # محاولة الحصول على لقطة جاهزة من الخدمة الخلفية أولًا، ثم الجمع المباشر عند غيابها
+    # القيم المصنفة (أرقام ووحدات وأوقات) تُجمع فقط عند طلب مخرجات JSON أو تسجيل السجل
+    raw = {} if machine_output or args.record else None
+    history_raw = raw if args.record else None
+    if DAEMON_CLIENT_ENABLED and not (args.no_daemon or args.watch or args.trace):
+        from core.daemon import fetch_daemon_info
+        served_info = fetch_daemon_info(fields, collector_options, raw=raw)
+        if served_info is not None:
+            if machine_output:
+                render_machine_output(served_info, raw, args.format)
+            else:
+                render_output(served_info, helwan_logo, get_inspirational_quote(), args.history)
+            record_history(history_raw)
+            return
+
+    # استخدام ThreadPoolExecutor محدود العدد لتشغيل مهام جمع الحقول بالتوازي
+    with concurrent.futures.ThreadPoolExecutor(max_workers=COLLECTION_WORKERS) as executor:
+        if args.watch:
+            # وضع المراقبة: الحقول الثابتة تُجمع مرة واحدة، والمتغيرة فقط في كل دورة
+            from display.watch import run_watch
+            from core.history import HISTORY_WINDOWS
+            run_watch(fields, args.watch, collector_options, logo_lines=helwan_logo, executor=executor,
+                      record=args.record, history_window=HISTORY_WINDOWS.get(args.history))
+            finish_run(fields)
+            return
+
+        if args.stream and not machine_output:
+            # وضع العرض التدريجي: كل حقل في مهمة مستقلة، ويُطبع كل حقل فور جاهزيته
+            from display.stream import stream_info_output
+            from core.scheduler import start_tasks
+            with trace_span('stream'):
+                field_futures = start_tasks(fields, collector_options, executor, raw=history_raw)
+                future_quote = executor.submit(get_inspirational_quote)
+
+                stream_info_output(fields, field_futures, logo_lines=helwan_logo, quote_future=future_quote)
+            finish_run(fields, history_raw)
+            return
+
+        # إرسال كل حقل مطلوب كـ "مهمة" مستقلة، بعد انتهاء المهام التي يعتمد عليها
+        future_quote = None if machine_output else executor.submit(get_inspirational_quote)
+        with trace_span('collect'):
+            all_info = collect(fields, collector_options, executor, raw=raw)
+        inspirational_quote = future_quote.result() if future_quote else None
+
+    # قراءة استخدام المعالج عند العرض، لتغطي النافذة كامل وقت الجمع
+    if 'CPU Usage' in all_info:
+        import time
+        cpu_usage = measure_cpu_usage()
+        all_info['CPU Usage'] = format_cpu_usage(cpu_usage)
+        if raw is not None:
+            raw['CPU Usage'] = {'value': cpu_usage, 'unit': 'percent', 'collected_at': time.time()}
+
+    with trace_span('render'):
+        if machine_output:
+            render_machine_output(all_info, raw, args.format)
+        else:
+            render_output(all_info, helwan_logo, inspirational_quote, args.history)
+    finish_run(fields, history_raw)
+
+def aggregate_main(argv):
+    """
+    The 'helfetch aggregate' subcommand: reads every snapshot under a
+    directory and prints fleet-wide distributions and recommendation counts.
+    """
+    parser = argparse.ArgumentParser(
+        prog="helfetch aggregate",
+        description="Summarize helfetch --format json/ndjson snapshots from many machines."
+    )
+    parser.add_argument("directory", help="Directory searched recursively for *.json, *.ndjson and *.jsonl snapshots.")
+    parser.add_argument(
+        "--top",
+        type=int,
+        default=10,
+        metavar="N",
+        help="How many kernels and disk fill outliers to list (default: 10)."
+    )
+    parser.add_argument(
+        "--jobs",
+        type=int,
+        metavar="N",
+        help="Worker processes used to parse the snapshots (default: one per CPU)."
+    )
+    parser.add_argument(
+        "--format",
+        choices=("text", "json"),
+        default="text",
+        help="Print the report as text or as one JSON document."
+    )
+    args = parser.parse_args(argv)
+    if not os.path.isdir(args.directory):
+        parser.error(f"not a directory: {args.directory}")
+
+    from core.fleet import load_fleet, get_fleet_report
+    report = get_fleet_report(load_fleet(args.directory, jobs=args.jobs), limit=args.top)
+
+    if args.format == "json":
+        import json
+        print(json.dumps(report))
+    else:
+        from display.fleet_report import format_fleet_report
+        print(format_fleet_report(report))
+    return 0
+
+def render_output(all_info, logo_lines, inspirational_quote, history=None):
+    """
+    Formats the collected information with the logo and quote, and prints it.
+    With `history` ("hour" or "day"), recorded metrics get a sparkline over that window.
+    """
+    from display.formatter import format_info_output
+    from display.layout import get_output_width, write_output
+
+    if history:
+        from core.history import HISTORY_WINDOWS, get_history_summary
+        from display.formatter import add_history
+        add_history(all_info, get_history_summary(list(all_info), HISTORY_WINDOWS[history],
+                                                  HISTORY_SPARKLINE_WIDTH))
+
     # تحديث الوسائط هنا لتتماشى مع التغييرات الأخيرة في formatter.py
     formatted_output = format_info_output(
         info_data=all_info,
-        logo_lines=helwan_logo,
+        logo_lines=logo_lines,
         inspirational_quote=inspirational_quote,
+        width=get_output_width(),
         # لم نعد نمرر هذه الألوان بشكل منفصل لأنها تُسحب من DEFAULT_COLORS داخل formatter.py
         # info_key_color=DEFAULT_COLORS["info_key_color"],
         # info_value_color=DEFAULT_COLORS["info_value_color"]
     )
 
-    print(formatted_output)
+    write_output(formatted_output + "\n")
+
+def render_machine_output(all_info, raw, output_format):
+    """
+    Prints the collected information as typed JSON or NDJSON.
+    """
+    from display.json_output import format_machine_output
+
+    sys.stdout.write(format_machine_output(all_info, raw, output_format))
+
+def finish_run(fields, history_raw=None):
+    """
+    Persists what the next run can reuse: the fact cache, the last CPU and
+    disk/network samples (if those fields were shown), and the metric
+    history if recording.
+    """
+    with trace_span('finish run'):
+        # حفظ المعلومات الثابتة لتسريع التشغيل القادم
+        save_facts()
+        if 'CPU Usage' in fields and PERSIST_CPU_SAMPLE:
+            save_cpu_sample()
+        if {'Disk I/O', 'Disks', 'Bandwidth Usage', 'Interfaces'} & set(fields) and PERSIST_IO_SAMPLE:
+            save_io_sample()
+        record_history(history_raw)
+
+def finish_trace(path):
+    """
+    Stops tracing, writes the trace to `path` as Chrome trace-event JSON and
+    prints the critical path to stderr.
+    """
+    from utils.trace import stop_trace, write_trace, format_trace_summary
+    trace = stop_trace()
+    if trace is None:
+        return
+    try:
+        write_trace(trace, path)
+    except OSError as e:
+        print(f"Could not write trace to {path}: {e}", file=sys.stderr)
+        path = None
+    print(format_trace_summary(trace, path), file=sys.stderr)
+
+def record_history(history_raw):
+    """
+    Appends the run's metrics to the history file, if recording.
+    """
+    if history_raw:
+        from core.history import record_sample
+        record_sample(history_raw, HISTORY_MAX_BYTES, HISTORY_MIN_INTERVAL)
 
 if __name__ == "__main__":
     try:
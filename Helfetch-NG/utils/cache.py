@@ -0,0 +1,132 @@
+# utils/cache.py
+
+import contextlib
+import os
+import threading
+
+from utils.helpers import get_cache_dir, read_json_file, write_json_file
+from utils.trace import trace_span, traced
+
+# Slow-changing facts (CPU model, GPU, OS name, package count) are stored here
+# together with the key they were computed under. A fact is reused as long as
+# its key (boot ID, database mtime, ...) has not changed.
+FACTS_FILE_NAME = "facts.json"
+
+_lock = threading.Lock()
+_facts = None
+_dirty = False
+_enabled = True
+
+# Inputs several fields need (the desktop settings, the local addresses, one
+# disk/network sample) are shared by the tasks of one collection run, see
+# core.scheduler. Each worker thread points at the dict of the run whose task
+# it is executing.
+_run = threading.local()
+
+
+def set_cache_enabled(enabled):
+    """Enables or disables the on-disk fact cache for this process."""
+    global _enabled
+    _enabled = enabled
+
+
+def _facts_path():
+    return os.path.join(get_cache_dir(), FACTS_FILE_NAME)
+
+
+def _load_facts():
+    """Loads the fact cache from disk once per process. Must be called with _lock held."""
+    global _facts
+    if _facts is None:
+        with trace_span('load fact cache'):
+            _facts = read_json_file(_facts_path())
+        if not isinstance(_facts, dict):
+            _facts = {}
+    return _facts
+
+
+def cached_fact(name, key, producer, cacheable=None):
+    """
+    Returns the cached value of fact `name` if it was stored under the same `key`,
+    otherwise calls `producer()` and remembers the result.
+    A key of None means the fact cannot be validated, so it is always recomputed.
+    If `cacheable` is given, a result it returns False for (e.g. one a
+    timed-out command left incomplete) is returned but not remembered.
+    """
+    if not _enabled or key is None:
+        return producer()
+
+    with _lock:
+        entry = _load_facts().get(name)
+    if isinstance(entry, dict) and entry.get('key') == key:
+        return entry.get('value')
+
+    value = producer()
+    if cacheable is not None and not cacheable(value):
+        return value
+    store_fact(name, key, value)
+    return value
+
+
+def store_fact(name, key, value):
+    """
+    Remembers `value` as fact `name` under `key`, replacing what was cached,
+    e.g. when a cached value turned out to be stale before its key changed.
+    """
+    if not _enabled or key is None:
+        return
+
+    global _dirty
+    with _lock:
+        _load_facts()[name] = {'key': key, 'value': value}
+        _dirty = True
+
+
+@traced('save fact cache')
+def save_facts():
+    """
+    Writes the fact cache back to disk if anything changed.
+    The cache is an optimization; failing to write it is not an error.
+    """
+    global _dirty
+    with _lock:
+        if not _enabled or not _dirty:
+            return
+        if write_json_file(_facts_path(), _facts):
+            _dirty = False
+
+
+@contextlib.contextmanager
+def shared_inputs(inputs):
+    """Makes shared_input() on this thread use `inputs`, one run's dict of shared inputs."""
+    previous = getattr(_run, 'inputs', None)
+    _run.inputs = inputs
+    try:
+        yield
+    finally:
+        _run.inputs = previous
+
+
+def shared_input(name, producer):
+    """
+    Returns input `name`, calling `producer()` only for the first task of the
+    current run that asks for it; tasks asking meanwhile wait for that call.
+    Outside a scheduled run, simply returns producer().
+    """
+    inputs = getattr(_run, 'inputs', None)
+    if inputs is None:
+        return producer()
+
+    import concurrent.futures
+    with _lock:
+        future = inputs.get(name)
+        owner = future is None
+        if owner:
+            future = inputs[name] = concurrent.futures.Future()
+    if owner:
+        try:
+            future.set_result(producer())
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+    return future.result()
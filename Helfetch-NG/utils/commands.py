@@ -0,0 +1,100 @@
+# utils/commands.py
+
+import contextlib
+import os
+import signal
+import subprocess
+import threading
+import time
+
+from config.default_config import COMMAND_TIMEOUT, MAX_CONCURRENT_COMMANDS
+
+# The engine behind utils.host.run_command. Commands run as asyncio
+# subprocesses on one background event loop, shared by every thread that
+# asks for a command. Each command is bounded by two deadlines: its own
+# timeout, and the deadline of the collection run it belongs to. Both count
+# from the moment it is requested, including any wait for one of the
+# MAX_CONCURRENT_COMMANDS slots. A command still running at its deadline is
+# killed together with its process group, so helpers it started (e.g. a
+# D-Bus activation) die too. The caller then gets subprocess.TimeoutExpired
+# and never blocks on it.
+
+# Shown instead of a field's value when the command it needed timed out
+TIMEOUT_VALUE = 'timeout'
+
+_loop = None
+_semaphore = None
+_loop_lock = threading.Lock()
+_local = threading.local()
+
+def _get_loop():
+    """Starts the engine's event loop thread on first use and returns the loop."""
+    global _loop, _semaphore
+    with _loop_lock:
+        if _loop is None:
+            import asyncio # Only needed once a command actually runs
+            loop = asyncio.new_event_loop()
+            threading.Thread(target=loop.run_forever, name='helfetch-commands', daemon=True).start()
+            _semaphore = asyncio.Semaphore(MAX_CONCURRENT_COMMANDS)
+            _loop = loop
+    return _loop
+
+@contextlib.contextmanager
+def command_deadline(deadline):
+    """
+    Makes commands requested on this thread finish by `deadline` (a
+    time.monotonic() value), the deadline of the current collection run.
+    """
+    previous = getattr(_local, 'deadline', None)
+    _local.deadline = deadline
+    try:
+        yield
+    finally:
+        _local.deadline = previous
+
+def _kill_process_group(process):
+    try:
+        os.killpg(process.pid, signal.SIGKILL)
+    except (ProcessLookupError, PermissionError):
+        pass # Already gone
+
+async def _run_process(args):
+    import asyncio
+    async with _semaphore:
+        process = await asyncio.create_subprocess_exec(
+            *args, stdin=subprocess.DEVNULL, stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+            start_new_session=True)
+        try:
+            stdout, stderr = await process.communicate()
+        except asyncio.CancelledError:
+            _kill_process_group(process)
+            await process.wait()
+            raise
+    if process.returncode:
+        raise subprocess.CalledProcessError(process.returncode, args, stdout, stderr)
+    return stdout.decode(errors='replace')
+
+async def _run_with_deadline(args, seconds):
+    import asyncio
+    try:
+        return await asyncio.wait_for(_run_process(args), seconds)
+    except asyncio.TimeoutError:
+        raise subprocess.TimeoutExpired(args, round(seconds, 2)) from None
+
+def run_process(args, timeout=None):
+    """
+    Runs `args` and returns its standard output as text, within `timeout`
+    seconds (default COMMAND_TIMEOUT) and the current run's deadline.
+    Raises OSError if the command cannot be started,
+    subprocess.CalledProcessError if it fails and subprocess.TimeoutExpired
+    if it was killed at its deadline.
+    """
+    import asyncio
+    deadline = time.monotonic() + (COMMAND_TIMEOUT if timeout is None else timeout)
+    run_deadline = getattr(_local, 'deadline', None)
+    if run_deadline is not None:
+        deadline = min(deadline, run_deadline)
+    seconds = deadline - time.monotonic()
+    if seconds <= 0:
+        raise subprocess.TimeoutExpired(args, 0)
+    return asyncio.run_coroutine_threadsafe(_run_with_deadline(args, seconds), _get_loop()).result()
@@ -0,0 +1,91 @@
+# utils/helpers.py
+
+import json
+import os
+
+from utils.host import host_path
+
+APP_NAME = "helfetch-ng"
+
+
+def get_cache_dir():
+    """
+    Returns the per-user cache directory for Helfetch ($XDG_CACHE_HOME/helfetch-ng).
+    The directory is not created here; writers create it on demand.
+    """
+    base = os.getenv('XDG_CACHE_HOME') or os.path.expanduser('~/.cache')
+    return os.path.join(base, APP_NAME)
+
+
+def get_boot_id():
+    """
+    Returns the kernel boot ID, which changes on every reboot, or None if unavailable.
+    """
+    try:
+        with open(host_path('/proc/sys/kernel/random/boot_id'), 'r') as f:
+            return f.read().strip() or None
+    except OSError:
+        return None
+
+
+def get_mtime_key(path):
+    """
+    Returns a cheap invalidation key for a file or directory: its path and mtime.
+    Returns None if the path does not exist.
+    """
+    try:
+        return f"{path}@{os.stat(path).st_mtime_ns}"
+    except OSError:
+        return None
+
+
+def get_state_dir():
+    """
+    Returns the per-user state directory for Helfetch ($XDG_STATE_HOME/helfetch-ng),
+    used for samples carried over between runs.
+    """
+    base = os.getenv('XDG_STATE_HOME') or os.path.expanduser('~/.local/state')
+    return os.path.join(base, APP_NAME)
+
+
+def make_field_filter(fields):
+    """
+    Returns a predicate telling a collector whether any of the given field
+    names was requested. `fields=None` means every field is wanted.
+    """
+    def wanted(*names):
+        return fields is None or any(name in fields for name in names)
+    return wanted
+
+
+def read_json_file(path):
+    """
+    Reads a JSON file written by write_json_file(). Returns None if it is
+    missing or unreadable.
+    """
+    try:
+        with open(path, 'r') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def write_json_file(path, data):
+    """
+    Writes `data` as JSON, creating the parent directory if needed.
+    The file is replaced atomically so concurrent runs never see a partial write.
+    Returns False if the file could not be written.
+    """
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(tmp_path, 'w') as f:
+            json.dump(data, f)
+        os.replace(tmp_path, path)
+        return True
+    except OSError:
+        try:
+            os.unlink(tmp_path)
+        except OSError:
+            pass
+        return False
@@ -0,0 +1,59 @@
+# utils/host.py
+
+import contextlib
+import os
+
+from utils.trace import trace_span
+
+# Where the collectors read the machine from. Every /proc, /sys, /etc and
+# /var path a collector opens goes through host_path(), and every external
+# command through run_command(), so the same code can describe the live
+# system (the default), a copied or mounted tree such as the benchmark
+# fixtures, or a container's root filesystem. Only the kernel interfaces
+# that are not files (the SIOCGIFADDR ioctl, os.uname() when no root is set)
+# always describe the running kernel.
+
+_root = '/'
+_runner = None
+
+def host_path(path):
+    """Maps an absolute system path (e.g. '/proc/stat') into the host root."""
+    if _root == '/':
+        return path
+    return os.path.join(_root, path.lstrip('/'))
+
+def get_host_root():
+    return _root
+
+def default_runner(args, timeout=None):
+    """
+    Runs `args` with the command engine (see utils.commands.run_process) and
+    returns its standard output as text. Raises OSError if the command cannot
+    be started and subprocess.SubprocessError if it fails or times out.
+    """
+    from utils.commands import run_process
+    return run_process(args, timeout=timeout)
+
+def run_command(args, timeout=None):
+    """Runs a command through the configured runner (see default_runner)."""
+    with trace_span(os.path.basename(args[0]), 'command', argv=' '.join(args)):
+        return (_runner or default_runner)(args, timeout=timeout)
+
+def set_host(root=None, runner=None):
+    """
+    Points the collectors at filesystem `root` (default: '/') and command
+    `runner` (a callable like default_runner; default: run the real command).
+    """
+    global _root, _runner
+    _root = os.path.abspath(root) if root else '/'
+    _runner = runner
+
+@contextlib.contextmanager
+def use_host(root=None, runner=None):
+    """Runs the enclosed code against another host root and runner (see set_host)."""
+    previous = (_root, _runner)
+    set_host(root, runner)
+    try:
+        yield
+    finally:
+        set_host(*previous)
@@ -0,0 +1,92 @@
+# utils/startup_profile.py
+
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+# Startup profiling re-runs Helfetch in a child interpreter with
+# `python -X importtime`, measures the time from spawning the interpreter to
+# the first byte it writes, and summarizes the import times it reported.
+
+PROFILE_TOP_MODULES = 15
+
+def parse_import_times(lines):
+    """
+    Parses `-X importtime` output into a list of (module, self_us, cumulative_us, depth).
+    Depth 0 means the module was imported directly by Helfetch (or by site startup).
+    """
+    modules = []
+    for line in lines:
+        if not line.startswith('import time:') or 'imported package' in line:
+            continue
+        try:
+            self_us, cumulative_us, name = line[len('import time:'):].split('|', 2)
+            depth = (len(name) - len(name.lstrip(' ')) - 1) // 2
+            modules.append((name.strip(), int(self_us), int(cumulative_us), depth))
+        except ValueError:
+            continue
+    return modules
+
+def run_startup_profile(script_path, argv, budget_ms):
+    """
+    Runs `script_path` with `argv` under `-X importtime`, forwards its output,
+    then prints a per-module import report and the time to first byte.
+    Returns 0 if the time to first byte is within `budget_ms`, 1 otherwise.
+    """
+    cmd = [sys.executable, '-X', 'importtime', script_path, *argv]
+    # stderr goes to a file, not a pipe, so a chatty child can never block on it
+    with tempfile.TemporaryFile(mode='w+') as stderr_file:
+        start = time.perf_counter()
+        proc = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=stderr_file)
+        first_byte = proc.stdout.read(1)
+        first_byte_ms = (time.perf_counter() - start) * 1000
+        rest = proc.stdout.read()
+        proc.wait()
+        total_ms = (time.perf_counter() - start) * 1000
+
+        stderr_file.seek(0)
+        stderr_lines = stderr_file.read().splitlines()
+
+    sys.stdout.buffer.write(first_byte + rest)
+    sys.stdout.flush()
+
+    modules = parse_import_times(stderr_lines)
+    # Anything that is not import-time output is the child's own stderr
+    for line in stderr_lines:
+        if not line.startswith('import time:'):
+            print(line, file=sys.stderr)
+
+    top_level = [m for m in modules if m[3] == 0]
+    total_import_ms = sum(m[1] for m in modules) / 1000
+
+    report = [
+        "",
+        "--- Startup Profile ---",
+        f"Interpreter start to first byte: {first_byte_ms:.1f} ms (budget {budget_ms} ms)",
+        f"Total run time                 : {total_ms:.1f} ms",
+        f"Total import time              : {total_import_ms:.1f} ms in {len(modules)} modules",
+        "",
+        "Slowest top-level imports (cumulative):",
+    ]
+    for name, _, cumulative_us, _ in sorted(top_level, key=lambda m: m[2], reverse=True)[:PROFILE_TOP_MODULES]:
+        report.append(f"  {cumulative_us / 1000:8.2f} ms  {name}")
+    report.append("")
+    report.append("Slowest modules (self):")
+    for name, self_us, _, _ in sorted(modules, key=lambda m: m[1], reverse=True)[:PROFILE_TOP_MODULES]:
+        report.append(f"  {self_us / 1000:8.2f} ms  {name}")
+
+    within_budget = first_byte_ms <= budget_ms
+    report.append("")
+    report.append("Within startup budget." if within_budget else "Startup budget exceeded!")
+    print("\n".join(report), file=sys.stderr)
+
+    if proc.returncode:
+        return proc.returncode
+    return 0 if within_budget else 1
+
+# For testing this module independently
+if __name__ == "__main__":
+    helfetch_path = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'helfetch.py')
+    sys.exit(run_startup_profile(helfetch_path, sys.argv[1:], budget_ms=150))
@@ -0,0 +1,242 @@
+# utils/trace.py
+
+import contextlib
+import functools
+import os
+import threading
+import time
+
+# Optional tracing of where a run spends its time (helfetch --trace). While
+# tracing is off, a span costs one global lookup. While it is on, each span
+# records:
+# - its start and end, and the thread it ran on
+# - the bytes its thread read (the rchar counter of /proc/thread-self/io, so
+#   reads through mmap and from sockets are not included)
+# - the commands it ran through utils.host.run_command
+# The spans are written as Chrome trace-event JSON (open it in
+# chrome://tracing or ui.perfetto.dev) and summarized as the critical path:
+# the chain of spans the run actually waited for.
+
+THREAD_IO_PATH = '/proc/thread-self/io'
+DEFAULT_TRACE_FILE = 'helfetch-trace.json'
+
+_trace = None
+_local = threading.local()
+
+def _stack():
+    stack = getattr(_local, 'stack', None)
+    if stack is None:
+        stack = _local.stack = []
+    return stack
+
+def _thread_bytes_read():
+    """
+    Returns the bytes this thread has read so far, not counting the reads of
+    the counter itself, or None where the kernel does not expose it.
+    """
+    try:
+        with open(THREAD_IO_PATH, 'rb') as f:
+            data = f.read()
+        rchar = int(data.split(b'\n', 1)[0].split()[1])
+    except (OSError, IndexError, ValueError):
+        return None
+    # rchar already includes every earlier read of the counter, but not this one
+    overhead = getattr(_local, 'overhead', 0)
+    _local.overhead = overhead + len(data)
+    return rchar - overhead
+
+def current_span():
+    """Returns the innermost open span of the calling thread, or None."""
+    stack = _stack() if _trace is not None else None
+    return stack[-1] if stack else None
+
+def _open_span(name, category, parent, args):
+    stack = _stack()
+    thread = threading.current_thread()
+    span = {
+        'name': name,
+        'category': category,
+        'args': args,
+        'parent': parent if parent is not None else (stack[-1] if stack else None),
+        'children': [],
+        'thread_id': threading.get_native_id(),
+        'thread': thread.name,
+        'commands': 0,
+        'bytes_read': None,
+        'end': None,
+    }
+    if span['parent'] is not None:
+        span['parent']['children'].append(span)
+    if category == 'command':
+        for open_span in stack:
+            open_span['commands'] += 1
+    span['_read_at_start'] = _thread_bytes_read()
+    span['start'] = time.perf_counter_ns()
+    stack.append(span)
+    return span
+
+def _close_span(span):
+    span['end'] = time.perf_counter_ns()
+    read_at_end = _thread_bytes_read()
+    if read_at_end is not None and span['_read_at_start'] is not None:
+        span['bytes_read'] = read_at_end - span['_read_at_start']
+    stack = _stack()
+    if stack and stack[-1] is span:
+        stack.pop()
+    _trace['spans'].append(span)
+
+@contextlib.contextmanager
+def trace_span(name, category='step', parent=None, **args):
+    """
+    Records the enclosed code as span `name`. `args` are shown with the span
+    in the trace viewer. The span nests under the calling thread's current
+    span, or under `parent` (for work handed to another thread).
+    """
+    if _trace is None:
+        yield None
+        return
+    span = _open_span(name, category, parent, args)
+    try:
+        yield span
+    finally:
+        _close_span(span)
+
+def traced(name, category='step'):
+    """Decorator recording every call of the function as span `name`."""
+    def decorate(function):
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            if _trace is None:
+                return function(*args, **kwargs)
+            with trace_span(name, category):
+                return function(*args, **kwargs)
+        return wrapper
+    return decorate
+
+def bind_span(name, function, category='step', parent=None, **args):
+    """
+    Returns `function` wrapped to run as span `name` under `parent` (default:
+    the caller's current span), for submitting to another thread. Without
+    tracing, returns `function` itself.
+    """
+    if _trace is None:
+        return function
+    parent = parent or current_span()
+
+    @functools.wraps(function)
+    def wrapper(*call_args, **call_kwargs):
+        with trace_span(name, category, parent=parent, **args):
+            return function(*call_args, **call_kwargs)
+    return wrapper
+
+def start_trace(name='helfetch'):
+    """Starts tracing, with a root span `name` open on the calling thread."""
+    global _trace
+    _trace = {'spans': [], 'pid': os.getpid()}
+    _trace['root'] = _open_span(name, 'run', None, {})
+
+def stop_trace():
+    """
+    Stops tracing and closes the root span.
+    Returns the recorded trace, or None if tracing was not started.
+    """
+    global _trace
+    trace = _trace
+    if trace is None:
+        return None
+    if trace['root']['end'] is None:
+        _close_span(trace['root'])
+    _trace = None
+    return trace
+
+def trace_events(trace):
+    """Converts a recorded trace into a Chrome trace-event JSON document."""
+    origin = trace['root']['start']
+    pid = trace['pid']
+    events = []
+    threads = {}
+    for span in sorted(trace['spans'], key=lambda span: span['start']):
+        threads.setdefault(span['thread_id'], span['thread'])
+        args = dict(span['args'])
+        if span['bytes_read'] is not None:
+            args['bytes_read'] = span['bytes_read']
+        if span['commands']:
+            args['commands'] = span['commands']
+        events.append({
+            'name': span['name'],
+            'cat': span['category'],
+            'ph': 'X',
+            'ts': (span['start'] - origin) / 1000,
+            'dur': (span['end'] - span['start']) / 1000,
+            'pid': pid,
+            'tid': span['thread_id'],
+            'args': args,
+        })
+    for thread_id, thread_name in threads.items():
+        events.append({'name': 'thread_name', 'ph': 'M', 'pid': pid, 'tid': thread_id,
+                       'args': {'name': thread_name}})
+    return {'traceEvents': events, 'displayTimeUnit': 'ms'}
+
+def write_trace(trace, path):
+    """Writes a recorded trace to `path` as Chrome trace-event JSON."""
+    import json
+    with open(path, 'w') as f:
+        json.dump(trace_events(trace), f)
+
+def critical_path(span, depth=0):
+    """
+    Returns [(depth, span)] for the spans the run waited on, starting at
+    `span`. Walking back from the end of a span, the child that finished
+    last was being waited for; before it started, the child that finished
+    last before that; and so on. Children running in parallel with a
+    waited-for child are off the path.
+    """
+    path = [(depth, span)]
+    remaining = [child for child in span['children'] if child['end'] is not None]
+    chain = []
+    cursor = span['end']
+    while True:
+        candidates = [child for child in remaining if child['end'] <= cursor]
+        if not candidates:
+            break
+        last = max(candidates, key=lambda child: child['end'])
+        chain.append(last)
+        remaining = [child for child in remaining if child is not last]
+        cursor = last['start']
+    for child in reversed(chain):
+        path.extend(critical_path(child, depth + 1))
+    return path
+
+def _format_size(count):
+    for unit in ('B', 'KiB', 'MiB'):
+        if count < 1024 or unit == 'MiB':
+            return f"{count:.0f} {unit}" if unit == 'B' else f"{count:.1f} {unit}"
+        count /= 1024
+
+def format_trace_summary(trace, path=None):
+    """Returns a short text summary of a recorded trace and its critical path."""
+    root = trace['root']
+    threads = {span['thread_id'] for span in trace['spans']}
+    lines = [f"Trace: {(root['end'] - root['start']) / 1e6:.1f} ms, {len(trace['spans'])} spans "
+             f"on {len(threads)} threads" + (f", written to {path}" if path else "")]
+    lines.append("Critical path:")
+    steps = critical_path(root)
+    name_width = max(2 * depth + len(span['name']) for depth, span in steps)
+    # Self time: the part of a span not covered by its children on the path
+    waited = {}
+    for depth, span in steps:
+        if span['parent'] is not None:
+            waited[id(span['parent'])] = waited.get(id(span['parent']), 0) + span['end'] - span['start']
+    for depth, span in steps:
+        details = []
+        self_time = span['end'] - span['start'] - waited.get(id(span), 0)
+        if id(span) in waited and self_time >= 1e5:
+            details.append(f"self {self_time / 1e6:.1f} ms")
+        if span['bytes_read']:
+            details.append(f"read {_format_size(span['bytes_read'])}")
+        if span['commands']:
+            details.append(f"{span['commands']} command{'s' if span['commands'] > 1 else ''}")
+        name = "  " * depth + span['name']
+        lines.append(f"  {(span['end'] - span['start']) / 1e6:>8.1f} ms  {name:<{name_width}}  "
+                     f"{span['thread']}" + (f"  ({', '.join(details)})" if details else ""))
+    return "\n".join(lines)